@@ -0,0 +1,43 @@
+# Gateway example: one CPython host serves the AI requests of many devices
+#
+# On the host:    python gateway_demo.py server
+# On each device: copy the device() part into main.py
+
+import sys
+sys.path.append('/lib')
+
+API_KEY = "your-api-key-here"
+GATEWAY_HOST = "192.168.1.10"
+# Shared secret every device presents when it connects
+GATEWAY_TOKEN = "change-me"
+
+def server():
+    import asyncio
+    from ai_llm import AIClient
+    from ai_llm.scheduler import RequestScheduler
+    from ai_llm.gateway import GatewayServer
+
+    # The scheduler lets security traffic overtake bulk reports
+    client = RequestScheduler(AIClient(api_key=API_KEY), workers=8)
+    gateway = GatewayServer(client, GATEWAY_TOKEN, host="0.0.0.0")
+    print(f"Gateway listening on port {gateway.port}")
+    asyncio.run(gateway.serve_forever())
+
+def device():
+    from ai_llm.gateway_client import GatewayClient
+    from ai_llm.applications import SecuritySystem
+
+    client = GatewayClient(GATEWAY_HOST, token=GATEWAY_TOKEN)
+
+    # Option 1: run the application locally, forward only the LLM calls
+    security = SecuritySystem(client)
+    print(security.analyze_security_event({"pir": True}, "motion"))
+
+    # Option 2: run the application on the gateway (history stays there)
+    print(client.call_app("SecuritySystem", "analyze_security_event", {"pir": True}, "motion"))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "server":
+        server()
+    else:
+        device()
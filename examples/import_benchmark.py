@@ -0,0 +1,55 @@
+# Import-time and RAM benchmark for the lazily loaded package
+#
+# Measures the cost of importing a single application, then the extra cost
+# of touching every other application (what an eager package __init__ paid
+# at boot). Run on the device, or on CPython with lib/ on the path.
+
+import sys
+sys.path.append('/lib')
+
+import gc
+import time
+
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+except AttributeError:
+    ticks_us = lambda: int(time.perf_counter() * 1000000)
+    ticks_diff = lambda end, start: end - start
+
+try:
+    mem_free = gc.mem_free
+    tracemalloc = None
+except AttributeError:
+    import tracemalloc
+    tracemalloc.start()
+    mem_free = lambda: -tracemalloc.get_traced_memory()[0]
+
+def measure(label, func):
+    gc.collect()
+    free_before = mem_free()
+    start = ticks_us()
+    func()
+    elapsed = ticks_diff(ticks_us(), start)
+    gc.collect()
+    used = free_before - mem_free()
+    print(f"{label}: {elapsed / 1000:.1f} ms, {used} bytes")
+    return elapsed, used
+
+def import_one():
+    from ai_llm.applications import WeatherAnalyzer
+
+def import_rest():
+    import ai_llm.applications as applications
+    for name in applications.__all__:
+        getattr(applications, name)
+
+def main():
+    print("=== Import Benchmark ===")
+    lazy_time, lazy_mem = measure("Lazy: WeatherAnalyzer only", import_one)
+    rest_time, rest_mem = measure("Remaining applications", import_rest)
+    print(f"Eager equivalent: {(lazy_time + rest_time) / 1000:.1f} ms, {lazy_mem + rest_mem} bytes")
+    print(f"Saved at boot: {rest_time / 1000:.1f} ms, {rest_mem} bytes")
+
+if __name__ == "__main__":
+    main()
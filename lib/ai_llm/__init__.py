@@ -1,15 +1,34 @@
 """
 MicroPython AI/LLM Library
 A lightweight library for interacting with AI/LLM APIs on MicroPython devices
+
+Public names are imported on first access to keep startup time and baseline
+heap low; see ai_llm.applications for the same pattern. Optional subsystems
+(ai_llm.scheduler, ai_llm.history_store, ...) are imported from their own
+modules.
 """
 
 __version__ = "0.1.0"
 __author__ = "Your Name"
 __email__ = "your.email@example.com"
 
-from .client import AIClient
-from .models import ChatMessage, ChatResponse, ModelConfig
-from .utils import format_prompt, validate_response
+_LAZY_IMPORTS = {
+    'AIClient': 'client',
+    'ChatMessage': 'models',
+    'ChatResponse': 'models',
+    'ModelConfig': 'models',
+    'format_prompt': 'utils',
+    'validate_response': 'utils',
+    # Application classes are also reachable from the package root
+    'BaseAIApplication': 'applications',
+    'WeatherAnalyzer': 'applications',
+    'MotorController': 'applications',
+    'SmartHomeController': 'applications',
+    'SecuritySystem': 'applications',
+    'LightingController': 'applications',
+    'RobotNavigator': 'applications',
+    'TaskScheduler': 'applications'
+}
 
 __all__ = [
     'AIClient',
@@ -18,4 +37,16 @@ __all__ = [
     'ModelConfig',
     'format_prompt',
     'validate_response'
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module = __import__(__name__ + '.' + module_name, None, None, (name,))
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return __all__ + ['__version__']
@@ -0,0 +1,195 @@
+"""
+Local access control
+
+Credentials are stored only as salted, iterated SHA-256 hashes and
+compared in constant time. Principals are indexed by user id and by
+credential hash (for card/PIN-only taps), so a decision is a dictionary
+lookup, one hash and a few comparisons, with no network involved.
+
+authorized_users entries:
+    "alice"                       known user without a credential: always
+                                  denied until one is configured
+    {
+        "user_id": "bob",
+        "credential_hash": "<hex>",   from hash_credential(), or
+        "credential": "1234",         plain text, hashed when loaded;
+                                      an explicit None lets the user id
+                                      alone through (no credential check)
+        "zones": ["entry", "garage"], omit for every zone
+        "schedule": [["07:00", "19:00"]],  omit for any time
+        "days": [0, 1, 2, 3, 4]       0 = Monday; omit for every day
+    }
+"""
+
+import time
+from .rules import parse_time
+from .utils import ticks_us, ticks_diff
+
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+
+try:
+    from binascii import hexlify, unhexlify
+except ImportError:
+    from ubinascii import hexlify, unhexlify
+
+HASH_ROUNDS = 100
+
+def hash_credential(credential, salt="", rounds=HASH_ROUNDS):
+    """
+    Hex hash of a credential, for storing in authorized_users
+    """
+    return hexlify(_digest(credential, salt, rounds)).decode()
+
+def _digest(credential, salt, rounds):
+    data = (salt + str(credential)).encode()
+    for _ in range(rounds):
+        data = hashlib.sha256(data).digest()
+    return data
+
+def constant_time_equal(a, b):
+    """
+    Compare two byte strings in time independent of where they differ
+    """
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a, b):
+        result |= x ^ y
+    return result == 0
+
+class _Principal:
+    def __init__(self, user_id, digest, zones, windows, days, open_access=False):
+        self.user_id = user_id
+        self.digest = digest
+        # Explicit "credential": None opt-out
+        self.open_access = open_access
+        self.zones = zones
+        self.windows = windows
+        self.days = days
+
+class AccessController:
+    """
+    O(1) access decisions from security_config['authorized_users']
+    """
+
+    def __init__(self, authorized_users, salt="", rounds=HASH_ROUNDS):
+        self.salt = salt
+        self.rounds = rounds
+        self._users = {}
+        self._credentials = {}  # digest -> principals holding that credential
+        # Compared against when the user is unknown, so timing does not reveal it
+        self._dummy = _digest("", salt, 1)
+        self.stats = {"granted": 0, "denied": 0, "max_us": 0}
+        for entry in authorized_users:
+            self.add_user(entry)
+
+    def add_user(self, entry):
+        """
+        Index one authorized_users entry (replacing the same user id)
+        """
+        if isinstance(entry, str):
+            entry = {"user_id": entry}
+        user_id = entry["user_id"]
+        digest = None
+        if entry.get("credential_hash"):
+            digest = unhexlify(entry["credential_hash"])
+        elif entry.get("credential") is not None:
+            digest = _digest(entry["credential"], self.salt, self.rounds)
+        open_access = digest is None and "credential" in entry
+        zones = set(entry["zones"]) if entry.get("zones") else None
+        windows = [(parse_time(start), parse_time(end)) for start, end in entry.get("schedule") or []]
+        days = set(entry["days"]) if entry.get("days") else None
+        self.remove_user(user_id)
+        principal = _Principal(user_id, digest, zones, windows, days, open_access)
+        self._users[user_id] = principal
+        if digest is not None:
+            self._credentials.setdefault(digest, []).append(principal)
+
+    def remove_user(self, user_id):
+        principal = self._users.pop(user_id, None)
+        if principal is not None and principal.digest is not None:
+            holders = self._credentials.get(principal.digest)
+            if holders is not None:
+                holders.remove(principal)
+                if not holders:
+                    del self._credentials[principal.digest]
+
+    def check(self, zone, user_id=None, credential=None, now=None):
+        """
+        Decide an access request
+
+        Args:
+            zone: Zone (door) being requested; None is always denied
+            user_id: Claimed user; None to identify by credential alone
+            credential: PIN, card number, etc.
+            now: time.localtime()-style tuple (default: current time)
+
+        Returns:
+            Decision dict: granted, user_id, zone, reason, latency_us
+        """
+        start = ticks_us()
+        digest = None
+        if credential is not None:
+            digest = _digest(credential, self.salt, self.rounds)
+
+        if user_id is None:
+            holders = self._credentials.get(digest) if digest is not None else None
+            principal = None
+            if not holders:
+                reason = "unknown credential"
+            elif len(holders) > 1:
+                # A shared credential does not say who is at the door
+                reason = "credential shared by several users; user id required"
+            else:
+                principal = holders[0]
+                reason = None
+        else:
+            principal = self._users.get(user_id)
+            stored = principal.digest if principal else self._dummy
+            if principal is None:
+                constant_time_equal(digest or self._dummy, stored)
+                reason = "unknown user"
+            elif stored is None:
+                reason = None if principal.open_access else "no credential configured"
+            elif digest is None or not constant_time_equal(digest, stored):
+                reason = "invalid credential"
+            else:
+                reason = None
+
+        if reason is None and zone is None:
+            reason = "unknown zone"
+        if reason is None:
+            reason = self._permission_error(principal, zone, now or time.localtime())
+
+        granted = reason is None
+        elapsed = ticks_diff(ticks_us(), start)
+        self.stats["granted" if granted else "denied"] += 1
+        if elapsed > self.stats["max_us"]:
+            self.stats["max_us"] = elapsed
+        return {
+            "granted": granted,
+            "user_id": principal.user_id if principal else user_id,
+            "zone": zone,
+            "reason": reason or "authorized",
+            "latency_us": elapsed
+        }
+
+    @staticmethod
+    def _permission_error(principal, zone, now):
+        if principal.zones is not None and zone not in principal.zones:
+            return f"no access to zone {zone}"
+        if principal.days is not None and now[6] not in principal.days:
+            return "outside permitted days"
+        if principal.windows:
+            minute = now[3] * 60 + now[4]
+            for first, last in principal.windows:
+                if first <= last:
+                    if first <= minute < last:
+                        return None
+                elif minute >= first or minute < last:
+                    return None
+            return "outside permitted hours"
+        return None
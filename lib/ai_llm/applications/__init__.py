@@ -1,15 +1,22 @@
 """
 Predefined AI Applications for MicroPython AI/LLM Library
+
+Classes are imported on first access, so a device that only uses one
+application does not pay import time or heap for the others. On ports
+built without module __getattr__ support, import from the submodule
+directly (e.g. ``from ai_llm.applications.weather_analyzer import WeatherAnalyzer``).
 """
 
-from .base_application import BaseAIApplication
-from .weather_analyzer import WeatherAnalyzer
-from .motor_controller import MotorController
-from .smart_home_controller import SmartHomeController
-from .security_system import SecuritySystem
-from .lighting_controller import LightingController
-from .robot_navigator import RobotNavigator
-from .task_scheduler import TaskScheduler
+_LAZY_IMPORTS = {
+    'BaseAIApplication': 'base_application',
+    'WeatherAnalyzer': 'weather_analyzer',
+    'MotorController': 'motor_controller',
+    'SmartHomeController': 'smart_home_controller',
+    'SecuritySystem': 'security_system',
+    'LightingController': 'lighting_controller',
+    'RobotNavigator': 'robot_navigator',
+    'TaskScheduler': 'task_scheduler'
+}
 
 __all__ = [
     'BaseAIApplication',
@@ -20,4 +27,16 @@ __all__ = [
     'LightingController',
     'RobotNavigator',
     'TaskScheduler'
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module = __import__(__name__ + '.' + module_name, None, None, (name,))
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return __all__
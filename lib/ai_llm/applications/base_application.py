@@ -1,21 +1,52 @@
 from ..client import AIClient
-from ..models import ChatMessage, ModelConfig
+from ..models import ChatMessage, ModelConfig, PRIORITY_BULK
 from ..utils import format_prompt, validate_response
+import ujson as json
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+USER_PROMPT_TEMPLATE = "User Query: {user_input}\n\nContext Data: {context_data}"
 
 class BaseAIApplication:
     """
     Base class for AI-powered applications with predefined prompts
     """
     
+    # Maximum number of history messages sent with each request
+    max_history_messages = 10
+    # The history window start only moves in steps of this many messages
+    # (whole user/assistant exchanges), so consecutive requests share a
+    # byte-identical prefix that the provider's prompt cache can reuse
+    history_step = 4
+    # Optional prompt budget in estimated tokens; older exchanges are
+    # dropped from the history window until the request fits
+    max_prompt_tokens = None
+    # Report datasets larger than this are map-reduced before the final prompt
+    report_chunk_tokens = 1500
+    report_workers = 2
+    
     def __init__(self, ai_client, system_prompt=None, temperature=0.7):
         self.ai_client = ai_client
         self.system_prompt = system_prompt or self.get_default_system_prompt()
         self.conversation_history = []
         self.temperature = temperature
-        
-        # Update client temperature
-        if hasattr(self.ai_client, 'model_config'):
-            self.ai_client.model_config.temperature = temperature
+        self.context_encoder = None
+        self.state_mirror = None
+        self.history_store = None
+        self.history_index = None
+        self.relevance_top_k = 3
+        self.history_byte_budget = 2000
+        self.usage_aggregator = None
+        # (source, label) -> exchange number holding the last full status
+        # snapshot; kept in every request so deltas have their baseline
+        self._snapshots = {}
+        self._mirror_emitted = {}
+        # Background callers (e.g. RobotNavigator.request_plan) share the
+        # history; exchanges are read and appended under this lock
+        self._history_lock = _thread.allocate_lock() if _thread else None
     
     def get_default_system_prompt(self):
         """
@@ -23,13 +54,17 @@ class BaseAIApplication:
         """
         return "You are a helpful AI assistant."
     
-    def process_query(self, user_input, context_data=None):
+    def process_query(self, user_input, context_data=None, priority=None, deadline_ms=None):
         """
         Process user query with optional context data
         
         Args:
             user_input: User's question or command
             context_data: Additional context (sensor data, device status, etc.)
+            priority: Request class (models.PRIORITY_*), honoured when
+                ai_client is a RequestScheduler
+            deadline_ms: Give up if the request is not started in time
+                (RequestScheduler only)
             
         Returns:
             AI response string
@@ -37,43 +72,479 @@ class BaseAIApplication:
         # Format the prompt with context if provided
         formatted_prompt = self.format_user_prompt(user_input, context_data)
         
-        # Create messages
-        messages = [ChatMessage("system", self.system_prompt)]
-        
-        # Add conversation history (last 5 exchanges to manage memory)
-        messages.extend(self.conversation_history[-10:])
-        
-        # Add current user message
-        messages.append(ChatMessage("user", formatted_prompt))
+        self._acquire_history()
+        try:
+            messages = self.build_messages(formatted_prompt, user_input)
+        finally:
+            self._release_history()
         
         # Get AI response
-        response = self.ai_client.chat_completion(messages)
+        response = self._chat(messages, priority, deadline_ms)
         
         if response and response.choices:
             ai_response = response.choices[0].message.content
             
-            # Update conversation history
-            self.conversation_history.append(ChatMessage("user", formatted_prompt))
-            self.conversation_history.append(ChatMessage("assistant", ai_response))
+            # Update conversation history (one whole exchange at a time)
+            self._acquire_history()
+            try:
+                self.conversation_history.append(ChatMessage("user", formatted_prompt))
+                self.conversation_history.append(ChatMessage("assistant", ai_response))
+                if self.history_store:
+                    self.history_store.append("user", formatted_prompt)
+                    self.history_store.append("assistant", ai_response)
+                if self.history_index is not None:
+                    self.history_index.add(f"{user_input} {ai_response}")
+                self._record_snapshots(len(self.conversation_history) // 2 - 1)
+            finally:
+                self._release_history()
             
             return validate_response(ai_response)
         
+        # The model never saw this status, so later deltas must not build on it
+        self._reset_context_state()
         return None
     
+    def _emitted_context(self):
+        # Status labels formatted since the last exchange: key -> was full
+        emitted = {}
+        for label, full in self._mirror_emitted.items():
+            emitted[("mirror", label)] = full
+        if self.context_encoder:
+            for label, full in self.context_encoder.emitted.items():
+                emitted[("encoder", label)] = full
+            self.context_encoder.emitted = {}
+        self._mirror_emitted = {}
+        return emitted
+    
+    def _record_snapshots(self, exchange):
+        for key, full in self._emitted_context().items():
+            if full:
+                self._snapshots[key] = exchange
+    
+    def _reset_context_state(self):
+        if self.state_mirror:
+            self.state_mirror.reset()
+        if self.context_encoder:
+            self.context_encoder.reset()
+        self._snapshots = {}
+        self._emitted_context()
+    
+    def _chat(self, messages, priority=None, deadline_ms=None):
+        # The temperature goes with each request; the client may be shared
+        if getattr(self.ai_client, "supports_priority", False):
+            return self.ai_client.chat_completion(messages, priority=priority, deadline_ms=deadline_ms,
+                                                  temperature=self.temperature)
+        return self.ai_client.chat_completion(messages, temperature=self.temperature)
+    
+    def _acquire_history(self):
+        if self._history_lock:
+            self._history_lock.acquire()
+    
+    def _release_history(self):
+        if self._history_lock:
+            self._history_lock.release()
+    
+    def process_query_stateless(self, user_input, context_data=None, priority=None):
+        """
+        Answer a one-off query without reading or recording conversation
+        history (safe to call from a background thread)
+        
+        Returns:
+            AI response string, or None on error
+        """
+        messages = [
+            ChatMessage("system", self.system_prompt),
+            ChatMessage("user", self.format_user_prompt(user_input, context_data))
+        ]
+        # Status formatted for this query never enters the history, so the
+        # next query must not send deltas against it
+        for source, label in self._emitted_context():
+            tracker = self.state_mirror if source == "mirror" else self.context_encoder
+            if tracker:
+                tracker.reset(label)
+            self._snapshots.pop((source, label), None)
+        response = self._chat(messages, priority)
+        if response and response.choices:
+            return validate_response(response.choices[0].message.content)
+        return None
+    
+    def build_messages(self, formatted_prompt, query=None):
+        """
+        Assemble the request messages, most stable content first
+        
+        The static system prompt leads, followed by the history window and
+        finally the volatile user prompt, so everything before the new turn
+        is a repeat of the previous request and can hit the prefix cache.
+        With relevance history enabled, the window is replaced by the
+        exchanges most relevant to the query. Exchanges holding the latest
+        full status snapshots are always kept, since later delta updates
+        only make sense against them.
+        
+        Args:
+            formatted_prompt: Formatted user prompt for this turn
+            query: Raw user input used for relevance ranking
+            
+        Returns:
+            List of ChatMessage objects
+        """
+        system_message = ChatMessage("system", self.system_prompt)
+        user_message = ChatMessage("user", formatted_prompt)
+        if self.history_index is not None:
+            history = self.select_relevant_history(query or formatted_prompt)
+        else:
+            history = self.conversation_history[self.get_history_start():]
+        history, pinned = self._pin_snapshots(history)
+        
+        if self.max_prompt_tokens:
+            from ..tokens import TokenCounter
+            counter = TokenCounter()
+            counter.add_message(system_message)
+            counter.add_message(user_message)
+            history = self.trim_history(history, self.max_prompt_tokens - counter.total, pinned)
+        
+        messages = [system_message]
+        messages.extend(history)
+        messages.append(user_message)
+        return messages
+    
+    def _pin_snapshots(self, history):
+        """
+        Add the exchanges holding the latest full snapshots to a history
+        selection (in chronological order)
+        
+        Returns:
+            (history, pinned) where pinned holds the id() of each pinned
+            exchange's user message
+        """
+        conversation = self.conversation_history
+        pinned = set()
+        for exchange in self._snapshots.values():
+            if 2 * exchange + 1 < len(conversation):
+                pinned.add(id(conversation[2 * exchange]))
+        if not pinned:
+            return history, pinned
+        present = set([id(message) for message in history])
+        if not [key for key in pinned if key not in present]:
+            return history, pinned
+        chosen = []
+        for i in range(0, len(conversation) - 1, 2):
+            message = conversation[i]
+            if id(message) in present or id(message) in pinned:
+                chosen.extend(conversation[i:i + 2])
+        return chosen, pinned
+    
+    def trim_history(self, history, budget, pinned=()):
+        """
+        Keep the newest whole exchanges that fit in a token budget
+        
+        Args:
+            history: List of ChatMessage objects (user/assistant pairs)
+            budget: Tokens available for history
+            pinned: id() of user messages whose exchange is always kept
+                (and counted against the budget first)
+            
+        Returns:
+            Trimmed list of history messages
+        """
+        from ..tokens import TokenCounter
+        counter = TokenCounter()
+        for i in range(0, len(history) - 1, 2):
+            if id(history[i]) in pinned:
+                counter.add_message(history[i])
+                counter.add_message(history[i + 1])
+        kept = []
+        full = False
+        start = len(history)
+        while start >= 2:
+            if id(history[start - 2]) in pinned:
+                kept.append(start - 2)
+            elif not full:
+                counter.add_message(history[start - 2])
+                counter.add_message(history[start - 1])
+                if counter.total > budget:
+                    full = True
+                else:
+                    kept.append(start - 2)
+            start -= 2
+        kept.reverse()
+        trimmed = []
+        for i in kept:
+            trimmed.extend(history[i:i + 2])
+        return trimmed
+    
+    def get_history_start(self):
+        """
+        Index of the first history message to send
+        
+        Rather than sliding one exchange per call (which changes the prefix
+        on every request), the window start is rounded up to a multiple of
+        history_step, keeping at most max_history_messages.
+        """
+        overflow = len(self.conversation_history) - self.max_history_messages
+        if overflow <= 0:
+            return 0
+        step = self.history_step
+        return ((overflow + step - 1) // step) * step
+    
+    def process_report(self, query, data, header="", priority=PRIORITY_BULK):
+        """
+        Answer a report query over a dataset of any size
+        
+        Small datasets go straight into one prompt. Larger ones are split
+        into token-bounded chunks, summarized concurrently and reduced,
+        and the final query runs over the combined notes. Iterables and
+        streams are consumed lazily.
+        
+        Args:
+            query: Report request
+            data: dict, list, iterable of records, string, readable stream,
+                or a pre-aggregated summary such as a UsageAggregator
+            header: Context lines placed before the data
+            priority: Request class for the summarization and final calls
+            
+        Returns:
+            AI response string, or None if there is no data to report on
+            (the model is not called)
+        """
+        # Aggregates are already prompt-sized
+        if hasattr(data, "to_text"):
+            if hasattr(data, "__len__") and not len(data):
+                return None
+            return self.process_query(query, f"{header}\n{data.to_text()}", priority)
+        
+        # Optional subsystems are imported on first use to keep baseline heap low
+        from ..report_pipeline import MapReduceSummarizer
+        summarizer = MapReduceSummarizer(self.ai_client, self.report_chunk_tokens, self.report_workers, priority)
+        chunks = summarizer.iter_chunks(data)
+        first = next(chunks, None)
+        if first is None:
+            return None
+        second = next(chunks, None)
+        
+        if second is None:
+            return self.process_query(query, f"{header}\n{first}", priority)
+        
+        def all_chunks():
+            yield first
+            yield second
+            for chunk in chunks:
+                yield chunk
+        
+        notes = summarizer.summarize(None, query, all_chunks())
+        if notes is None:
+            return None
+        return self.process_query(query, f"{header}\nSummarized data (from {self.report_chunk_tokens}-token chunks):\n{notes}", priority)
+    
+    def enable_usage_tracking(self, hourly_buckets=48, daily_buckets=30, unit="", **options):
+        """
+        Aggregate usage samples locally for usage reports
+        
+        Samples passed to record_usage are rolled up into hourly and daily
+        totals per device (see ai_llm.usage); usage reports called without
+        data then send those aggregates instead of raw samples.
+        
+        Returns:
+            The UsageAggregator
+        """
+        from ..usage import UsageAggregator
+        
+        self.usage_aggregator = UsageAggregator(hourly_buckets, daily_buckets, unit=unit, **options)
+        return self.usage_aggregator
+    
+    def record_usage(self, device, value, timestamp=None, zone=None):
+        """
+        Add one usage sample (requires enable_usage_tracking)
+        """
+        return self.usage_aggregator.add(device, value, timestamp, zone)
+    
+    def enable_relevance_history(self, top_k=3, byte_budget=2000):
+        """
+        Send the most relevant past exchanges instead of the newest ones
+        
+        Each query includes the latest exchange plus up to top_k older
+        exchanges ranked by a local BM25 index, within byte_budget
+        characters of history. This trades some prefix-cache reuse for
+        fewer, more useful history tokens.
+        
+        Args:
+            top_k: Maximum number of older exchanges to include
+            byte_budget: Maximum total size of included history
+        """
+        from ..history_index import HistoryIndex
+        self.history_index = HistoryIndex()
+        self.relevance_top_k = top_k
+        self.history_byte_budget = byte_budget
+        self._rebuild_history_index()
+    
+    def _rebuild_history_index(self):
+        self.history_index.clear()
+        history = self.conversation_history
+        for i in range(0, len(history) - 1, 2):
+            self.history_index.add(f"{history[i].content} {history[i + 1].content}")
+    
+    def _exchange_size(self, exchange_id):
+        history = self.conversation_history
+        return len(history[2 * exchange_id].content) + len(history[2 * exchange_id + 1].content)
+    
+    def select_relevant_history(self, query):
+        """
+        Pick the latest exchange plus the top-ranked older ones
+        
+        Returns:
+            History messages in chronological order
+        """
+        history = self.conversation_history
+        latest = len(history) // 2 - 1
+        if latest < 0:
+            return []
+        
+        chosen = [latest]
+        used = self._exchange_size(latest)
+        for exchange_id, score in self.history_index.search(query, self.relevance_top_k, latest):
+            size = self._exchange_size(exchange_id)
+            if used + size <= self.history_byte_budget:
+                chosen.append(exchange_id)
+                used += size
+        
+        chosen.sort()
+        selected = []
+        for exchange_id in chosen:
+            selected.extend(history[2 * exchange_id:2 * exchange_id + 2])
+        return selected
+    
     def format_user_prompt(self, user_input, context_data=None):
         """
         Format user prompt with context data
         Override in subclasses for specific formatting
         """
         if context_data:
-            return f"User Query: {user_input}\n\nContext Data: {context_data}"
+            return format_prompt(USER_PROMPT_TEMPLATE, user_input=user_input, context_data=context_data)
         return user_input
     
+    def set_context_encoder(self, encoder):
+        """
+        Use a CompactContextEncoder for status context in prompts
+        
+        The encoder's legend is appended to the system prompt once so the
+        model can read the abbreviated format.
+        
+        Args:
+            encoder: CompactContextEncoder instance, or None for verbose context
+        """
+        self.context_encoder = encoder
+        if encoder:
+            if encoder.full_snapshot_every is None:
+                encoder.full_snapshot_every = self._full_snapshot_interval()
+            legend = encoder.legend()
+            if legend not in self.system_prompt:
+                self.system_prompt = self.system_prompt + legend
+    
+    def encode_context(self, data, label="ctx", delta=False):
+        """
+        Encode structured context data for a prompt
+        
+        Uses the compact encoder when one is set, otherwise JSON.
+        
+        Args:
+            data: Dictionary or list to encode
+            label: Delta-tracking namespace passed to the encoder
+            delta: Send only changes since the previous call with this label
+        """
+        if self.context_encoder:
+            return self.context_encoder.encode(data, label, delta)
+        return json.dumps(data)
+    
+    def attach_history_store(self, store):
+        """
+        Persist conversation history to flash and resume from it
+        
+        Loads the most recent exchanges from the store (e.g. after waking
+        from deep sleep) and appends every new exchange to it.
+        
+        Args:
+            store: HistoryStore instance
+        """
+        self.history_store = store
+        self.conversation_history = store.load_last(self.max_history_messages)
+        # Resume on a whole exchange
+        if self.conversation_history and self.conversation_history[0].role != "user":
+            self.conversation_history = self.conversation_history[1:]
+        if self.history_index is not None:
+            self._rebuild_history_index()
+        # The loaded history does not say which exchange held a snapshot
+        self._reset_context_state()
+    
+    def enable_state_mirror(self, full_snapshot_every=None):
+        """
+        Send only changed device status on repeated commands
+        
+        Args:
+            full_snapshot_every: Send the full status every N updates. By
+                default this is chosen so a full snapshot always stays
+                inside the history window sent to the model.
+        """
+        if full_snapshot_every is None:
+            full_snapshot_every = self._full_snapshot_interval()
+        from ..state_mirror import StateMirror
+        self.state_mirror = StateMirror(full_snapshot_every)
+    
+    def _full_snapshot_interval(self):
+        # Updates per full snapshot that keep one inside the history window
+        kept_exchanges = (self.max_history_messages - self.history_step + 1) // 2
+        return kept_exchanges + 1
+    
+    def format_status_update(self, label, status, formatter):
+        """
+        Format device status, reduced to a diff when the state mirror is on
+        
+        Args:
+            label: Kind of status tracked by the mirror
+            status: Current status dictionary
+            formatter: Callable that formats a status dictionary
+            
+        Returns:
+            Context string
+        """
+        if self.state_mirror is None or not isinstance(status, dict):
+            return formatter(status)
+        
+        is_full, changes = self.state_mirror.update(label, status)
+        self._mirror_emitted[label] = is_full
+        if not is_full and not changes:
+            return "Status unchanged since the last update."
+        # The mirror already reduced status to its changes; a delta
+        # encoder would diff them again and report every other key removed
+        encoder = self.context_encoder
+        delta = encoder.delta if encoder else False
+        if encoder:
+            encoder.delta = False
+        try:
+            if is_full:
+                return formatter(status)
+            text = formatter(changes)
+        finally:
+            if encoder:
+                encoder.delta = delta
+        if text.startswith("@full "):
+            # Compact tables of changes carry the delta header
+            return "@delta " + text[6:]
+        return "Changes since the last update (everything else unchanged):\n" + text
+    
     def clear_history(self):
         """
         Clear conversation history
         """
-        self.conversation_history = []
+        self._acquire_history()
+        try:
+            self.conversation_history = []
+            if self.history_store:
+                self.history_store.clear()
+            if self.history_index is not None:
+                self.history_index.clear()
+        finally:
+            self._release_history()
+        # Deltas refer to context the model can no longer see
+        self._reset_context_state()
     
     def set_system_prompt(self, new_prompt):
         """
@@ -1,4 +1,5 @@
 from .base_application import BaseAIApplication
+from ..models import PRIORITY_BULK
 import ujson as json
 
 class LightingController(BaseAIApplication):
@@ -67,7 +68,11 @@ Optimize for user comfort, energy efficiency, and health benefits.
         Returns:
             Lighting control commands
         """
-        context = self.format_lighting_context(current_status, time_context)
+        context = self.format_status_update(
+            "lighting",
+            current_status,
+            lambda status: self.format_lighting_context(status, time_context)
+        )
         response = self.process_query(user_command, context)
         
         if response:
@@ -86,14 +91,20 @@ Optimize for user comfort, energy efficiency, and health benefits.
         """
         Format current lighting and time context
         """
+        if self.context_encoder:
+            return self.context_encoder.encode({"time": time_context, "lights": current_status}, "lighting")
+        
         context_lines = []
         
         if time_context:
-            context_lines.append(f"Time Context: {json.dumps(time_context)}")
+            context_lines.append(f"Time Context: {self.encode_context(time_context)}")
         
         if current_status:
             context_lines.append("Current Lighting Status:")
             for zone, lights in current_status.items():
+                if not isinstance(lights, dict):
+                    context_lines.append(f"  {zone}: {lights}")
+                    continue
                 context_lines.append(f"  {zone}:")
                 for light_id, status in lights.items():
                     if isinstance(status, dict):
@@ -124,20 +135,28 @@ Optimize for user comfort, energy efficiency, and health benefits.
         """
         Create circadian rhythm-supporting lighting schedule
         """
-        context = f"User Schedule: {json.dumps(user_schedule)}"
+        context = f"User Schedule: {self.encode_context(user_schedule)}"
         if preferences:
-            context += f"\nUser Preferences: {json.dumps(preferences)}"
+            context += f"\nUser Preferences: {self.encode_context(preferences)}"
         
         query = "Create a circadian rhythm lighting schedule that supports natural sleep-wake cycles and productivity."
-        return self.process_query(query, context)
+        return self.process_query(query, context, PRIORITY_BULK)
     
-    def analyze_lighting_usage(self, usage_data, time_period):
+    def analyze_lighting_usage(self, usage_data=None, time_period=None):
         """
         Analyze lighting usage patterns and provide optimization recommendations
+        
+        Args:
+            usage_data: Raw usage data, a UsageAggregator, or None for the
+                aggregates collected with record_usage
+            time_period: Period description for the prompt
         """
-        context = f"Usage Data: {json.dumps(usage_data)}\nTime Period: {time_period}"
+        if usage_data is None:
+            usage_data = self.usage_aggregator
+        if time_period is None:
+            time_period = "recent usage"
         query = "Analyze lighting usage patterns and recommend optimizations for energy savings and improved comfort."
-        return self.process_query(query, context)
+        return self.process_report(query, usage_data, f"Time Period: {time_period}\nUsage Data:")
     
     def suggest_lighting_scene(self, activity, mood=None, occupancy=None):
         """
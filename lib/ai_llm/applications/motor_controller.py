@@ -1,4 +1,5 @@
 from .base_application import BaseAIApplication
+from ..models import PRIORITY_CONTROL
 import ujson as json
 
 class MotorController(BaseAIApplication):
@@ -62,8 +63,8 @@ If the command is unclear or unsafe, set safety_check to "failed" and explain wh
         Returns:
             Parsed motor command dictionary
         """
-        context = self.format_motor_context(motor_status)
-        response = self.process_query(user_command, context)
+        context = self.format_status_update("motors", motor_status, self.format_motor_context)
+        response = self.process_query(user_command, context, PRIORITY_CONTROL)
         
         if response:
             try:
@@ -88,10 +89,16 @@ If the command is unclear or unsafe, set safety_check to "failed" and explain wh
         if not motor_status:
             return "No current motor status available."
         
+        if self.context_encoder:
+            return self.context_encoder.encode(motor_status, "motors")
+        
         context_lines = ["Current Motor Status:"]
         
         for motor_id, status in motor_status.items():
             status_line = f"- {motor_id}: "
+            if not isinstance(status, dict):
+                context_lines.append(status_line + str(status))
+                continue
             if 'running' in status:
                 status_line += f"{'Running' if status['running'] else 'Stopped'}"
             if 'speed' in status:
@@ -150,6 +157,84 @@ If the command is unclear or unsafe, set safety_check to "failed" and explain wh
         query = f"Create a sequence of motor commands for: {sequence_description}. Provide each step as a separate JSON command."
         return self.process_query(query)
     
+    def plan_motor_sequence(self, sequence_description, motor_status=None):
+        """
+        Get a whole motor sequence from the model in one request
+        
+        Args:
+            sequence_description: What the sequence should do
+            motor_status: Current motor status dictionary
+            
+        Returns:
+            List of validated motor command dictionaries, or None on error
+        """
+        context = self.format_motor_context(motor_status)
+        query = (f"Create a sequence of motor commands for: {sequence_description}. "
+                 "Respond with a JSON array of command objects in execution order, "
+                 "with numeric speed, angle and duration values.")
+        response = self.process_query(query, context, PRIORITY_CONTROL)
+        if not response:
+            return None
+        
+        try:
+            steps = json.loads(response)
+        except ValueError:
+            # Tolerate text around the array
+            start = response.find("[")
+            end = response.rfind("]")
+            try:
+                steps = json.loads(response[start:end + 1]) if 0 <= start < end else None
+            except ValueError:
+                steps = None
+        if isinstance(steps, dict):
+            steps = steps.get("sequence") or steps.get("steps") or [steps]
+        if not isinstance(steps, list):
+            print("Error in plan_motor_sequence: response is not a command list")
+            return None
+        commands = []
+        for index, step in enumerate(steps):
+            try:
+                commands.append(self.validate_motor_command(step))
+            except (TypeError, ValueError, AttributeError, KeyError) as e:
+                # Non-numeric or null parameters; execute_motor_sequence refuses the sequence
+                commands.append({
+                    "action": "error",
+                    "explanation": f"Invalid parameters in step {index + 1}: {e}",
+                    "safety_check": "failed"
+                })
+        return commands
+    
+    def execute_motor_sequence(self, commands, output, motor_status=None, profile="trapezoidal", period_ms=20):
+        """
+        Run a command sequence locally with motion profiles
+        
+        Setpoint tables are precomputed within the motor_config limits
+        (optional max_angular_velocity, max_angular_acceleration,
+        max_acceleration, max_jerk keys; see ai_llm.motion) and played back
+        every period_ms without further model calls.
+        
+        Args:
+            commands: Validated commands, e.g. from plan_motor_sequence
+            output: Callable output(motor_id, quantity, value) driving the
+                hardware; quantity is "angle" or "speed"
+            motor_status: Starting motor status dictionary
+            profile: "trapezoidal" or "s_curve"
+            period_ms: Control period
+            
+        Returns:
+            Timing/jitter stats dictionary, or None if the sequence was
+            rejected before any motor moved
+        """
+        from ..motion import MotionSequencer
+        
+        sequencer = MotionSequencer(self.motor_config, period_ms, profile)
+        try:
+            sequencer.plan(commands, motor_status)
+        except ValueError as e:
+            print(f"Error in execute_motor_sequence: {e}")
+            return None
+        return sequencer.run(output)
+    
     def optimize_motor_settings(self, task_description, motor_specs=None):
         """
         Get optimized motor settings for a specific task
@@ -1,4 +1,5 @@
 from .base_application import BaseAIApplication
+from ..models import PRIORITY_CONTROL
 import ujson as json
 
 class RobotNavigator(BaseAIApplication):
@@ -6,6 +7,11 @@ class RobotNavigator(BaseAIApplication):
     AI-powered robot navigation and path planning system
     """
     
+    # Sectors per scan summary when reactive control is not enabled
+    scan_sectors = 16
+    # Scans (lists of ranges) shorter than this are passed through as-is
+    scan_min_points = 16
+    
     def __init__(self, ai_client, robot_config=None):
         self.robot_config = robot_config or {
             "robot_type": "mobile_robot",
@@ -16,6 +22,10 @@ class RobotNavigator(BaseAIApplication):
             "safety_distance": 0.2  # meters
         }
         super().__init__(ai_client, temperature=0.2)
+        self.reactive = None
+        self.plan = None
+        self._planning = False
+        self.last_scan = None
     
     def get_default_system_prompt(self):
         return f"""
@@ -70,7 +80,7 @@ Prioritize safety and collision avoidance in all navigation decisions.
             Navigation command with path planning
         """
         context = self.format_navigation_context(sensor_data, current_position)
-        response = self.process_query(user_command, context)
+        response = self.process_query(user_command, context, PRIORITY_CONTROL)
         
         if response:
             try:
@@ -85,19 +95,167 @@ Prioritize safety and collision avoidance in all navigation decisions.
                 }
         return None
     
+    def enable_reactive_control(self, sector_count=16, **options):
+        """
+        Switch to hierarchical control
+        
+        A local reactive layer (see ai_llm.reactive) decides every motion
+        command from sector distances and enforces safety_distance; the LLM
+        only sets the goal, in the background, via request_plan.
+        
+        Args:
+            sector_count: Number of angular sectors the sensors are binned into
+            **options: Further ReactiveController settings
+            
+        Returns:
+            The ReactiveController
+        """
+        from ..reactive import ReactiveController
+        
+        self.reactive = ReactiveController(
+            sector_count,
+            self.robot_config["safety_distance"],
+            self.robot_config["max_speed"],
+            **options
+        )
+        return self.reactive
+    
+    def request_plan(self, user_command, sensor_data=None, current_position=None):
+        """
+        Ask the LLM for a new goal without blocking the control loop
+        
+        Runs on a background thread where _thread is available (otherwise
+        synchronously); the exchange is recorded under the application's
+        history lock, so it cannot interleave with other queries. The
+        reactive goal is updated when the plan arrives; an unparseable
+        plan keeps the previous goal.
+        
+        Returns:
+            False if a plan is already being computed, else True
+        """
+        if self._planning:
+            return False
+        self._planning = True
+        try:
+            import _thread
+            _thread.start_new_thread(self._plan_worker, (user_command, sensor_data, current_position))
+        except ImportError:
+            self._plan_worker(user_command, sensor_data, current_position)
+        return True
+    
+    def _plan_worker(self, user_command, sensor_data, current_position):
+        from ..reactive import goal_from_command
+        
+        try:
+            plan = self.process_navigation_command(user_command, sensor_data, current_position)
+            if plan and "raw_response" not in plan:
+                self.plan = plan
+                goal = goal_from_command(plan)
+                if goal and self.reactive:
+                    self.reactive.set_goal(goal[0], goal[1])
+        except Exception as e:
+            print(f"Error in navigation planning: {e}")
+        finally:
+            self._planning = False
+    
+    def is_planning(self):
+        return self._planning
+    
+    def process_scan(self, ranges, angles=None, **options):
+        """
+        Summarize a range scan into sector minima and obstacle clusters
+        
+        The result is kept as last_scan so planning and reactive control
+        reuse the same structured data.
+        
+        Args:
+            ranges: Distances in meters, in scan order
+            angles: Optional angle of each range (degrees, 0 = ahead,
+                positive = left); default is a full circle from 0°
+            **options: Further ai_llm.scan.process_scan settings
+            
+        Returns:
+            ScanSummary
+        """
+        from ..scan import process_scan
+        
+        sector_count = self.reactive.sector_count if self.reactive else self.scan_sectors
+        options.setdefault("sector_count", sector_count)
+        options.setdefault("max_range", self.reactive.max_range if self.reactive else 8.0)
+        self.last_scan = process_scan(ranges, angles, **options)
+        return self.last_scan
+    
+    def _scan_ranges(self, data):
+        """
+        (ranges, angles) if data is a raw scan, else None
+        """
+        if isinstance(data, dict):
+            ranges = data.get('ranges')
+            angles = data.get('angles')
+        else:
+            ranges = data
+            angles = None
+        if isinstance(ranges, (list, tuple)) and len(ranges) >= self.scan_min_points:
+            return ranges, angles
+        return None
+    
+    def summarize_sensor_data(self, sensor_data):
+        """
+        Copy of sensor_data with raw scans replaced by their summaries
+        """
+        if not isinstance(sensor_data, dict):
+            return sensor_data
+        summarized = {}
+        for sensor, data in sensor_data.items():
+            scan = self._scan_ranges(data)
+            summarized[sensor] = self.process_scan(scan[0], scan[1]).to_dict() if scan else data
+        return summarized
+    
+    def control_scan(self, ranges, angles=None, goal_heading=None):
+        """
+        Reactive motion command straight from a raw scan
+        
+        Returns:
+            Navigation command dict (source "reactive")
+        """
+        return self.reactive.tick(self.process_scan(ranges, angles).sectors, goal_heading)
+    
+    def control_tick(self, sector_distances, goal_heading=None):
+        """
+        Reactive motion command for the current sensor tick
+        
+        Never waits on the network. Call enable_reactive_control first.
+        
+        Args:
+            sector_distances: Minimum distance per sector (meters)
+            goal_heading: Optional heading override, e.g. towards the next
+                waypoint from odometry
+            
+        Returns:
+            Navigation command dict (source "reactive")
+        """
+        return self.reactive.tick(sector_distances, goal_heading)
+    
     def format_navigation_context(self, sensor_data, current_position):
         """
         Format sensor data and position for navigation context
         """
+        if self.context_encoder:
+            sensors = self.summarize_sensor_data(sensor_data)
+            return self.context_encoder.encode({"position": current_position, "sensors": sensors}, "navigation")
+        
         context_lines = []
         
         if current_position:
-            context_lines.append(f"Current Position: {json.dumps(current_position)}")
+            context_lines.append(f"Current Position: {self.encode_context(current_position)}")
         
         if sensor_data:
             context_lines.append("Sensor Data:")
             for sensor, data in sensor_data.items():
-                if isinstance(data, dict):
+                scan = self._scan_ranges(data)
+                if scan:
+                    context_lines.append(f"  {sensor}: {self.process_scan(scan[0], scan[1]).to_text()}")
+                elif isinstance(data, dict):
                     sensor_info = f"  {sensor}: "
                     details = []
                     
@@ -142,9 +300,9 @@ Prioritize safety and collision avoidance in all navigation decisions.
         """
         Plan optimal path from start to target position
         """
-        context = f"Start: {json.dumps(start_position)}\nTarget: {json.dumps(target_position)}"
+        context = f"Start: {self.encode_context(start_position)}\nTarget: {self.encode_context(target_position)}"
         if obstacles:
-            context += f"\nObstacles: {json.dumps(obstacles)}"
+            context += f"\nObstacles: {self.encode_context(obstacles)}"
         
         query = "Plan the optimal path considering robot constraints, obstacles, and safety margins."
         return self.process_query(query, context)
@@ -154,12 +312,12 @@ Prioritize safety and collision avoidance in all navigation decisions.
         Analyze sensor data for navigation decisions
         """
         query = "Analyze this sensor data and provide navigation recommendations including obstacle avoidance strategies."
-        return self.process_query(query, f"Sensor Readings: {json.dumps(sensor_readings)}")
+        return self.process_query(query, f"Sensor Readings: {self.encode_context(self.summarize_sensor_data(sensor_readings))}")
     
     def update_map(self, new_sensor_data, current_position):
         """
         Update internal map with new sensor data
         """
-        context = f"Position: {json.dumps(current_position)}\nNew Sensor Data: {json.dumps(new_sensor_data)}"
+        context = f"Position: {self.encode_context(current_position)}\nNew Sensor Data: {self.encode_context(self.summarize_sensor_data(new_sensor_data))}"
         query = "Update the robot's map with this new sensor data and identify any changes in the environment."
         return self.process_query(query, context)
\ No newline at end of file
@@ -1,5 +1,23 @@
 from .base_application import BaseAIApplication
+from ..models import PRIORITY_CRITICAL
 import ujson as json
+import time
+
+def _words(text):
+    """
+    Lowercase alphanumeric words of a text ("front_door" -> front, door)
+    """
+    words = []
+    word = []
+    for ch in text.lower():
+        if ch.isalpha() or ch.isdigit():
+            word.append(ch)
+        elif word:
+            words.append("".join(word))
+            word = []
+    if word:
+        words.append("".join(word))
+    return words
 
 class SecuritySystem(BaseAIApplication):
     """
@@ -15,6 +33,10 @@ class SecuritySystem(BaseAIApplication):
             "authorized_users": []
         }
         super().__init__(ai_client, temperature=0.1)  # Very low temperature for security
+        self.access_controller = None
+        self.access_commentary = None
+        self.last_access_commentary = None
+        self.incident_store = None
     
     def get_default_system_prompt(self):
         return f"""
@@ -61,23 +83,34 @@ Prioritize safety and security. When in doubt, escalate to higher alert levels.
             Security analysis and response recommendations
         """
         formatted_data = self.format_security_data(sensor_data, event_type)
+        if self.incident_store is not None:
+            zones = []
+            for data in sensor_data.values():
+                if isinstance(data, dict) and data.get('zone') and data['zone'] not in zones:
+                    zones.append(data['zone'])
+            if zones:
+                formatted_data += "\nRecent History:\n" + "\n".join(
+                    [self.incident_store.zone_context(zone) for zone in zones]
+                )
         query = "Analyze this security event data and determine the threat level and appropriate response."
         
-        response = self.process_query(query, formatted_data)
+        response = self.process_query(query, formatted_data, PRIORITY_CRITICAL)
         
         if response:
             try:
-                security_analysis = json.loads(response)
-                return self.validate_security_response(security_analysis)
+                security_analysis = self.validate_security_response(json.loads(response))
             except:
                 # Fallback for critical security situations
-                return {
+                security_analysis = {
                     "threat_level": "medium",
                     "alert_type": "warning",
                     "description": "Security analysis failed - manual review required",
                     "recommended_actions": ["Manual security check", "Review sensor data"],
                     "requires_human_verification": True
                 }
+            if self.incident_store is not None:
+                self.incident_store.add_analysis(security_analysis, sensor_data)
+            return security_analysis
         
         return None
     
@@ -125,21 +158,149 @@ Prioritize safety and security. When in doubt, escalate to higher alert levels.
         
         return security_analysis
     
-    def check_access_control(self, user_id, access_request, biometric_data=None):
+    def enable_local_access_control(self, commentary="anomalies"):
+        """
+        Decide access locally from security_config['authorized_users']
+        
+        Decisions take a hash and a dictionary lookup instead of a model
+        round trip (see ai_llm.access_control). The model is only asked
+        for commentary afterwards, in the background.
+        
+        Args:
+            commentary: "anomalies" (denied requests), "all", or None
+            
+        Returns:
+            The AccessController
+        """
+        from ..access_control import AccessController
+        
+        self.access_controller = AccessController(
+            self.security_config.get("authorized_users", []),
+            self.security_config.get("credential_salt", "")
+        )
+        self.access_commentary = commentary
+        return self.access_controller
+    
+    def check_access_control(self, user_id, access_request, biometric_data=None, credential=None, zone=None):
         """
         Verify user access permissions
+        
+        With local access control enabled, returns a decision dict
+        immediately (granted, user_id, zone, reason, latency_us);
+        otherwise the model is asked and its text is returned.
+        
+        Args:
+            user_id: Claimed user (None to identify by credential)
+            access_request: What is requested, e.g. "unlock entry door"
+            biometric_data: Only used by the model path
+            credential: PIN, card number, etc. (local path)
+            zone: Zone requested (default: access_request's "zone" field,
+                or the one configured zone named in it as whole words;
+                requests naming none, several or an unknown zone are denied)
         """
+        if self.access_controller is not None:
+            if zone is None:
+                zone = self._request_zone(access_request)
+            elif zone not in self.security_config["zones"]:
+                zone = None
+            decision = self.access_controller.check(zone, user_id, credential)
+            if self.access_commentary == "all" or (self.access_commentary and not decision["granted"]):
+                self._start_commentary(decision, access_request)
+            return decision
+        
         context = f"User ID: {user_id}\nAccess Request: {access_request}"
         if biometric_data:
             context += f"\nBiometric Data: {json.dumps(biometric_data)}"
         
         query = "Verify if this user should be granted access based on their credentials and the security context."
-        return self.process_query(query, context)
+        return self.process_query(query, context, PRIORITY_CRITICAL)
+    
+    def _request_zone(self, access_request):
+        zones = self.security_config["zones"]
+        if isinstance(access_request, dict) and "zone" in access_request:
+            zone = access_request["zone"]
+            return zone if zone in zones else None
+        # Whole-word match: "sentry" is not "entry", and a request naming
+        # two zones ("garage entry door") is ambiguous
+        text = " " + " ".join(_words(str(access_request))) + " "
+        found = [zone for zone in zones if " " + " ".join(_words(zone)) + " " in text]
+        return found[0] if len(found) == 1 else None
+    
+    def _start_commentary(self, decision, access_request):
+        try:
+            import _thread
+            _thread.start_new_thread(self.comment_on_access, (decision, access_request))
+        except ImportError:
+            # No background thread: the caller can ask comment_on_access later
+            pass
+    
+    def comment_on_access(self, decision, access_request=None):
+        """
+        Ask the model for anomaly commentary on a local access decision
+        
+        Credentials and biometric data are not sent. Runs outside the
+        conversation history, so it is safe on the background thread
+        check_access_control starts. The result is also kept in
+        last_access_commentary.
+        
+        Returns:
+            Commentary text, or None on error
+        """
+        now = time.localtime()
+        context = (
+            f"Access Request: {access_request}\nDecision: {'granted' if decision['granted'] else 'denied'} "
+            f"({decision['reason']})\nUser ID: {decision['user_id']}\nZone: {decision['zone']}\n"
+            f"Local Time: {now[3]:02d}:{now[4]:02d}, weekday {now[6]}"
+        )
+        query = "This access decision was already made locally. Comment briefly on whether it looks anomalous and what to monitor."
+        self.last_access_commentary = self.process_query_stateless(query, context)
+        return self.last_access_commentary
+    
+    def enable_incident_store(self, partition_seconds=3600, max_partitions=48, **options):
+        """
+        Keep an indexed history of analyzed security events
+        
+        Every analyze_security_event result is recorded (see
+        ai_llm.incidents); event analyses then include each zone's recent
+        history, and reports called without incident_data use the
+        store's aggregates.
+        
+        Returns:
+            The IncidentStore
+        """
+        from ..incidents import IncidentStore
+        
+        self.incident_store = IncidentStore(partition_seconds, max_partitions, **options)
+        return self.incident_store
+    
+    def get_incident_patterns(self, hours=24):
+        """
+        Local pattern check over recorded incidents (no AI call)
+        
+        Returns:
+            IncidentStore.summary() for the last hours, or None if the
+            incident store is not enabled
+        """
+        if self.incident_store is None:
+            return None
+        return self.incident_store.summary(hours)
     
-    def generate_security_report(self, time_period, incident_data):
+    def generate_security_report(self, time_period, incident_data=None, hours=None):
         """
         Generate comprehensive security report
+        
+        Args:
+            time_period: Period description for the report
+            incident_data: Incidents to report on (default: the incident
+                store's aggregates)
+            hours: With the incident store, limit it to the last hours
+            
+        Returns:
+            Report string, or None if there are no incidents to report on
         """
-        context = f"Time Period: {time_period}\nIncident Data: {json.dumps(incident_data)}"
         query = "Generate a comprehensive security report including threat analysis, patterns, and recommendations for improvement."
-        return self.process_query(query, context)
\ No newline at end of file
+        if incident_data is None and self.incident_store is not None:
+            if not len(self.incident_store):
+                return None
+            incident_data = self.incident_store.to_text(hours)
+        return self.process_report(query, incident_data, f"Time Period: {time_period}\nIncident Data:")
\ No newline at end of file
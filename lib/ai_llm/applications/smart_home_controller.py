@@ -1,4 +1,6 @@
 from .base_application import BaseAIApplication
+from ..models import PRIORITY_BULK
+from ..utils import stable_dumps
 import ujson as json
 
 class SmartHomeController(BaseAIApplication):
@@ -19,6 +21,7 @@ class SmartHomeController(BaseAIApplication):
             "energy_saving": True
         }
         super().__init__(ai_client, temperature=0.3)
+        self.rule_engine = None
     
     def get_default_system_prompt(self):
         return f"""
@@ -33,7 +36,7 @@ You are an intelligent smart home automation assistant. Your role is to:
 
 Home Configuration:
 - Rooms: {', '.join(self.home_config['rooms'])}
-- Available Devices: {json.dumps(self.home_config['devices'])}
+- Available Devices: {stable_dumps(self.home_config['devices'])}
 - Energy Saving Mode: {self.home_config['energy_saving']}
 
 RESPONSE FORMAT:
@@ -67,7 +70,7 @@ Prioritize energy efficiency, user comfort, and safety in all recommendations.
         Returns:
             Parsed home automation command
         """
-        context = self.format_home_context(home_status)
+        context = self.format_status_update("home", home_status, self.format_home_context)
         response = self.process_query(user_command, context)
         
         if response:
@@ -89,9 +92,15 @@ Prioritize energy efficiency, user comfort, and safety in all recommendations.
         if not home_status:
             return "No current home status available."
         
+        if self.context_encoder:
+            return self.context_encoder.encode(home_status, "home")
+        
         context_lines = ["Current Home Status:"]
         
         for room, devices in home_status.items():
+            if not isinstance(devices, dict):
+                context_lines.append(f"\n{room.title()}: {devices}")
+                continue
             context_lines.append(f"\n{room.title()}:")
             for device, status in devices.items():
                 if isinstance(status, dict):
@@ -129,24 +138,147 @@ Prioritize energy efficiency, user comfort, and safety in all recommendations.
         
         return command_data
     
-    def get_energy_report(self, usage_data):
+    def get_energy_report(self, usage_data=None):
         """
         Generate energy usage report and recommendations
+        
+        Args:
+            usage_data: Raw usage data, a UsageAggregator, or None for the
+                aggregates collected with record_usage
         """
+        if usage_data is None:
+            usage_data = self.usage_aggregator
         query = "Analyze this energy usage data and provide optimization recommendations for reducing consumption while maintaining comfort."
-        return self.process_query(query, f"Energy Usage Data: {json.dumps(usage_data)}")
+        return self.process_report(query, usage_data, "Energy Usage Data:")
     
     def create_automation_schedule(self, schedule_request):
         """
         Create automation schedules based on user preferences
         """
         query = f"Create a smart home automation schedule for: {schedule_request}. Include optimal timing and energy-efficient settings."
-        return self.process_query(query)
+        return self.process_query(query, priority=PRIORITY_BULK)
+    
+    def enable_rule_engine(self, path=None):
+        """
+        Evaluate automations locally (see ai_llm.rules)
+        
+        Args:
+            path: Optional file the rule set is saved to and loaded from
+            
+        Returns:
+            The RuleEngine
+        """
+        from ..rules import RuleEngine
+        
+        self.rule_engine = RuleEngine(path)
+        if path:
+            self.rule_engine.load()
+        return self.rule_engine
+    
+    def compile_automation_rules(self, schedule_request, home_status=None):
+        """
+        Turn an automation request into local rules with one model call
+        
+        Args:
+            schedule_request: What should be automated
+            home_status: Current home device status (for device names)
+            
+        Returns:
+            List of added rule ids, or None on error. A generated id that
+            is already in use gets a numeric suffix instead of replacing
+            the existing rule.
+        """
+        if self.rule_engine is None:
+            self.enable_rule_engine()
+        context = self.format_home_context(home_status)
+        query = (
+            f"Create automation rules for: {schedule_request}. Respond only with JSON "
+            '{"rules": [{"id": "short_name", '
+            '"trigger": {"source": "room.device", "op": "==|!=|<|<=|>|>=", "value": v} or {"time": "HH:MM"}, '
+            '"conditions": [{"source": "room.device", "op": "...", "value": v} or {"time_between": ["HH:MM", "HH:MM"]}], '
+            '"actions": [{"target": "room.device", "command": "on/off/set", "value": v}]}]}'
+        )
+        # One-shot compilation, so nothing is kept in the conversation history
+        response = self.process_query_stateless(query, context, PRIORITY_BULK)
+        if not response:
+            return None
+        
+        # Tolerate a code fence or prose around the JSON
+        from ..postprocess import StreamPostProcessor, CodeFenceStripper, JsonExtractor
+        text = StreamPostProcessor([CodeFenceStripper(), JsonExtractor()]).process(response)
+        try:
+            data = json.loads(text)
+        except ValueError:
+            print("Error in compile_automation_rules: response is not JSON")
+            return None
+        rules = data.get("rules") if isinstance(data, dict) else data
+        if not isinstance(rules, list):
+            print("Error in compile_automation_rules: no rule list in response")
+            return None
+        
+        engine = self.rule_engine
+        added = []
+        for rule in rules:
+            rule_id = rule.get("id") if isinstance(rule, dict) else None
+            if isinstance(rule_id, str) and rule_id in engine.rules:
+                # Never let a generated rule replace an existing one
+                number = 2
+                while f"{rule_id}_{number}" in engine.rules:
+                    number += 1
+                rule["id"] = f"{rule_id}_{number}"
+            if engine.add_rule(rule):
+                added.append(rule["id"])
+        for rule_id, reason in engine.rejected:
+            print(f"Rule {rule_id} rejected: {reason}")
+        engine.rejected = []
+        if added and engine.path:
+            engine.save()
+        return added
+    
+    def handle_event(self, source, value, minute_of_day=None):
+        """
+        Run the local rules listening to an event, without a model call
+        
+        Args:
+            source: Event source, e.g. "hallway.motion"
+            value: New value
+            minute_of_day: Current time, for time_between conditions
+            
+        Returns:
+            List of validated home commands to execute
+        """
+        if self.rule_engine is None:
+            return []
+        return self._rule_commands(self.rule_engine.evaluate(source, value, minute_of_day))
+    
+    def handle_clock(self, minute_of_day):
+        """
+        Run time-triggered rules; call once per minute
+        
+        Returns:
+            List of validated home commands to execute
+        """
+        if self.rule_engine is None:
+            return []
+        return self._rule_commands(self.rule_engine.clock(minute_of_day))
+    
+    def _rule_commands(self, fired):
+        commands = []
+        for rule_id, action in fired:
+            commands.append(self.validate_home_command({
+                "action": "device_control",
+                "target": action["target"],
+                "command": action["command"],
+                "parameters": {"value": action.get("value")},
+                "explanation": f"Automation rule {rule_id}",
+                "rule": rule_id
+            }))
+        return commands
     
     def get_comfort_optimization(self, preferences, current_conditions):
         """
         Optimize home settings for comfort
         """
-        context = f"User Preferences: {json.dumps(preferences)}\nCurrent Conditions: {json.dumps(current_conditions)}"
+        context = f"User Preferences: {self.encode_context(preferences)}\nCurrent Conditions: {self.encode_context(current_conditions)}"
         query = "Optimize home settings for maximum comfort while considering energy efficiency."
         return self.process_query(query, context)
\ No newline at end of file
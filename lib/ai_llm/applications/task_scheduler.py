@@ -15,6 +15,7 @@ class TaskScheduler(BaseAIApplication):
             "energy_optimization": True
         }
         super().__init__(ai_client, temperature=0.3)
+        self.task_graph = None
     
     def get_default_system_prompt(self):
         return f"""
@@ -93,6 +94,9 @@ Optimize for efficiency, resource utilization, and system performance.
         """
         Format system status and constraints for scheduling context
         """
+        if self.context_encoder:
+            return self.context_encoder.encode({"system": system_status, "constraints": constraints}, "scheduling")
+        
         context_lines = []
         
         if system_status:
@@ -105,7 +109,7 @@ Optimize for efficiency, resource utilization, and system performance.
                     context_lines.append(f"  {component}: {status}")
         
         if constraints:
-            context_lines.append(f"\nScheduling Constraints: {json.dumps(constraints)}")
+            context_lines.append(f"\nScheduling Constraints: {self.encode_context(constraints)}")
         
         return "\n".join(context_lines)
     
@@ -130,15 +134,61 @@ Optimize for efficiency, resource utilization, and system performance.
         """
         Resolve task scheduling conflicts
         """
-        context = f"Conflicting Tasks: {json.dumps(conflicting_tasks)}\nAvailable Resources: {json.dumps(available_resources)}"
+        context = f"Conflicting Tasks: {self.encode_context(conflicting_tasks)}\nAvailable Resources: {self.encode_context(available_resources)}"
         query = "Resolve these task scheduling conflicts by prioritizing, rescheduling, or resource reallocation."
         return self.process_query(query, context)
     
-    def adapt_schedule(self, current_schedule, new_conditions):
+    def enable_incremental_scheduling(self, tasks=()):
+        """
+        Hold the schedule locally as a dependency graph
+        
+        adapt_schedule then applies structured changes to the graph and
+        recomputes start times only for the affected tasks (see
+        ai_llm.task_graph); the model only sees the resulting changes,
+        and only when an explanation is requested.
+        
+        Args:
+            tasks: Task dicts (task_id, estimated_duration in minutes,
+                dependencies, resource_requirements, earliest_start)
+            
+        Returns:
+            The TaskGraph
+        """
+        from ..task_graph import TaskGraph
+        
+        self.task_graph = TaskGraph(tasks)
+        return self.task_graph
+    
+    def adapt_schedule(self, current_schedule, new_conditions, explain=False):
         """
         Adapt existing schedule to new conditions
+        
+        With incremental scheduling enabled and new_conditions given as a
+        dict of changes (see TaskGraph.apply), current_schedule is not
+        needed and the result is a dict: changes (per task start/end),
+        unhandled condition keys, and an explanation when explain is
+        True. A condition naming an unknown task or adding an invalid one
+        leaves the graph untouched and yields {"error": message}.
+        Otherwise the model adapts the whole schedule.
         """
-        context = f"Current Schedule: {json.dumps(current_schedule)}\nNew Conditions: {json.dumps(new_conditions)}"
+        if self.task_graph is not None and isinstance(new_conditions, dict):
+            try:
+                unhandled = self.task_graph.apply(new_conditions)
+                changes = self.task_graph.reschedule()
+            except KeyError as e:
+                return {"error": f"Unknown task: {e.args[0]}"}
+            except ValueError as e:
+                return {"error": str(e)}
+            result = {"changes": changes, "unhandled": unhandled, "explanation": None}
+            if explain and changes:
+                context = f"Schedule Changes (minutes): {self.encode_context(changes)}\nNew Conditions: {self.encode_context(new_conditions)}"
+                query = "These schedule changes were computed locally. Explain them briefly and flag any that need attention."
+                result["explanation"] = self.process_query(query, context)
+            return result
+        
+        if current_schedule is None and self.task_graph is not None:
+            current_schedule = self.task_graph.to_list()
+        context = f"Current Schedule: {self.encode_context(current_schedule)}\nNew Conditions: {self.encode_context(new_conditions)}"
         query = "Adapt the current schedule to accommodate these new conditions while maintaining efficiency."
         return self.process_query(query, context)
     
@@ -146,6 +196,6 @@ Optimize for efficiency, resource utilization, and system performance.
         """
         Generate comprehensive scheduling performance report
         """
-        context = f"Time Period: {time_period}\nCompleted Tasks: {json.dumps(completed_tasks)}\nPerformance: {json.dumps(performance_metrics)}"
+        header = f"Time Period: {time_period}\nPerformance: {self.encode_context(performance_metrics)}\nCompleted Tasks:"
         query = "Generate a comprehensive report on scheduling performance, efficiency, and recommendations for improvement."
-        return self.process_query(query, context)
\ No newline at end of file
+        return self.process_report(query, completed_tasks, header)
\ No newline at end of file
@@ -1,14 +1,21 @@
 from .base_application import BaseAIApplication
 import ujson as json
+import time
 
 class WeatherAnalyzer(BaseAIApplication):
     """
     AI-powered weather sensor data analyzer
     """
     
+    # Samples kept per channel by record_reading
+    history_capacity = 1440
+    # Points per channel sent by analyze_trends, whatever the window length
+    series_points = 24
+    
     def __init__(self, ai_client, location="Unknown", units="metric"):
         self.location = location
         self.units = units
+        self.history = {}
         super().__init__(ai_client, temperature=0.3)  # Lower temperature for more consistent analysis
     
     def get_default_system_prompt(self):
@@ -54,6 +61,9 @@ Respond in a concise, actionable format suitable for IoT device displays.
         """
         Format sensor data for AI analysis
         """
+        if self.context_encoder:
+            return self.context_encoder.encode(sensor_data, "weather")
+        
         formatted = []
         
         # Temperature data
@@ -90,6 +100,105 @@ Respond in a concise, actionable format suitable for IoT device displays.
         
         return "\n".join(formatted)
     
+    def get_unit(self, channel):
+        """
+        Display unit for a known sensor channel ("" if unknown)
+        """
+        metric = self.units == "metric"
+        units = {
+            'temperature': "°C" if metric else "°F",
+            'humidity': "%",
+            'pressure': "hPa" if metric else "inHg",
+            'wind_speed': "m/s" if metric else "mph",
+            'wind_direction': "°"
+        }
+        return units.get(channel, "")
+    
+    def record_reading(self, sensor_data, timestamp=None):
+        """
+        Add a reading to the per-channel history
+        
+        Args:
+            sensor_data: Dictionary with sensor readings; non-numeric
+                values are skipped
+            timestamp: Reading time in seconds (default: sensor_data's
+                numeric 'timestamp', else the current time)
+        """
+        from ..timeseries import SeriesBuffer
+        
+        if timestamp is None:
+            timestamp = sensor_data.get('timestamp')
+            if not isinstance(timestamp, (int, float)):
+                timestamp = time.time()
+        for channel, value in sensor_data.items():
+            if channel == 'timestamp' or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            buffer = self.history.get(channel)
+            if buffer is None:
+                buffer = SeriesBuffer(self.history_capacity)
+                self.history[channel] = buffer
+            buffer.append(timestamp, value)
+    
+    def format_series(self, points=None, method="lttb", channels=None):
+        """
+        Format the recorded history as downsampled series
+        
+        Args:
+            points: Points per channel (default: series_points)
+            method: "lttb" (shape) or "minmax" (keeps spikes)
+            channels: Channel names to include (default: all)
+            
+        Returns:
+            One line per channel: summary, then minute:value pairs
+        """
+        from ..timeseries import downsample
+        from ..utils import format_number
+        
+        points = points or self.series_points
+        lines = []
+        for channel in channels or sorted(self.history):
+            buffer = self.history.get(channel)
+            if not buffer:
+                continue
+            times, values = buffer.series()
+            kept_times, kept_values = downsample(times, values, points, method)
+            start = kept_times[0]
+            span = (kept_times[-1] - start) / 60
+            samples = " ".join([f"{format_number((t - start) / 60)}:{format_number(v)}" for t, v in zip(kept_times, kept_values)])
+            lines.append(
+                f"{channel} [{self.get_unit(channel)}] n={len(values)} span={format_number(span)}min "
+                f"min={format_number(min(values))} max={format_number(max(values))} last={format_number(values[-1])}: {samples}"
+            )
+        return "\n".join(lines)
+    
+    def analyze_trends(self, query=None, points=None, method="lttb", channels=None):
+        """
+        Analyze trends over the recorded history
+        
+        Args:
+            query: Optional specific question about the trends
+            points: Points per channel (default: series_points)
+            method: "lttb" or "minmax"
+            channels: Channel names to include (default: all)
+            
+        Returns:
+            Analysis and recommendations, or None if no readings have
+            been recorded (the model is not called)
+        """
+        series = self.format_series(points, method, channels)
+        if not series:
+            return None
+        if not query:
+            query = "Analyze the trends in this weather history and provide insights, forecasts and recommendations."
+        context = "Sensor history (minutes since window start:value):\n" + series
+        return self.process_query(query, context)
+    
+    def clear_readings(self):
+        """
+        Clear the recorded sensor history (conversation history is kept)
+        """
+        self.history = {}
+    
     def get_irrigation_recommendation(self, sensor_data, crop_type="general"):
         """
         Get irrigation recommendations based on weather data
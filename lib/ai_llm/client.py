@@ -1,15 +1,29 @@
 import urequests as requests
 import ujson as json
+import sys
 import time
 from .models import ChatMessage, ChatResponse, ModelConfig
-from .utils import format_prompt, validate_response
+from .utils import format_prompt, validate_response, get_header
+
+# Optional subsystems (tokens, singleflight, rate_limiter, compression) are
+# imported when a client first needs them, not when the module loads
+_MICROPYTHON = sys.implementation.name == "micropython"
 
 class AIClient:
     """
     Main client class for interacting with AI/LLM APIs
     """
     
-    def __init__(self, api_key=None, base_url=None, model_config=None):
+    max_retries = 2
+    # Request bodies smaller than this are sent uncompressed
+    compress_min_bytes = 512
+    # Window for request compression (2**bits bytes of RAM); responses
+    # need a 32 KB window since the server picks its own, so on
+    # MicroPython they are only requested with accept_encoding=True
+    compress_window_bits = 10
+    
+    def __init__(self, api_key=None, base_url=None, model_config=None, coalesce=True,
+                 rate_limiter=None, accept_encoding=None, compress_requests=None):
         self.api_key = api_key
         self.base_url = base_url or "https://api.openai.com/v1"
         self.model_config = model_config or ModelConfig()
@@ -17,57 +31,227 @@ class AIClient:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}" if self.api_key else None
         }
+        # Ask for compressed responses when this port can decode them. The
+        # server picks the window (usually 32 KB), more RAM than a small
+        # board can spare, so MicroPython ports only opt in explicitly
+        if accept_encoding is None:
+            accept_encoding = not _MICROPYTHON
+        self._codec = None
+        if accept_encoding or compress_requests:
+            from . import compression
+            self._codec = compression
+            if accept_encoding and compression.can_decompress():
+                self.session_headers["Accept-Encoding"] = "gzip, deflate"
+        # "gzip"/"deflate" to compress request bodies; only for endpoints
+        # that accept a Content-Encoding on requests
+        if compress_requests and not self._codec.can_compress():
+            print("Request compression is not available on this port")
+            compress_requests = None
+        self.compress_requests = compress_requests
+        self.usage_stats = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0
+        }
+        self.transfer_stats = {
+            "request_bytes": 0,
+            "request_wire_bytes": 0,
+            "response_bytes": 0,
+            "response_wire_bytes": 0
+        }
+        # Identical concurrent requests share one HTTP call
+        self.single_flight = None
+        self.async_single_flight = None
+        if coalesce:
+            from .singleflight import SingleFlight, AsyncSingleFlight
+            self.single_flight = SingleFlight()
+            self.async_single_flight = AsyncSingleFlight()
+        # Learns RPM/TPM limits from response headers; pass False to disable
+        if rate_limiter is None:
+            from .rate_limiter import RateLimiter
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
     
-    def chat_completion(self, messages, stream=False):
+    def chat_completion(self, messages, stream=False, temperature=None):
         """
         Send a chat completion request to the AI API
         
+        Concurrent calls with an identical payload are coalesced into one
+        request; every caller gets the same response (or error).
+        
         Args:
             messages: List of ChatMessage objects or dict messages
             stream: Whether to stream the response (default: False)
+            temperature: Override model_config.temperature for this request
             
         Returns:
             ChatResponse object
         """
         try:
-            # Format messages
-            formatted_messages = []
-            for msg in messages:
-                if isinstance(msg, ChatMessage):
-                    formatted_messages.append(msg.to_dict())
-                else:
-                    formatted_messages.append(msg)
-            
-            # Prepare request payload
-            payload = {
-                "model": self.model_config.model_name,
-                "messages": formatted_messages,
-                "max_tokens": self.model_config.max_tokens,
-                "temperature": self.model_config.temperature,
-                "stream": stream
-            }
-            
-            # Make request
-            url = f"{self.base_url}/chat/completions"
-            response = requests.post(
-                url,
-                headers=self.session_headers,
-                data=json.dumps(payload)
-            )
+            request = self._prepare_request(messages, stream, temperature)
+            if request is None:
+                return None
+            url, data, cost = request
             
-            if response.status_code == 200:
-                response_data = response.json()
-                return ChatResponse.from_api_response(response_data)
-            else:
-                raise Exception(f"API Error: {response.status_code} - {response.text}")
+            if self.single_flight:
+                return self.single_flight.do(data, lambda: self._post(url, data, cost))
+            return self._post(url, data, cost)
                 
         except Exception as e:
             print(f"Error in chat_completion: {e}")
             return None
-        finally:
-            if 'response' in locals():
+    
+    async def chat_completion_async(self, messages, stream=False, temperature=None):
+        """
+        Coroutine variant of chat_completion for asyncio/uasyncio callers
+        
+        Identical payloads awaited concurrently share one request. On
+        CPython the blocking HTTP call runs in the default executor.
+        """
+        try:
+            request = self._prepare_request(messages, stream, temperature)
+            if request is None:
+                return None
+            url, data, cost = request
+            
+            if self.async_single_flight:
+                return await self.async_single_flight.do(data, lambda: self._post_async(url, data, cost))
+            return await self._post_async(url, data, cost)
+        
+        except Exception as e:
+            print(f"Error in chat_completion: {e}")
+            return None
+    
+    def _prepare_request(self, messages, stream=False, temperature=None):
+        """
+        Build the request URL and JSON body
+        
+        Returns:
+            (url, data, cost) tuple, where cost is the estimated token
+            charge (prompt plus max_tokens), or None if the request cannot
+            be sent
+        """
+        # Format messages
+        formatted_messages = []
+        for msg in messages:
+            if isinstance(msg, ChatMessage):
+                formatted_messages.append(msg.to_dict())
+            else:
+                formatted_messages.append(msg)
+        
+        from .tokens import estimate_message_tokens
+        prompt_tokens = estimate_message_tokens(formatted_messages)
+        max_tokens = self.fit_max_tokens(formatted_messages, prompt_tokens)
+        if max_tokens is None:
+            return None
+        
+        # Prepare request payload
+        payload = {
+            "model": self.model_config.model_name,
+            "messages": formatted_messages,
+            "max_tokens": max_tokens,
+            "temperature": self.model_config.temperature if temperature is None else temperature,
+            "stream": stream
+        }
+        
+        url = f"{self.base_url}/chat/completions"
+        return url, json.dumps(payload), prompt_tokens + max_tokens
+    
+    def _post(self, url, data, cost=0):
+        """
+        Send a prepared request and parse the response
+        
+        With a rate limiter the request first waits for RPM/TPM budget; a
+        429 pauses the limiter for the server's retry period and the
+        request is retried up to max_retries times.
+        
+        Raises:
+            Exception: on non-200 responses
+        """
+        limiter = self.rate_limiter
+        headers, body = self._encode_body(data)
+        attempt = 0
+        while True:
+            reserved = limiter.reserve(cost) if limiter else 0
+            settled = False
+            try:
+                response = requests.post(
+                    url,
+                    headers=headers,
+                    data=body
+                )
+            except Exception:
+                if limiter:
+                    limiter.release(reserved)
+                raise
+            try:
+                response_headers = getattr(response, "headers", None)
+                if response.status_code == 200:
+                    response_data = json.loads(self._decode_body(response, response_headers))
+                    chat_response = ChatResponse.from_api_response(response_data)
+                    self._record_usage(chat_response)
+                    if limiter:
+                        limiter.update_from_headers(response_headers)
+                        usage = chat_response.usage or {}
+                        limiter.reconcile(reserved, usage.get("total_tokens"))
+                    settled = True
+                    return chat_response
+                elif response.status_code == 429 and limiter and attempt < self.max_retries:
+                    delay = limiter.throttled(response_headers)
+                    print(f"Rate limited, retrying in {delay} ms")
+                    attempt += 1
+                else:
+                    raise Exception(f"API Error: {response.status_code} - {response.text}")
+            finally:
+                # Failed and retried requests give their token reservation back
+                if limiter and not settled:
+                    limiter.release(reserved)
                 response.close()
     
+    def _encode_body(self, data):
+        """
+        Encode and optionally compress a request body
+        
+        Returns:
+            (headers, body) to send
+        """
+        body = data.encode() if isinstance(data, str) else data
+        stats = self.transfer_stats
+        stats["request_bytes"] += len(body)
+        headers = self.session_headers
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            body = self._codec.compress(body, self.compress_requests, self.compress_window_bits)
+            headers = dict(headers)
+            headers["Content-Encoding"] = self.compress_requests
+        stats["request_wire_bytes"] += len(body)
+        return headers, body
+    
+    def _decode_body(self, response, response_headers):
+        """
+        Read a response body, decompressing it if the server encoded it
+        """
+        raw = response.content
+        stats = self.transfer_stats
+        stats["response_wire_bytes"] += len(raw)
+        encoding = get_header(response_headers, "content-encoding")
+        # HTTP stacks that already decoded the body leave the header in
+        # place, so only decompress what does not look like JSON
+        codec = self._codec
+        if codec and encoding in codec.ENCODINGS and raw[:1] not in (b"{", b"["):
+            raw = codec.decompress(raw, encoding)
+        stats["response_bytes"] += len(raw)
+        return raw
+    
+    async def _post_async(self, url, data, cost=0):
+        try:
+            import asyncio
+            loop = asyncio.get_running_loop()
+        except (ImportError, AttributeError):
+            # uasyncio has no executor; the request blocks the loop
+            return self._post(url, data, cost)
+        return await loop.run_in_executor(None, self._post, url, data, cost)
+    
     def simple_chat(self, prompt, system_message=None):
         """
         Simple chat interface for single prompts
@@ -92,6 +276,99 @@ class AIClient:
             return response.choices[0].message.content
         return None
     
+    def fit_max_tokens(self, formatted_messages, prompt_tokens=None):
+        """
+        Check the request fits the model's context window
+        
+        Shrinks max_tokens when prompt plus completion would overflow, so
+        the server does not reject or truncate the request.
+        
+        Args:
+            formatted_messages: Message dicts
+            prompt_tokens: Precomputed estimate of the prompt size
+        
+        Returns:
+            max_tokens to send, or None if the prompt alone is too large
+        """
+        max_tokens = self.model_config.max_tokens
+        window = self.model_config.get_context_window()
+        if not window:
+            return max_tokens
+        
+        if prompt_tokens is None:
+            from .tokens import estimate_message_tokens
+            prompt_tokens = estimate_message_tokens(formatted_messages)
+        available = window - prompt_tokens
+        if available <= 0:
+            print(f"Error in chat_completion: prompt (~{prompt_tokens} tokens) exceeds context window ({window})")
+            return None
+        return min(max_tokens, available)
+    
+    def _record_usage(self, chat_response):
+        """
+        Accumulate token usage, including prompt-cache hits, from a response
+        """
+        stats = self.usage_stats
+        stats["requests"] += 1
+        stats["prompt_tokens"] += chat_response.get_prompt_tokens()
+        stats["cached_tokens"] += chat_response.get_cached_tokens()
+        if chat_response.usage:
+            stats["completion_tokens"] += chat_response.usage.get("completion_tokens", 0) or 0
+    
+    def get_usage_stats(self):
+        """
+        Get cumulative token usage for this client
+        
+        Returns:
+            Dictionary with request/token counters and the fraction of
+            prompt tokens that were served from the provider's cache
+        """
+        stats = dict(self.usage_stats)
+        if stats["prompt_tokens"]:
+            stats["cache_hit_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"]
+        else:
+            stats["cache_hit_ratio"] = 0.0
+        return stats
+    
+    def get_coalescing_stats(self):
+        """
+        Get single-flight counters (threaded and async paths combined)
+        
+        Returns:
+            Dictionary with calls, executed and coalesced counts
+        """
+        stats = {"calls": 0, "executed": 0, "coalesced": 0}
+        for group in (self.single_flight, self.async_single_flight):
+            if group:
+                for key in stats:
+                    stats[key] += group.stats[key]
+        return stats
+    
+    def get_transfer_stats(self):
+        """
+        Get body sizes before and after compression
+        
+        Returns:
+            Dictionary with request/response payload and on-the-wire byte
+            counts, plus the overall fraction of bytes saved
+        """
+        stats = dict(self.transfer_stats)
+        payload = stats["request_bytes"] + stats["response_bytes"]
+        wire = stats["request_wire_bytes"] + stats["response_wire_bytes"]
+        stats["saved_ratio"] = 1 - wire / payload if payload else 0.0
+        return stats
+    
+    def get_rate_limit_stats(self):
+        """
+        Get rate limiter counters and the limits learned from headers
+        
+        Returns:
+            Dictionary, or None when rate limiting is disabled
+        """
+        if not self.rate_limiter:
+            return None
+        return self.rate_limiter.get_stats()
+    
     def set_model_config(self, model_config):
         """
         Update model configuration
@@ -0,0 +1,108 @@
+"""
+HTTP body compression (gzip / deflate)
+
+Uses CPython's zlib, MicroPython's deflate module (v1.21+) or the older
+uzlib (decompression only), whichever is present. The window size is a
+parameter so a device can bound the RAM the codec needs: 2**window_bits
+bytes, i.e. 1 KB at window_bits=10 instead of 32 KB at 15.
+"""
+
+import io
+
+try:
+    import zlib
+    _backend = "zlib" if hasattr(zlib, "compressobj") else None
+except ImportError:
+    zlib = None
+    _backend = None
+
+if _backend is None:
+    try:
+        import deflate
+        _backend = "deflate"
+    except ImportError:
+        try:
+            import uzlib
+            _backend = "uzlib"
+        except ImportError:
+            pass
+
+ENCODINGS = ("gzip", "deflate")
+CHUNK_SIZE = 512
+
+def _zlib_wbits(encoding, window_bits):
+    # gzip adds 16 to wbits; HTTP "deflate" is the zlib-wrapped format
+    return 16 + window_bits if encoding == "gzip" else window_bits
+
+def can_decompress():
+    return _backend is not None
+
+def can_compress():
+    if _backend == "deflate":
+        return hasattr(deflate.DeflateIO, "write")
+    return _backend == "zlib"
+
+def compress(data, encoding="gzip", window_bits=10, level=6):
+    """
+    Compress a request body
+
+    Args:
+        data: bytes
+        encoding: "gzip" or "deflate"
+        window_bits: 9-15; smaller uses less RAM at some cost in ratio
+
+    Returns:
+        Compressed bytes
+
+    Raises:
+        ValueError: if no compressor is available or the encoding is unknown
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    if _backend == "zlib":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, _zlib_wbits(encoding, window_bits))
+        return compressor.compress(data) + compressor.flush()
+    if can_compress():
+        out = io.BytesIO()
+        fmt = deflate.GZIP if encoding == "gzip" else deflate.ZLIB
+        writer = deflate.DeflateIO(out, fmt, window_bits)
+        writer.write(data)
+        writer.close()
+        return out.getvalue()
+    raise ValueError("No compressor available on this port")
+
+def decompress(data, encoding, window_bits=15):
+    """
+    Decompress a response body chunk by chunk
+
+    Args:
+        data: Compressed bytes
+        encoding: "gzip" or "deflate"
+        window_bits: Largest window the sender may have used
+
+    Returns:
+        Decompressed bytes
+
+    Raises:
+        ValueError: if no decompressor is available or the encoding is unknown
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    if _backend == "zlib":
+        decompressor = zlib.decompressobj(_zlib_wbits(encoding, window_bits))
+        return decompressor.decompress(data) + decompressor.flush()
+    source = io.BytesIO(data)
+    if _backend == "deflate":
+        fmt = deflate.GZIP if encoding == "gzip" else deflate.ZLIB
+        reader = deflate.DeflateIO(source, fmt, window_bits)
+    elif _backend == "uzlib":
+        reader = uzlib.DecompIO(source, _zlib_wbits(encoding, window_bits))
+    else:
+        raise ValueError("No decompressor available on this port")
+    chunks = []
+    while True:
+        chunk = reader.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -0,0 +1,218 @@
+"""
+Compact context encoding for prompts
+
+Turns nested status dictionaries into a terse key=value table with
+abbreviated keys and numbers rounded to sensor precision, optionally
+sending only the entries that changed since the previous call.
+"""
+
+DEFAULT_ABBREVIATIONS = {
+    "temperature": "temp",
+    "humidity": "hum",
+    "pressure": "pres",
+    "brightness": "bri",
+    "color_temp": "ct",
+    "rgb_color": "rgb",
+    "status": "st",
+    "running": "run",
+    "speed": "spd",
+    "angle": "ang",
+    "distance": "dist",
+    "direction": "dir",
+    "battery": "bat",
+    "level": "lvl",
+    "charging": "chg",
+    "timestamp": "ts",
+    "living_room": "lr",
+    "bedroom": "bed",
+    "kitchen": "kit",
+    "bathroom": "bath",
+    "outdoor": "out",
+    "thermostat": "tstat",
+    "main_light": "main",
+    "accent_lights": "accent"
+}
+
+# Decimal places worth sending per (unabbreviated) key
+DEFAULT_PRECISION = {
+    "temperature": 1,
+    "humidity": 0,
+    "pressure": 1,
+    "brightness": 0,
+    "color_temp": 0,
+    "speed": 1,
+    "angle": 0,
+    "distance": 2,
+    "level": 0,
+    "wind_speed": 1,
+    "wind_direction": 0
+}
+
+REMOVED = "-"
+
+class CompactContextEncoder:
+    """
+    Encodes structured context into a compact, token-cheap table
+
+    Output has one line per leaf parent, e.g.::
+
+        @full home
+        lr.main: on=1 bri=80
+        kit.tstat: temp=21.5
+
+    With delta encoding enabled, later calls for the same label only list
+    keys whose encoded value changed; removed keys are sent as ``key=-``.
+    Every full_snapshot_every calls per label the full table is sent
+    again, so a baseline stays inside the history window the model sees
+    (applications set this from their window; 4 otherwise). emitted maps
+    each label to whether its last delta-mode encode was a full snapshot.
+    """
+
+    def __init__(self, abbreviations=None, precision=None, default_precision=2, delta=False,
+                 full_snapshot_every=None):
+        self.abbreviations = DEFAULT_ABBREVIATIONS if abbreviations is None else abbreviations
+        self.precision = DEFAULT_PRECISION if precision is None else precision
+        self.default_precision = default_precision
+        self.delta = delta
+        self.full_snapshot_every = full_snapshot_every
+        self._previous = {}
+        self._calls = {}
+        self.emitted = {}
+
+    def abbreviate(self, key):
+        key = str(key)
+        return self.abbreviations.get(key, key)
+
+    def format_value(self, key, value):
+        """
+        Encode a single leaf value
+        """
+        if value is None:
+            return REMOVED
+        if value is True:
+            return "1"
+        if value is False:
+            return "0"
+        if isinstance(value, float):
+            places = self.precision.get(key, self.default_precision)
+            if places <= 0:
+                return str(int(round(value)))
+            text = ("%." + str(places) + "f") % value
+            text = text.rstrip("0").rstrip(".")
+            return text if text not in ("", "-0") else "0"
+        if isinstance(value, (list, tuple)):
+            return "|".join([self.format_value(key, item) for item in value])
+        if isinstance(value, dict):
+            return ",".join([f"{self.abbreviate(k)}:{self.format_value(k, v)}" for k, v in value.items()])
+        return str(value).replace("\n", " ")
+
+    def flatten(self, data, prefix="", out=None):
+        """
+        Flatten nested dictionaries to {path: encoded_value}
+
+        Paths use abbreviated keys joined with '.'.
+        """
+        if out is None:
+            out = {}
+        if isinstance(data, (list, tuple)) and data and isinstance(data[0], dict):
+            # Lists of records are keyed by position
+            data = dict(enumerate(data))
+        elif not isinstance(data, dict):
+            out[prefix or "value"] = self.format_value(prefix, data)
+            return out
+
+        for key, value in data.items():
+            path = self.abbreviate(key)
+            if prefix:
+                path = prefix + "." + path
+            if value and (isinstance(value, dict) or
+                          (isinstance(value, (list, tuple)) and isinstance(value[0], dict))):
+                self.flatten(value, path, out)
+            else:
+                out[path] = self.format_value(key, value)
+        return out
+
+    def encode(self, data, label="ctx", delta=None):
+        """
+        Encode data as a compact table
+
+        Args:
+            data: Nested dictionary (or scalar) to encode
+            label: Namespace for delta tracking; use one label per kind of context
+            delta: Override the encoder's delta setting for this call
+
+        Returns:
+            Encoded string
+        """
+        flat = self.flatten(data)
+        use_delta = self.delta if delta is None else delta
+        previous = self._previous.get(label) if use_delta else None
+
+        if use_delta:
+            calls = self._calls.get(label, 0)
+            if previous is None or calls + 1 >= (self.full_snapshot_every or 4):
+                previous = None
+                calls = 0
+            else:
+                calls += 1
+            self._calls[label] = calls
+            self._previous[label] = flat
+            self.emitted[label] = previous is None
+
+        if previous is None:
+            return self._render(f"@full {label}", flat)
+
+        changed = {}
+        for path, value in flat.items():
+            if previous.get(path) != value:
+                changed[path] = value
+        for path in previous:
+            if path not in flat:
+                changed[path] = REMOVED
+
+        if not changed:
+            return f"@delta {label} unchanged"
+        return self._render(f"@delta {label}", changed)
+
+    def _render(self, header, flat):
+        lines = [header]
+        groups = {}
+        order = []
+        for path, value in flat.items():
+            cut = path.rfind(".")
+            parent = path[:cut] if cut > 0 else ""
+            leaf = path[cut + 1:] if cut > 0 else path
+            if parent not in groups:
+                groups[parent] = []
+                order.append(parent)
+            groups[parent].append(f"{leaf}={value}")
+
+        for parent in order:
+            fields = " ".join(groups[parent])
+            lines.append(f"{parent}: {fields}" if parent else fields)
+        return "\n".join(lines)
+
+    def legend(self):
+        """
+        Describe the encoding for the system prompt
+
+        The legend depends only on the abbreviation table, so it is stable
+        across requests and does not disturb prefix caching.
+        """
+        pairs = ",".join([f"{short}={full}" for full, short in sorted(self.abbreviations.items())])
+        return (
+            "\n\nContext data uses a compact format: '@full' lists the complete state, "
+            "'@delta' lists only values changed since the previous message "
+            f"(key=- means removed). Booleans are 1/0. Abbreviations: {pairs}\n"
+        )
+
+    def reset(self, label=None):
+        """
+        Forget previous context so the next encode sends a full snapshot
+        """
+        if label is None:
+            self._previous = {}
+            self._calls = {}
+        else:
+            self._previous.pop(label, None)
+            self._calls.pop(label, None)
@@ -0,0 +1,305 @@
+"""
+Gateway serving a fleet of devices from one shared AIClient (CPython)
+
+Devices connect with ai_llm.gateway_client.GatewayClient. The gateway
+owns the API key, connection reuse, rate limiting and a response cache,
+so every device benefits from requests the others already made.
+
+Run with:
+    client = AIClient(api_key=KEY)
+    asyncio.run(GatewayServer(RequestScheduler(client), token=SHARED_TOKEN).serve_forever())
+
+Every connection must open with a hello frame carrying the shared token.
+Only the query/analysis methods listed in EXPOSED_METHODS can be run
+remotely; nothing that enables subsystems, changes configuration or
+takes a filesystem path.
+"""
+
+import asyncio
+import hmac
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .gateway_client import pack_frame, DEFAULT_PORT, MAX_FRAME
+from .singleflight import AsyncSingleFlight
+from .utils import stable_dumps
+from .models import ChatMessage, ModelConfig
+from . import applications
+
+# Methods each application exposes through the "app" op
+_COMMON_METHODS = ("process_query", "clear_history")
+EXPOSED_METHODS = {
+    "WeatherAnalyzer": ("analyze_sensor_data", "record_reading", "analyze_trends",
+                        "get_irrigation_recommendation", "get_hvac_recommendation", "detect_weather_alerts"),
+    "MotorController": ("process_motor_command", "get_motor_sequence", "plan_motor_sequence",
+                        "optimize_motor_settings"),
+    "SmartHomeController": ("process_home_command", "get_energy_report", "create_automation_schedule",
+                            "get_comfort_optimization"),
+    "SecuritySystem": ("analyze_security_event", "check_access_control", "generate_security_report",
+                       "get_incident_patterns"),
+    "LightingController": ("process_lighting_command", "create_circadian_schedule", "analyze_lighting_usage",
+                           "suggest_lighting_scene"),
+    "RobotNavigator": ("process_navigation_command", "plan_path", "analyze_sensor_data", "update_map"),
+    "TaskScheduler": ("create_task_schedule", "handle_task_conflict", "adapt_schedule",
+                      "generate_schedule_report")
+}
+
+class _SessionClient:
+    """
+    Per-session view of the shared client
+
+    Each session gets its own ModelConfig, and its temperature is sent
+    with every request instead of changing the shared client's.
+    """
+
+    def __init__(self, ai_client):
+        self.ai_client = ai_client
+        shared = ai_client.model_config
+        self.model_config = ModelConfig(shared.model_name, shared.max_tokens, shared.temperature,
+                                        shared.top_p, shared.context_window)
+        self.supports_priority = getattr(ai_client, "supports_priority", False)
+
+    def chat_completion(self, messages, stream=False, priority=None, deadline_ms=None, temperature=None):
+        if temperature is None:
+            temperature = self.model_config.temperature
+        if self.supports_priority:
+            return self.ai_client.chat_completion(messages, stream, priority=priority, deadline_ms=deadline_ms,
+                                                  temperature=temperature)
+        return self.ai_client.chat_completion(messages, stream, temperature=temperature)
+
+    def simple_chat(self, prompt, system_message=None, priority=None):
+        messages = []
+        if system_message:
+            messages.append(ChatMessage("system", system_message))
+        messages.append(ChatMessage("user", prompt))
+        response = self.chat_completion(messages, priority=priority)
+        if response and response.choices:
+            return response.choices[0].message.content
+        return None
+
+class _Session:
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+
+class GatewayServer:
+    """
+    asyncio TCP server speaking the length-prefixed JSON protocol
+
+    Operations:
+        {"op": "hello", "token": t} -> "ok"; must be the first frame
+        {"op": "chat", "messages": [...], "priority": p, "deadline_ms": d,
+         "temperature": t} -> API-shaped chat response dict
+        {"op": "app", "device": id, "app": name, "method": m, "args": [...]}
+            -> the method's return value (EXPOSED_METHODS only)
+        {"op": "ping"} -> "pong"
+
+    Blocking client calls run on a thread pool. Identical chat requests
+    (same model, temperature and messages) in flight are coalesced and
+    recent ones are answered from an LRU cache; application instances are kept per (device, app) up to
+    max_sessions, least recently used first out.
+    """
+
+    def __init__(self, ai_client, token, host="127.0.0.1", port=DEFAULT_PORT, cache_size=1024,
+                 cache_ttl=300, max_workers=32, max_sessions=4096):
+        if not token:
+            raise ValueError("A shared gateway token is required")
+        self.ai_client = ai_client
+        self.token = token
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.max_sessions = max_sessions
+        self.single_flight = AsyncSingleFlight()
+        self.stats = {
+            "connections": 0,
+            "active_connections": 0,
+            "requests": 0,
+            "cache_hits": 0,
+            "errors": 0,
+            "rejected": 0
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._cache = OrderedDict()
+        self._sessions = OrderedDict()
+        self._server = None
+
+    async def start(self):
+        """
+        Start listening; returns the asyncio server
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        self.stats["active_connections"] += 1
+        try:
+            authenticated = False
+            while True:
+                (length,) = struct.unpack(">I", await reader.readexactly(4))
+                if length > MAX_FRAME:
+                    writer.write(pack_frame({"ok": False, "error": "Frame too large"}))
+                    break
+                body = await reader.readexactly(length)
+                if not authenticated:
+                    authenticated = self._authenticate(body)
+                    if not authenticated:
+                        self.stats["rejected"] += 1
+                        writer.write(pack_frame({"ok": False, "error": "Authentication required"}))
+                        break
+                    writer.write(pack_frame({"ok": True, "result": "ok"}))
+                else:
+                    writer.write(await self._dispatch(body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.stats["active_connections"] -= 1
+            writer.close()
+
+    def _authenticate(self, body):
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return False
+        if not isinstance(request, dict) or request.get("op") != "hello":
+            return False
+        token = request.get("token")
+        if not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def _dispatch(self, body):
+        """
+        Run one request and encode its reply frame
+
+        Results that cannot be encoded are reported as an error reply.
+        """
+        self.stats["requests"] += 1
+        request_id = None
+        try:
+            request = json.loads(body)
+            request_id = request.get("id")
+            op = request.get("op")
+            if op == "chat":
+                result = await self._chat(request)
+            elif op == "app":
+                result = await self._app(request)
+            elif op == "ping":
+                result = "pong"
+            else:
+                raise ValueError(f"Unknown op: {op}")
+            return pack_frame({"id": request_id, "ok": True, "result": result})
+        except Exception as e:
+            self.stats["errors"] += 1
+            return pack_frame({"id": request_id, "ok": False, "error": str(e)})
+
+    async def _chat(self, request):
+        messages = request.get("messages")
+        if not isinstance(messages, list):
+            raise ValueError("messages must be a list")
+        temperature = request.get("temperature")
+        if temperature is not None and not isinstance(temperature, (int, float)):
+            raise ValueError("temperature must be a number")
+        if temperature is None:
+            temperature = self.ai_client.model_config.temperature
+        key = stable_dumps({
+            "model": self.ai_client.model_config.model_name,
+            "temperature": temperature,
+            "messages": messages
+        })
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+        priority = request.get("priority")
+        deadline_ms = request.get("deadline_ms")
+        loop = asyncio.get_running_loop()
+        result = await self.single_flight.do(key, lambda: loop.run_in_executor(
+            self._executor, self._chat_blocking, messages, priority, deadline_ms, temperature))
+        if result is None:
+            raise RuntimeError("Upstream request failed")
+        self._cache_put(key, result)
+        return result
+
+    def _chat_blocking(self, messages, priority, deadline_ms, temperature):
+        if getattr(self.ai_client, "supports_priority", False):
+            response = self.ai_client.chat_completion(messages, priority=priority, deadline_ms=deadline_ms,
+                                                      temperature=temperature)
+        else:
+            response = self.ai_client.chat_completion(messages, temperature=temperature)
+        return response.to_dict() if response else None
+
+    async def _app(self, request):
+        name = request.get("app")
+        method_name = request.get("method")
+        if name not in EXPOSED_METHODS:
+            raise ValueError(f"Unknown application: {name}")
+        if method_name not in EXPOSED_METHODS[name] and method_name not in _COMMON_METHODS:
+            raise ValueError(f"Method not available: {name}.{method_name}")
+        session = self._session(str(request.get("device")), name, getattr(applications, name))
+        args = request.get("args") or []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call_app, session, method_name, args)
+
+    def _call_app(self, session, method_name, args):
+        with session.lock:
+            return getattr(session.app, method_name)(*args)
+
+    def _session(self, device, name, app_class):
+        key = (device, name)
+        session = self._sessions.get(key)
+        if session is None:
+            if len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            session = _Session(app_class(_SessionClient(self.ai_client)))
+            self._sessions[key] = session
+        else:
+            self._sessions.move_to_end(key)
+        return session
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored, value = entry
+        if time.monotonic() - stored > self.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key, value):
+        if not self.cache_size:
+            return
+        self._cache[key] = (time.monotonic(), value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["sessions"] = len(self._sessions)
+        stats["cached_responses"] = len(self._cache)
+        stats["coalesced"] = self.single_flight.stats["coalesced"]
+        return stats
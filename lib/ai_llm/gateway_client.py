@@ -0,0 +1,236 @@
+"""
+Device-side client for an ai_llm gateway
+
+The gateway (ai_llm.gateway, CPython) holds the API key, the HTTP
+connections, the response cache and the rate limiter for a whole fleet;
+devices talk to it over a plain TCP socket. Frames are a 4-byte
+big-endian length followed by a JSON body; each connection opens with a
+hello frame carrying the gateway's shared token.
+"""
+
+import ujson as json
+import struct
+from .models import ChatMessage, ChatResponse, ModelConfig
+
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+
+DEFAULT_PORT = 8765
+MAX_FRAME = 256 * 1024
+
+def pack_frame(obj):
+    """
+    Encode one protocol frame
+    """
+    body = json.dumps(obj).encode()
+    return struct.pack(">I", len(body)) + body
+
+def _default_device_id():
+    try:
+        import machine
+        import ubinascii
+        return ubinascii.hexlify(machine.unique_id()).decode()
+    except ImportError:
+        # No hardware id (e.g. CPython): a random id, so two clients never
+        # share a gateway session by accident; pass device_id to resume one
+        import os
+        import binascii
+        return "host-" + binascii.hexlify(os.urandom(6)).decode()
+
+class GatewayError(Exception):
+    pass
+
+class GatewayClient:
+    """
+    Drop-in replacement for AIClient that forwards requests to a gateway
+
+    Applications take it as their ai_client. Requests can also run an
+    application on the gateway itself with call_app, so the device keeps
+    no conversation history in RAM.
+
+    Example:
+        client = GatewayClient("192.168.1.10", token=GATEWAY_TOKEN)
+        home = SmartHomeController(client)
+        home.process_home_command("Turn off the lights", devices)
+    """
+
+    supports_priority = True
+
+    def __init__(self, host, port=DEFAULT_PORT, device_id=None, model_config=None, timeout=30, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.device_id = device_id or _default_device_id()
+        # Model and token limits come from the gateway; the temperature
+        # passed to chat_completion is sent with each request
+        self.model_config = model_config or ModelConfig()
+        self.timeout = timeout
+        self._sock = None
+        self._next_id = 0
+
+    def _connect(self):
+        address = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket()
+        sock.settimeout(self.timeout)
+        sock.connect(address)
+        self._sock = sock
+        try:
+            sock.sendall(pack_frame({"op": "hello", "token": self.token}))
+            reply = self._read_reply()
+        except OSError:
+            self.close()
+            raise
+        if not reply.get("ok"):
+            self.close()
+            raise GatewayError(reply.get("error", "Gateway rejected the connection"))
+
+    def _recv_exact(self, size):
+        chunks = []
+        while size > 0:
+            chunk = self._sock.recv(min(size, 1024))
+            if not chunk:
+                raise GatewayError("Connection closed by gateway")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def _read_reply(self):
+        (length,) = struct.unpack(">I", self._recv_exact(4))
+        if length > MAX_FRAME:
+            raise GatewayError(f"Reply frame too large ({length} bytes)")
+        return json.loads(self._recv_exact(length))
+
+    def _call(self, request):
+        """
+        Send one request frame and wait for its reply
+
+        Reconnects once if the persistent connection has gone stale.
+        Application calls may not be idempotent, so once their frame has
+        been sent they are never sent again; chat and ping requests are
+        also retried when the reply is lost.
+
+        Returns:
+            The reply's result
+
+        Raises:
+            GatewayError: if the gateway reports an error
+        """
+        self._next_id += 1
+        request["id"] = self._next_id
+        frame = pack_frame(request)
+        resend = request.get("op") != "app"
+        for attempt in (0, 1):
+            sent = False
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(frame)
+                sent = True
+                reply = self._read_reply()
+                break
+            except (OSError, GatewayError):
+                self.close()
+                if attempt or (sent and not resend):
+                    raise
+        if reply.get("id") != request["id"]:
+            self.close()
+            raise GatewayError("Reply does not match the request")
+        if not reply.get("ok"):
+            raise GatewayError(reply.get("error", "Gateway error"))
+        return reply.get("result")
+
+    def chat_completion(self, messages, stream=False, priority=None, deadline_ms=None, temperature=None):
+        """
+        Send a chat completion through the gateway
+
+        Args:
+            messages: List of ChatMessage objects or dict messages
+            stream: Accepted for compatibility; replies are not streamed
+            priority: Request class (models.PRIORITY_*) on the gateway
+            deadline_ms: Give up if the gateway cannot start in time
+            temperature: Sampling temperature (default: the gateway's)
+
+        Returns:
+            ChatResponse object, or None on error
+        """
+        formatted_messages = []
+        for msg in messages:
+            if isinstance(msg, ChatMessage):
+                formatted_messages.append(msg.to_dict())
+            else:
+                formatted_messages.append(msg)
+        request = {"op": "chat", "messages": formatted_messages}
+        if priority is not None:
+            request["priority"] = priority
+        if deadline_ms is not None:
+            request["deadline_ms"] = deadline_ms
+        if temperature is not None:
+            request["temperature"] = temperature
+        try:
+            result = self._call(request)
+            return ChatResponse.from_api_response(result) if result else None
+        except Exception as e:
+            print(f"Error in chat_completion: {e}")
+            return None
+
+    def simple_chat(self, prompt, system_message=None, priority=None):
+        """
+        Simple chat interface for single prompts
+
+        Returns:
+            String response or None if error
+        """
+        messages = []
+        if system_message:
+            messages.append(ChatMessage("system", system_message))
+        messages.append(ChatMessage("user", prompt))
+        response = self.chat_completion(messages, priority=priority)
+        if response and response.choices:
+            return response.choices[0].message.content
+        return None
+
+    def call_app(self, app, method, *args):
+        """
+        Run an application method on the gateway
+
+        The gateway keeps one application instance per device, so
+        conversation history lives there instead of on the device.
+
+        Args:
+            app: Application class name, e.g. "SecuritySystem"
+            method: Method name, e.g. "analyze_security_event"
+            *args: JSON-serializable arguments
+
+        Returns:
+            The method's return value, or None on error
+        """
+        try:
+            return self._call({
+                "op": "app",
+                "device": self.device_id,
+                "app": app,
+                "method": method,
+                "args": list(args)
+            })
+        except Exception as e:
+            print(f"Error in call_app: {e}")
+            return None
+
+    def ping(self):
+        try:
+            return self._call({"op": "ping"}) == "pong"
+        except Exception:
+            return False
+
+    def set_model_config(self, model_config):
+        self.model_config = model_config
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
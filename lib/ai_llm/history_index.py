@@ -0,0 +1,112 @@
+"""
+Keyword index over past conversation exchanges
+
+A compact BM25 inverted index: terms are hashed to 32-bit keys and each
+posting list is a single array of (exchange_id << 8 | term_frequency).
+"""
+
+import math
+import re
+from array import array
+
+try:
+    from binascii import crc32
+except ImportError:
+    from ubinascii import crc32
+
+_SPLIT = re.compile(r'[^a-z0-9]+')
+
+# Very common words carry no signal and only lengthen posting lists
+_STOP_WORDS = (
+    "the", "a", "an", "and", "or", "is", "are", "to", "of", "in", "on",
+    "it", "this", "that", "for", "with", "at", "be", "i", "you", "my"
+)
+_STOP_HASHES = set([crc32(word.encode()) for word in _STOP_WORDS])
+
+def term_hashes(text):
+    """
+    Hash the searchable terms of text
+    """
+    hashes = []
+    for term in _SPLIT.split(text.lower()):
+        if term:
+            key = crc32(term.encode())
+            if key not in _STOP_HASHES:
+                hashes.append(key)
+    return hashes
+
+class HistoryIndex:
+    """
+    Incremental BM25 index; documents are exchange numbers 0, 1, 2, ...
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = array("H")
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, text):
+        """
+        Index the next exchange
+
+        Returns:
+            The exchange id assigned to text
+        """
+        exchange_id = len(self._lengths)
+        counts = {}
+        hashes = term_hashes(text)
+        for key in hashes:
+            counts[key] = counts.get(key, 0) + 1
+        for key, count in counts.items():
+            postings = self._postings.get(key)
+            if postings is None:
+                postings = array("I")
+                self._postings[key] = postings
+            postings.append((exchange_id << 8) | min(count, 255))
+        length = min(len(hashes), 65535)
+        self._lengths.append(length)
+        self._total_length += length
+        return exchange_id
+
+    def search(self, query, top_k=3, exclude_from=None):
+        """
+        Rank past exchanges against a query
+
+        Args:
+            query: Query text
+            top_k: Maximum number of results
+            exclude_from: Ignore exchanges with id >= this (e.g. ones
+                already included by recency)
+
+        Returns:
+            List of (exchange_id, score), best first
+        """
+        count = len(self._lengths)
+        if not count:
+            return []
+        average = self._total_length / count or 1
+        scores = {}
+        for key in set(term_hashes(query)):
+            postings = self._postings.get(key)
+            if not postings:
+                continue
+            idf = math.log((count - len(postings) + 0.5) / (len(postings) + 0.5) + 1)
+            for entry in postings:
+                exchange_id = entry >> 8
+                if exclude_from is not None and exchange_id >= exclude_from:
+                    continue
+                tf = entry & 0xFF
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[exchange_id] / average)
+                scores[exchange_id] = scores.get(exchange_id, 0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+    def clear(self):
+        self._postings = {}
+        self._lengths = array("H")
+        self._total_length = 0
@@ -0,0 +1,203 @@
+"""
+Append-only persistent conversation history
+
+Keeps conversation history on flash so it survives deep sleep. Each
+message is a length-prefixed record in a log file, and a fixed-width index
+of record offsets lets the last N messages load without parsing the log.
+"""
+
+import os
+import struct
+from .models import ChatMessage
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+_ROLES = ("system", "user", "assistant", "tool")
+_HEADER = "<IB"  # payload length, role code
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_OFFSET = "<I"
+_OFFSET_SIZE = struct.calcsize(_OFFSET)
+
+def _file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
+
+class HistoryStore:
+    """
+    Length-prefixed binary message log with an offset index
+
+    Files:
+        <path>.log  records of [u32 length][u8 role][utf-8 content]
+        <path>.idx  one u32 log offset per record
+
+    Appends touch only the end of both files. When the log holds more
+    than max_records messages it is compacted to the newest keep_records.
+    """
+
+    def __init__(self, path, max_records=200, keep_records=40):
+        self.log_path = path + ".log"
+        self.index_path = path + ".idx"
+        self.max_records = max_records
+        self.keep_records = keep_records
+        self._count = None
+
+    def count(self):
+        """
+        Number of stored messages
+        """
+        if self._count is None:
+            self._count = self._check_index()
+        return self._count
+
+    def append(self, role, content):
+        """
+        Append one message
+
+        Args:
+            role: Message role ("user", "assistant", ...)
+            content: Message text
+        """
+        payload = content.encode() if isinstance(content, str) else content
+        role_code = _ROLES.index(role) if role in _ROLES else 255
+        # Validate the existing files before this record is added to them
+        count = self.count()
+        offset = _file_size(self.log_path)
+        with open(self.log_path, "ab") as log:
+            log.write(struct.pack(_HEADER, len(payload), role_code))
+            log.write(payload)
+        with open(self.index_path, "ab") as index:
+            index.write(struct.pack(_OFFSET, offset))
+
+        self._count = count + 1
+        if self._count > self.max_records:
+            self.compact()
+
+    def append_message(self, message):
+        self.append(message.role, message.content or "")
+
+    def load_last(self, n):
+        """
+        Load the newest n messages in O(n)
+
+        Returns:
+            List of ChatMessage objects, oldest first
+        """
+        count = self.count()
+        n = min(n, count)
+        if n <= 0:
+            return []
+
+        with open(self.index_path, "rb") as index:
+            index.seek((count - n) * _OFFSET_SIZE)
+            first = struct.unpack(_OFFSET, index.read(_OFFSET_SIZE))[0]
+
+        with open(self.log_path, "rb") as log:
+            if mmap is not None:
+                view = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    return self._parse(view, first, len(view))
+                finally:
+                    view.close()
+            log.seek(first)
+            data = log.read()
+            return self._parse(memoryview(data), 0, len(data))
+
+    def _parse(self, data, position, end):
+        messages = []
+        while position + _HEADER_SIZE <= end:
+            length, role_code = struct.unpack_from(_HEADER, data, position)
+            position += _HEADER_SIZE
+            if position + length > end:
+                break  # torn final write
+            content = bytes(data[position:position + length]).decode()
+            position += length
+            role = _ROLES[role_code] if role_code < len(_ROLES) else "user"
+            messages.append(ChatMessage(role, content))
+        return messages
+
+    def _check_index(self):
+        """
+        Validate the index against the log, rebuilding it if they disagree
+
+        Happens after a power loss between the log and index writes, or
+        mid-compaction.
+        """
+        log_size = _file_size(self.log_path)
+        index_size = _file_size(self.index_path)
+        count = index_size // _OFFSET_SIZE
+        if count == 0 and log_size == 0:
+            return 0
+        if count and index_size % _OFFSET_SIZE == 0:
+            with open(self.index_path, "rb") as index:
+                index.seek((count - 1) * _OFFSET_SIZE)
+                last = struct.unpack(_OFFSET, index.read(_OFFSET_SIZE))[0]
+            with open(self.log_path, "rb") as log:
+                log.seek(last)
+                header = log.read(_HEADER_SIZE)
+            if len(header) == _HEADER_SIZE:
+                length = struct.unpack(_HEADER, header)[0]
+                if last + _HEADER_SIZE + length == log_size:
+                    return count
+        return self._rebuild_index()
+
+    def _rebuild_index(self):
+        offsets = []
+        log_size = _file_size(self.log_path)
+        valid_end = 0
+        if log_size:
+            with open(self.log_path, "rb") as log:
+                position = 0
+                while position + _HEADER_SIZE <= log_size:
+                    log.seek(position)
+                    length = struct.unpack(_HEADER, log.read(_HEADER_SIZE))[0]
+                    if position + _HEADER_SIZE + length > log_size:
+                        break
+                    offsets.append(position)
+                    position += _HEADER_SIZE + length
+                valid_end = position
+        if valid_end < log_size:
+            # Drop a torn trailing record
+            with open(self.log_path, "rb") as log:
+                data = log.read(valid_end)
+            with open(self.log_path, "wb") as log:
+                log.write(data)
+        with open(self.index_path, "wb") as index:
+            for offset in offsets:
+                index.write(struct.pack(_OFFSET, offset))
+        return len(offsets)
+
+    def compact(self):
+        """
+        Rewrite the log keeping only the newest keep_records messages
+        """
+        messages = self.load_last(self.keep_records)
+        tmp_log = self.log_path + ".tmp"
+        tmp_index = self.index_path + ".tmp"
+        offset = 0
+        with open(tmp_log, "wb") as log, open(tmp_index, "wb") as index:
+            for message in messages:
+                payload = message.content.encode()
+                role_code = _ROLES.index(message.role) if message.role in _ROLES else 255
+                log.write(struct.pack(_HEADER, len(payload), role_code))
+                log.write(payload)
+                index.write(struct.pack(_OFFSET, offset))
+                offset += _HEADER_SIZE + len(payload)
+        os.rename(tmp_log, self.log_path)
+        os.rename(tmp_index, self.index_path)
+        self._count = len(messages)
+
+    def clear(self):
+        """
+        Delete all stored history
+        """
+        for path in (self.log_path, self.index_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._count = 0
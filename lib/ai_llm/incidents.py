@@ -0,0 +1,373 @@
+"""
+Incident store for security event analyses
+
+Incidents are appended to time partitions (one per partition_seconds,
+an hour by default). Each partition keeps:
+    records     compact tuples, capped at max_records
+    indexes     zone / threat level / sensor -> array of record positions
+    aggregates  counts per zone, threat level, sensor and (zone, sensor),
+                and the peak threat level per zone
+
+Totals over the whole retention are kept up to date as partitions are
+added and evicted, so reports and pattern checks read a handful of
+counters instead of rescanning events. Aggregates keep counting when a
+partition's record cap is reached; only the raw records are dropped.
+
+Reading windows ("last N hours") end at the current time (or an explicit
+now), and partitions that have aged out are evicted on reads as well as
+on adds, so a quiet system does not keep reporting old incidents.
+"""
+
+import time
+from array import array
+from .utils import format_number
+
+THREAT_LEVELS = ("none", "low", "medium", "high", "critical")
+
+def threat_rank(level):
+    """
+    Position of a threat level in THREAT_LEVELS (unrecognised levels
+    count as "medium", like a failed analysis)
+    """
+    try:
+        return THREAT_LEVELS.index(str(level).lower())
+    except ValueError:
+        return 2
+
+def _count(counts, key, amount):
+    value = counts.get(key, 0) + amount
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+class _Partition:
+    def __init__(self, number):
+        self.number = number
+        self.records = []     # (timestamp, zone, rank, alert_type, sensors, description)
+        self.indexes = ({}, {}, {})  # zone, rank, sensor -> array("H") of positions
+        self.zones = {}
+        self.threats = {}
+        self.sensors = {}
+        self.pairs = {}       # (zone, sensor) -> count
+        self.peaks = {}       # zone -> highest rank
+
+class IncidentStore:
+    """
+    Time-partitioned, indexed incident history with rolling aggregates
+
+    Example:
+        store = IncidentStore()
+        store.add("entry", "high", ["door", "motion"], "Door forced at night")
+        store.query(zone="entry", min_threat="medium")
+        store.summary(hours=24)
+    """
+
+    def __init__(self, partition_seconds=3600, max_partitions=48, max_records=100, repeat_threshold=3):
+        self.partition_seconds = partition_seconds
+        self.max_partitions = max_partitions
+        self.max_records = max_records
+        # (zone, sensor) pairs seen this often are reported as repeat offenders
+        self.repeat_threshold = repeat_threshold
+        self._partitions = []  # oldest first
+        self.zones = {}
+        self.threats = {}
+        self.sensors = {}
+        self.pairs = {}
+        self.stats = {"incidents": 0, "dropped_records": 0, "dropped_old": 0}
+
+    def __len__(self):
+        return sum([len(partition.records) for partition in self._partitions])
+
+    def _partition(self, number):
+        partitions = self._partitions
+        if partitions and partitions[-1].number == number:
+            return partitions[-1]
+        if partitions and number < partitions[-1].number:
+            # Late arrival: find its partition (a short list)
+            for partition in partitions:
+                if partition.number == number:
+                    return partition
+            if number < partitions[-1].number - self.max_partitions + 1:
+                return None
+            partition = _Partition(number)
+            position = len([p for p in partitions if p.number < number])
+            partitions.insert(position, partition)
+            return partition
+        partition = _Partition(number)
+        partitions.append(partition)
+        while partitions and partitions[0].number <= number - self.max_partitions:
+            self._evict(partitions.pop(0))
+        return partition
+
+    def _evict(self, partition):
+        for totals, counts in ((self.zones, partition.zones), (self.threats, partition.threats),
+                               (self.sensors, partition.sensors), (self.pairs, partition.pairs)):
+            for key, amount in counts.items():
+                _count(totals, key, -amount)
+
+    def add(self, zone, threat_level, sensors=(), description="", alert_type=None, timestamp=None):
+        """
+        Record one incident
+
+        Args:
+            zone: Affected zone (None/"" for unknown)
+            threat_level: One of THREAT_LEVELS
+            sensors: Sensor names involved
+            description: Short text kept with the record
+            alert_type: Alert level reported with the incident
+            timestamp: Seconds (default: now)
+
+        Returns:
+            False if the incident is older than the retention
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        zone = zone or ""
+        partition = self._partition(int(timestamp // self.partition_seconds))
+        if partition is None:
+            self.stats["dropped_old"] += 1
+            return False
+        rank = threat_rank(threat_level)
+        sensors = tuple(sensors)
+        self.stats["incidents"] += 1
+
+        for counts, totals, key in ((partition.zones, self.zones, zone), (partition.threats, self.threats, rank)):
+            _count(counts, key, 1)
+            _count(totals, key, 1)
+        for sensor in sensors:
+            for counts, totals, key in ((partition.sensors, self.sensors, sensor),
+                                        (partition.pairs, self.pairs, (zone, sensor))):
+                _count(counts, key, 1)
+                _count(totals, key, 1)
+        if rank > partition.peaks.get(zone, -1):
+            partition.peaks[zone] = rank
+
+        if len(partition.records) >= self.max_records:
+            self.stats["dropped_records"] += 1
+            return True
+        position = len(partition.records)
+        partition.records.append((timestamp, zone, rank, alert_type, sensors, description))
+        for index, keys in zip(partition.indexes, ((zone,), (rank,), sensors)):
+            for key in keys:
+                positions = index.get(key)
+                if positions is None:
+                    positions = array("H")
+                    index[key] = positions
+                positions.append(position)
+        return True
+
+    def add_analysis(self, analysis, sensor_data=None, timestamp=None):
+        """
+        Record a SecuritySystem.analyze_security_event result
+
+        The zone comes from the analysis, or else from the first sensor
+        reading that names one.
+        """
+        sensor_data = sensor_data or {}
+        zone = analysis.get("zone")
+        if not zone or zone == "unknown":
+            zone = ""
+            for data in sensor_data.values():
+                if isinstance(data, dict) and data.get("zone"):
+                    zone = data["zone"]
+                    break
+        return self.add(zone, analysis.get("threat_level"), list(sensor_data.keys()),
+                        str(analysis.get("description", ""))[:120], analysis.get("alert_type"), timestamp)
+
+    def _expire(self, now):
+        """
+        Evict partitions older than the retention as of now
+
+        Returns:
+            now (time.time() if it was None)
+        """
+        if now is None:
+            now = time.time()
+        oldest = int(now // self.partition_seconds) - self.max_partitions
+        partitions = self._partitions
+        while partitions and partitions[0].number <= oldest:
+            self._evict(partitions.pop(0))
+        return now
+
+    def _recent(self, hours, now):
+        if hours is None or not self._partitions:
+            return self._partitions
+        first = int((now - hours * 3600) // self.partition_seconds)
+        return [partition for partition in self._partitions if partition.number >= first]
+
+    def query(self, start=None, end=None, zone=None, threat=None, min_threat=None, sensor=None, limit=None,
+              now=None):
+        """
+        Incidents in a time range, optionally filtered
+
+        Only partitions overlapping [start, end) are visited, and within
+        each the smallest matching index supplies the candidates.
+
+        Args:
+            start, end: Time range in seconds (default: all retained)
+            zone, threat, sensor: Exact matches
+            min_threat: Lowest threat level to include
+            limit: Return at most this many (the newest)
+            now: Current time for retention (default: time.time())
+
+        Returns:
+            List of incident dicts, oldest first
+        """
+        self._expire(now)
+        first = None if start is None else int(start // self.partition_seconds)
+        last = None if end is None else int(end // self.partition_seconds)
+        rank = None if threat is None else threat_rank(threat)
+        floor = 0 if min_threat is None else threat_rank(min_threat)
+        if zone is not None:
+            zone = zone or ""
+        keys = [(i, key) for i, key in ((0, zone), (1, rank), (2, sensor)) if key is not None]
+        results = []
+        for partition in reversed(self._partitions):
+            if last is not None and partition.number > last:
+                continue
+            if first is not None and partition.number < first:
+                break
+            if keys:
+                candidates = None
+                for i, key in keys:
+                    positions = partition.indexes[i].get(key)
+                    if positions is None:
+                        candidates = ()
+                        break
+                    if candidates is None or len(positions) < len(candidates):
+                        candidates = positions
+            else:
+                candidates = range(len(partition.records))
+            matches = []
+            for position in candidates:
+                record = partition.records[position]
+                if ((start is not None and record[0] < start) or (end is not None and record[0] >= end)
+                        or record[2] < floor or (zone is not None and record[1] != zone)
+                        or (rank is not None and record[2] != rank)
+                        or (sensor is not None and sensor not in record[4])):
+                    continue
+                matches.append(record)
+            results.extend(reversed(matches))
+            if limit is not None and len(results) >= limit:
+                results = results[:limit]
+                break
+        results.reverse()
+        return [self._record_dict(record) for record in results]
+
+    @staticmethod
+    def _record_dict(record):
+        return {
+            "timestamp": record[0],
+            "zone": record[1],
+            "threat_level": THREAT_LEVELS[record[2]],
+            "alert_type": record[3],
+            "sensors": list(record[4]),
+            "description": record[5]
+        }
+
+    def summary(self, hours=None, top_n=5, now=None):
+        """
+        Aggregates over the whole retention, or the hours before now
+        (default: time.time())
+
+        Returns:
+            Dictionary with total, zones, threat_levels and sensors
+            counts, the peak threat level per zone, and repeat_offenders:
+            (zone, sensor, count) pairs at or over repeat_threshold, most
+            frequent first
+        """
+        now = self._expire(now)
+        partitions = self._recent(hours, now)
+        if partitions is self._partitions:
+            zones, threats, sensors, pairs = self.zones, self.threats, self.sensors, self.pairs
+        else:
+            zones, threats, sensors, pairs = {}, {}, {}, {}
+            for partition in partitions:
+                for totals, counts in ((zones, partition.zones), (threats, partition.threats),
+                                       (sensors, partition.sensors), (pairs, partition.pairs)):
+                    for key, amount in counts.items():
+                        totals[key] = totals.get(key, 0) + amount
+        peaks = {}
+        for partition in partitions:
+            for zone, rank in partition.peaks.items():
+                if rank > peaks.get(zone, -1):
+                    peaks[zone] = rank
+        repeats = [(zone, sensor, count) for (zone, sensor), count in pairs.items() if count >= self.repeat_threshold]
+        repeats.sort(key=lambda item: item[2], reverse=True)
+        return {
+            "total": sum(zones.values()),
+            "zones": dict(zones),
+            "threat_levels": {THREAT_LEVELS[rank]: count for rank, count in threats.items()},
+            "sensors": dict(sensors),
+            "peaks": {zone: THREAT_LEVELS[rank] for zone, rank in peaks.items()},
+            "repeat_offenders": repeats[:top_n],
+            "hours": hours if hours is not None else self.max_partitions * self.partition_seconds / 3600
+        }
+
+    def zone_context(self, zone, hours=24, now=None):
+        """
+        One line of recent history for a zone, for event analysis prompts
+        """
+        now = self._expire(now)
+        zone = zone or ""
+        count = 0
+        peak = -1
+        sensors = {}
+        for partition in self._recent(hours, now):
+            count += partition.zones.get(zone, 0)
+            peak = max(peak, partition.peaks.get(zone, -1))
+            for (pair_zone, sensor), amount in partition.pairs.items():
+                if pair_zone == zone:
+                    sensors[sensor] = sensors.get(sensor, 0) + amount
+        if not count:
+            return f"Zone {zone or 'unassigned'}: no incidents in last {format_number(hours)}h"
+        sensors = ", ".join([f"{sensor} x{amount}" for sensor, amount in
+                             sorted(sensors.items(), key=lambda item: item[1], reverse=True)[:3]])
+        return (f"Zone {zone or 'unassigned'}: {count} incidents in last {format_number(hours)}h, "
+                f"peak {THREAT_LEVELS[peak]}" + (f", sensors {sensors}" if sensors else ""))
+
+    def to_text(self, hours=None, top_n=5, recent=5, now=None):
+        """
+        Fixed-size report context built from summary() plus the most
+        recent medium-or-higher incidents
+        """
+        if now is None:
+            now = time.time()
+        data = self.summary(hours, top_n, now)
+
+        def ranked(counts):
+            return ", ".join([f"{key or 'unassigned'} {count}" for key, count in
+                              sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top_n]])
+
+        lines = [f"Incidents over last {format_number(data['hours'])}h: {data['total']}"]
+        if data["total"]:
+            lines.append("By threat level: " + ", ".join([
+                f"{level} {data['threat_levels'][level]}" for level in THREAT_LEVELS if level in data["threat_levels"]
+            ]))
+            lines.append("By zone: " + ranked(data["zones"]))
+            lines.append("Peak threat by zone: " + ", ".join([
+                f"{zone or 'unassigned'} {level}" for zone, level in data["peaks"].items()
+            ]))
+            if data["sensors"]:
+                lines.append("By sensor: " + ranked(data["sensors"]))
+            if data["repeat_offenders"]:
+                lines.append("Repeat triggers: " + ", ".join([
+                    f"{zone or 'unassigned'}/{sensor} x{count}" for zone, sensor, count in data["repeat_offenders"]
+                ]))
+        start = None if hours is None else now - hours * 3600
+        notable = self.query(start=start, min_threat="medium", limit=recent, now=now)
+        if notable:
+            lines.append("Recent notable incidents:")
+            for incident in notable:
+                ago = format_number((now - incident["timestamp"]) / 3600, 1)
+                lines.append(f"- {ago}h ago {incident['zone'] or 'unassigned'} {incident['threat_level']}: "
+                             f"{incident['description']}")
+        return "\n".join(lines)
+
+    def clear(self):
+        self._partitions = []
+        self.zones = {}
+        self.threats = {}
+        self.sensors = {}
+        self.pairs = {}
@@ -1,3 +1,10 @@
+# Request priority classes (lower is served first), see RequestScheduler;
+# kept here so applications can use them without loading the scheduler
+PRIORITY_CRITICAL = 0
+PRIORITY_CONTROL = 1
+PRIORITY_INTERACTIVE = 2
+PRIORITY_BULK = 3
+
 class ChatMessage:
     """
     Represents a chat message
@@ -68,17 +75,71 @@ class ChatResponse:
             choices=choices,
             usage=data.get("usage")
         )
+    
+    def to_dict(self):
+        """
+        API-shaped dictionary; from_api_response(to_dict()) round-trips
+        """
+        return {
+            "id": self.id,
+            "object": self.object,
+            "created": self.created,
+            "model": self.model,
+            "choices": [
+                {
+                    "index": choice.index,
+                    "message": choice.message.to_dict(),
+                    "finish_reason": choice.finish_reason
+                }
+                for choice in self.choices
+            ],
+            "usage": self.usage
+        }
+    
+    def get_prompt_tokens(self):
+        """
+        Number of input tokens billed for this request (0 if not reported)
+        """
+        if not self.usage:
+            return 0
+        return self.usage.get("prompt_tokens") or self.usage.get("input_tokens") or 0
+    
+    def get_cached_tokens(self):
+        """
+        Number of input tokens served from the provider's prompt cache
+        
+        Handles the OpenAI layout (usage.prompt_tokens_details.cached_tokens)
+        and the Anthropic-style cache_read_input_tokens field.
+        """
+        if not self.usage:
+            return 0
+        details = self.usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens")
+        if cached is None:
+            cached = self.usage.get("cache_read_input_tokens", 0)
+        return cached or 0
 
 class ModelConfig:
     """
     Configuration for AI model parameters
     """
     
-    def __init__(self, model_name="gpt-3.5-turbo", max_tokens=150, temperature=0.7, top_p=1.0):
+    def __init__(self, model_name="gpt-3.5-turbo", max_tokens=150, temperature=0.7, top_p=1.0,
+                 context_window=None):
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.top_p = top_p
+        self.context_window = context_window
+    
+    def get_context_window(self):
+        """
+        Context window in tokens, from config or the known-model table
+        """
+        if self.context_window:
+            return self.context_window
+        from .tokens import get_context_window
+        return get_context_window(self.model_name)
     
     def to_dict(self):
         return {
@@ -0,0 +1,271 @@
+"""
+Motion profiles and a local motor sequence executor
+
+A validated list of motor commands is turned into setpoint tables up
+front (one value per control period), then played back on a fixed
+schedule. The LLM is asked once for the whole sequence; nothing is
+computed or fetched between steps.
+
+Profiles:
+    trapezoidal  constant acceleration to a velocity cap, cruise, brake
+    s_curve      smootherstep position curve; acceleration starts and
+                 ends at zero (bounded jerk), sized to the same limits
+"""
+
+import math
+from array import array
+from .utils import ticks_ms, ticks_us, ticks_diff, sleep_us
+
+# Limits used when motor_config does not define them
+DEFAULT_LIMITS = {
+    "max_angular_velocity": 90,       # degrees/s
+    "max_angular_acceleration": 180,  # degrees/s^2
+    "max_acceleration": 50,           # speed %/s
+    "max_jerk": 100                   # speed %/s^2
+}
+
+def trapezoidal_profile(start, target, max_velocity, max_acceleration, period_ms=20):
+    """
+    Setpoints moving from start to target with limited velocity and acceleration
+
+    Returns:
+        array('f') of setpoints, one per period, ending at target
+    """
+    distance = abs(target - start)
+    if not distance:
+        return array("f", [target])
+    direction = 1 if target > start else -1
+    accel_time = max_velocity / max_acceleration
+    if max_acceleration * accel_time * accel_time >= distance:
+        # Triangular: the velocity cap is never reached
+        accel_time = math.sqrt(distance / max_acceleration)
+        cruise_time = 0.0
+    else:
+        cruise_time = (distance - max_acceleration * accel_time * accel_time) / max_velocity
+    peak = max_acceleration * accel_time
+    total = 2 * accel_time + cruise_time
+    period = period_ms / 1000
+    steps = int(math.ceil(total / period))
+    table = array("f", [0.0] * (steps + 1))
+    for k in range(steps):
+        t = k * period
+        if t < accel_time:
+            covered = 0.5 * max_acceleration * t * t
+        elif t < accel_time + cruise_time:
+            covered = 0.5 * peak * accel_time + peak * (t - accel_time)
+        else:
+            remaining = total - t
+            covered = distance - 0.5 * max_acceleration * remaining * remaining
+        table[k] = start + direction * covered
+    table[steps] = target
+    return table
+
+def s_curve_profile(start, target, max_velocity, max_acceleration, period_ms=20):
+    """
+    Jerk-limited setpoints from start to target (smootherstep curve)
+
+    The duration is the shortest for which the curve's peak velocity
+    (1.875 d/T) and peak acceleration (5.77 d/T^2) stay within limits.
+
+    Returns:
+        array('f') of setpoints, one per period, ending at target
+    """
+    distance = abs(target - start)
+    if not distance:
+        return array("f", [target])
+    total = max(1.875 * distance / max_velocity, math.sqrt(5.7735 * distance / max_acceleration))
+    period = period_ms / 1000
+    steps = int(math.ceil(total / period))
+    delta = target - start
+    table = array("f", [0.0] * (steps + 1))
+    for k in range(steps):
+        u = k * period / total
+        table[k] = start + delta * u * u * u * (u * (u * 6 - 15) + 10)
+    table[steps] = target
+    return table
+
+PROFILES = {"trapezoidal": trapezoidal_profile, "s_curve": s_curve_profile}
+
+def _to_float(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+class MotionStep:
+    """
+    One precomputed segment: a setpoint table for one motor quantity
+    """
+
+    def __init__(self, motor_id, quantity, table):
+        self.motor_id = motor_id
+        self.quantity = quantity  # "angle" or "speed"
+        self.table = table
+
+class MotionSequencer:
+    """
+    Plans setpoint tables from motor commands and plays them back
+
+    Example:
+        sequencer = MotionSequencer(motor_config)
+        sequencer.plan(commands, {"servo1": {"angle": 90}})
+        stats = sequencer.run(lambda motor, quantity, value: drive(motor, quantity, value))
+
+    Commands use the MotorController JSON format; set_angle moves the
+    angle, set_speed/start/rotate ramp the speed (and, with a duration,
+    hold it and ramp back to 0), stop ramps the speed to 0. Targets are
+    clamped to the motor_config ranges. A motor missing from motor_status
+    is taken as stopped; with no known angle, its first set_angle is a
+    single setpoint rather than a ramp from a guessed position.
+    """
+
+    def __init__(self, motor_config, period_ms=20, profile="trapezoidal"):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown motion profile: {profile}")
+        self.motor_config = motor_config
+        self.period_ms = period_ms
+        self.profile = profile
+        self.steps = []
+        self.state = {}
+        self.stats = {}
+
+    def _limit(self, name):
+        return self.motor_config.get(name, DEFAULT_LIMITS[name])
+
+    def _clamp(self, value, quantity):
+        low = self.motor_config.get(f"min_{quantity}")
+        high = self.motor_config.get(f"max_{quantity}")
+        if low is not None and value < low:
+            value = low
+        if high is not None and value > high:
+            value = high
+        return value
+
+    def _current(self, motor_id, quantity):
+        # Unknown speed means stopped; an unknown angle stays None
+        return self.state.setdefault(motor_id, {}).get(quantity, 0 if quantity == "speed" else None)
+
+    def _move(self, motor_id, quantity, target):
+        start = self._current(motor_id, quantity)
+        target = self._clamp(target, quantity)
+        if quantity == "angle":
+            velocity = self._limit("max_angular_velocity")
+            acceleration = self._limit("max_angular_acceleration")
+        else:
+            velocity = self._limit("max_acceleration")
+            acceleration = self._limit("max_jerk")
+        if start is None:
+            table = array("f", [target])
+        else:
+            table = PROFILES[self.profile](start, target, velocity, acceleration, self.period_ms)
+        self.steps.append(MotionStep(motor_id, quantity, table))
+        self.state[motor_id][quantity] = target
+
+    def _hold(self, motor_id, quantity, seconds):
+        periods = int(seconds * 1000 / self.period_ms)
+        if periods > 0:
+            value = self._current(motor_id, quantity)
+            self.steps.append(MotionStep(motor_id, quantity, array("f", [value] * periods)))
+
+    def plan(self, commands, motor_status=None):
+        """
+        Precompute the setpoint tables for a command list
+
+        Args:
+            commands: Validated motor command dicts, in order
+            motor_status: Starting {"motor_id": {"angle": ..., "speed": ...}}
+
+        Returns:
+            Number of setpoints (total run time = count * period_ms)
+
+        Raises:
+            ValueError: on a command that cannot be executed
+        """
+        self.steps = []
+        self.state = {}
+        for motor_id, status in (motor_status or {}).items():
+            if isinstance(status, dict):
+                self.state[motor_id] = {
+                    quantity: _to_float(status[quantity]) for quantity in ("angle", "speed")
+                    if _to_float(status.get(quantity)) is not None
+                }
+        for index, command in enumerate(commands):
+            if command.get("safety_check") == "failed" or command.get("action") == "error":
+                raise ValueError(f"Step {index + 1} failed validation: {command.get('explanation')}")
+            motor_id = command.get("motor_id", "motor")
+            name = command.get("command")
+            params = command.get("parameters") or {}
+            duration = _to_float(params.get("duration"), 0)
+            if name == "set_angle":
+                angle = _to_float(params.get("angle"))
+                if angle is None:
+                    raise ValueError(f"Step {index + 1}: set_angle needs a numeric angle")
+                self._move(motor_id, "angle", angle)
+                self._hold(motor_id, "angle", duration)
+            elif name in ("set_speed", "start", "rotate"):
+                speed = _to_float(params.get("speed"))
+                if speed is None:
+                    raise ValueError(f"Step {index + 1}: {name} needs a numeric speed")
+                self._move(motor_id, "speed", speed)
+                if duration:
+                    self._hold(motor_id, "speed", duration)
+                    self._move(motor_id, "speed", 0)
+            elif name == "stop":
+                self._move(motor_id, "speed", 0)
+            else:
+                raise ValueError(f"Step {index + 1}: unsupported command '{name}'")
+        return sum([len(step.table) for step in self.steps])
+
+    def run(self, output):
+        """
+        Play the planned tables back, one setpoint per period
+
+        Setpoints are due at fixed offsets from the start, so a late
+        period does not delay the ones after it. Sequence time comes from
+        ticks_ms (the microsecond counter wraps after about 9 minutes on
+        MicroPython); ticks_us only times the wait inside one period.
+
+        Args:
+            output: Callable output(motor_id, quantity, value)
+
+        Returns:
+            Timing stats: periods, max/mean lateness (jitter) in us, and
+            overruns (periods that started more than one period late)
+        """
+        period_us = self.period_ms * 1000
+        late_max = 0
+        late_total = 0
+        overruns = 0
+        periods = 0
+        start = ticks_ms()
+        for step in self.steps:
+            motor_id = step.motor_id
+            quantity = step.quantity
+            for value in step.table:
+                due_ms = periods * self.period_ms
+                waited_from = ticks_us()
+                wait = int((due_ms - ticks_diff(ticks_ms(), start)) * 1000)
+                if wait > 0:
+                    sleep_us(wait)
+                    # Oversleep, measured across this period only
+                    late = ticks_diff(ticks_us(), waited_from) - wait
+                else:
+                    # Already behind the sequence clock
+                    late = -wait
+                if late < 0:
+                    late = 0
+                if late > late_max:
+                    late_max = late
+                if late > period_us:
+                    overruns += 1
+                late_total += late
+                output(motor_id, quantity, value)
+                periods += 1
+        self.stats = {
+            "periods": periods,
+            "period_ms": self.period_ms,
+            "max_jitter_us": late_max,
+            "mean_jitter_us": late_total / periods if periods else 0,
+            "overruns": overruns
+        }
+        return self.stats
@@ -0,0 +1,207 @@
+"""
+Streaming response post-processing
+
+Each stage transforms text chunk by chunk and keeps only a small, bounded
+carry-over between chunks, so output can be cleaned while it streams in.
+"""
+
+import re
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+DEFAULT_PREFIXES = ("AI: ", "Assistant: ", "Bot: ", "Response: ")
+
+class WhitespaceNormalizer:
+    """
+    Collapses whitespace runs to one space and trims both ends
+
+    Carry-over: whether a space is pending at the end of the last chunk.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._pending = False
+
+    def feed(self, chunk):
+        text = _WHITESPACE_RUN.sub(" ", chunk)
+        if self._pending:
+            # Merge a space run split across the chunk boundary
+            text = " " + text.lstrip(" ")
+        if not self._started:
+            text = text.lstrip(" ")
+        # Hold back a trailing space until we know more text follows
+        self._pending = text.endswith(" ")
+        if self._pending:
+            text = text[:-1]
+        if text:
+            self._started = True
+        return text
+
+    def flush(self):
+        self._pending = False
+        return ""
+
+class PrefixStripper:
+    """
+    Removes the first matching prefix from the start of the stream
+
+    Carry-over: at most the length of the longest prefix.
+    """
+
+    def __init__(self, prefixes=DEFAULT_PREFIXES):
+        self.prefixes = prefixes
+        self._buffer = ""
+        self._done = False
+
+    def feed(self, chunk):
+        if self._done:
+            return chunk
+        self._buffer += chunk
+        for prefix in self.prefixes:
+            if self._buffer.startswith(prefix):
+                return self._release(len(prefix))
+        for prefix in self.prefixes:
+            if prefix.startswith(self._buffer):
+                return ""  # might still become a prefix
+        return self._release(0)
+
+    def _release(self, skip):
+        text = self._buffer[skip:]
+        self._buffer = ""
+        self._done = True
+        return text
+
+    def flush(self):
+        return self._release(0)
+
+class CodeFenceStripper:
+    """
+    Removes ``` fence markers (and the language tag after an opening fence)
+
+    Carry-over: up to two trailing backticks.
+    """
+
+    def __init__(self):
+        self._carry = ""
+        self._open = False
+        self._in_tag = False
+
+    def feed(self, chunk):
+        text = self._carry + chunk
+        self._carry = ""
+        out = []
+        position = 0
+        length = len(text)
+        while position < length:
+            if self._in_tag:
+                while position < length and (text[position].isalpha() or text[position].isdigit()):
+                    position += 1
+                if position < length:
+                    self._in_tag = False
+                    if text[position] == "\n":
+                        position += 1
+                continue
+            fence = text.find("```", position)
+            if fence < 0:
+                end = length
+                while end > position and length - end < 2 and text[end - 1] == "`":
+                    end -= 1
+                out.append(text[position:end])
+                self._carry = text[end:]
+                break
+            out.append(text[position:fence])
+            position = fence + 3
+            self._open = not self._open
+            self._in_tag = self._open
+        return "".join(out)
+
+    def flush(self):
+        text = self._carry
+        self._carry = ""
+        return text
+
+class JsonExtractor:
+    """
+    Passes through only the first complete JSON object or array
+
+    Carry-over: nesting depth and string/escape state.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._finished = False
+
+    def feed(self, chunk):
+        if self._finished:
+            return ""
+        start = 0 if self._depth else None
+        for position in range(len(chunk)):
+            ch = chunk[position]
+            if self._depth == 0:
+                if ch == "{" or ch == "[":
+                    start = position
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+                    return chunk[start:position + 1]
+        return chunk[start:] if start is not None else ""
+
+    def flush(self):
+        return ""
+
+class StreamPostProcessor:
+    """
+    Chain of streaming stages
+
+    Example:
+        processor = StreamPostProcessor([CodeFenceStripper(), JsonExtractor()])
+        for chunk in chunks:
+            display(processor.feed(chunk))
+        display(processor.finish())
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def feed(self, chunk):
+        """
+        Process one chunk and return whatever output is ready
+        """
+        for stage in self.stages:
+            if not chunk:
+                return ""
+            chunk = stage.feed(chunk)
+        return chunk
+
+    def finish(self):
+        """
+        Flush carry-over state through the remaining stages
+        """
+        out = ""
+        for stage in self.stages:
+            if out:
+                out = stage.feed(out)
+            out += stage.flush()
+        return out
+
+    def process(self, text):
+        """
+        Run a complete text through the chain
+        """
+        return self.feed(text) + self.finish()
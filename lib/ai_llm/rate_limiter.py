@@ -0,0 +1,272 @@
+"""
+Client-side rate limiting driven by provider rate-limit headers
+
+Requests-per-minute and tokens-per-minute are tracked as token buckets.
+Limits are learned from the x-ratelimit-* response headers, each request
+reserves its estimated token cost before it is sent and is reconciled
+against the reported usage afterwards, and a 429 pauses all callers for
+the Retry-After period instead of letting them retry into the limit.
+"""
+
+from .utils import ticks_ms, ticks_diff, sleep_ms, get_header
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+def parse_duration(value):
+    """
+    Parse a reset/retry duration to milliseconds
+
+    Accepts plain seconds ("20", "1.5") and the compact form used by
+    x-ratelimit-reset-* headers ("6m0s", "1.2s", "250ms", "1h2m").
+
+    Returns:
+        Milliseconds, or None if value cannot be parsed
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return int(float(text) * 1000)
+    except ValueError:
+        pass
+    total = 0.0
+    number = ""
+    position = 0
+    length = len(text)
+    while position < length:
+        ch = text[position]
+        if ch.isdigit() or ch == ".":
+            number += ch
+            position += 1
+            continue
+        if not number:
+            return None
+        if text.startswith("ms", position):
+            scale = 1
+            position += 2
+        elif ch in "hms":
+            scale = {"h": 3600000, "m": 60000, "s": 1000}[ch]
+            position += 1
+        else:
+            return None
+        total += float(number) * scale
+        number = ""
+    if number:
+        return None
+    return int(total)
+
+def _as_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Continuously refilling bucket; unlimited until a limit is known
+    """
+
+    def __init__(self, per_minute=None, headroom=0.95):
+        self.headroom = headroom
+        self.capacity = None
+        self.level = 0.0
+        self._refilled = ticks_ms()
+        if per_minute:
+            self.set_limit(per_minute)
+
+    def set_limit(self, per_minute):
+        capacity = per_minute * self.headroom
+        if self.capacity is None:
+            self.level = capacity
+        self.capacity = capacity
+        self.level = min(self.level, capacity)
+
+    def refill(self, now):
+        elapsed = ticks_diff(now, self._refilled)
+        self._refilled = now
+        if self.capacity is not None and elapsed > 0:
+            self.level = min(self.capacity, self.level + self.capacity * elapsed / 60000)
+
+    def wait_ms(self, amount):
+        """
+        Milliseconds until amount is available (0 if it is now)
+        """
+        if self.capacity is None:
+            return 0
+        # A single request larger than the bucket only waits for a full one
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0
+        return int((amount - self.level) * 60000 / self.capacity) + 1
+
+    def take(self, amount):
+        """
+        Returns:
+            The amount actually taken (at most one full bucket)
+        """
+        if self.capacity is None:
+            return amount
+        amount = min(amount, self.capacity)
+        self.level -= amount
+        return amount
+
+    def give_back(self, amount):
+        self.level += amount
+        if self.capacity is not None:
+            self.level = min(self.level, self.capacity)
+
+    def sync(self, remaining):
+        """
+        Trust the server's remaining count when it is lower than ours
+        """
+        if self.capacity is not None and remaining is not None:
+            self.level = min(self.level, remaining * self.headroom)
+
+class RateLimiter:
+    """
+    Paces requests to stay just under the provider's RPM and TPM limits
+
+    Usage (AIClient does this around every request):
+        cost = limiter.reserve(estimated_tokens)
+        response = send()
+        limiter.update_from_headers(response.headers)
+        limiter.reconcile(cost, actual_tokens)  # or release(cost) on failure
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, headroom=0.95,
+                 max_wait_ms=60000):
+        self.requests = TokenBucket(requests_per_minute, headroom)
+        self.tokens = TokenBucket(tokens_per_minute, headroom)
+        self.max_wait_ms = max_wait_ms
+        self._paused_at = None
+        self._pause_ms = 0
+        self._lock = _thread.allocate_lock() if _thread else None
+        self.stats = {
+            "reserved": 0,
+            "waits": 0,
+            "waited_ms": 0,
+            "throttled": 0
+        }
+
+    def _acquire(self):
+        if self._lock:
+            self._lock.acquire()
+
+    def _release(self):
+        if self._lock:
+            self._lock.release()
+
+    def reserve(self, estimated_tokens):
+        """
+        Block until one request of estimated_tokens may be sent
+
+        Returns:
+            The token amount reserved, at most one full bucket (pass it
+            to reconcile or release)
+
+        Raises:
+            Exception: if the wait would exceed max_wait_ms
+        """
+        waited = 0
+        while True:
+            self._acquire()
+            try:
+                now = ticks_ms()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                delay = max(self.requests.wait_ms(1), self.tokens.wait_ms(estimated_tokens))
+                if self._paused_at is not None:
+                    delay = max(delay, self._pause_ms - ticks_diff(now, self._paused_at))
+                if delay <= 0:
+                    self._paused_at = None
+                    self.requests.take(1)
+                    reserved = self.tokens.take(estimated_tokens)
+                    self.stats["reserved"] += 1
+                    if waited:
+                        self.stats["waits"] += 1
+                        self.stats["waited_ms"] += waited
+                    return reserved
+            finally:
+                self._release()
+            if waited + delay > self.max_wait_ms:
+                raise Exception(f"Rate limit: request would wait {waited + delay} ms")
+            # Sleep in slices so a header update can shorten the wait
+            step = min(delay, 1000)
+            sleep_ms(step)
+            waited += step
+
+    def reconcile(self, reserved, actual_tokens):
+        """
+        Return over-reserved tokens (or charge the shortfall) once usage is known
+        """
+        if not actual_tokens:
+            return
+        self._acquire()
+        try:
+            self.tokens.give_back(reserved - actual_tokens)
+        finally:
+            self._release()
+
+    def release(self, reserved):
+        """
+        Give back a reservation whose request failed or will be retried
+        """
+        if not reserved:
+            return
+        self._acquire()
+        try:
+            self.tokens.give_back(reserved)
+        finally:
+            self._release()
+
+    def update_from_headers(self, headers):
+        """
+        Seed limits and remaining budget from x-ratelimit-* headers
+        """
+        limit_requests = _as_int(get_header(headers, "x-ratelimit-limit-requests"))
+        limit_tokens = _as_int(get_header(headers, "x-ratelimit-limit-tokens"))
+        remaining_requests = _as_int(get_header(headers, "x-ratelimit-remaining-requests"))
+        remaining_tokens = _as_int(get_header(headers, "x-ratelimit-remaining-tokens"))
+        self._acquire()
+        try:
+            if limit_requests:
+                self.requests.set_limit(limit_requests)
+            if limit_tokens:
+                self.tokens.set_limit(limit_tokens)
+            self.requests.sync(remaining_requests)
+            self.tokens.sync(remaining_tokens)
+        finally:
+            self._release()
+
+    def throttled(self, headers):
+        """
+        Record a 429: pause every caller until the server's reset time
+
+        Returns:
+            Pause length in milliseconds
+        """
+        delay = parse_duration(get_header(headers, "retry-after"))
+        if delay is None:
+            delay = max(parse_duration(get_header(headers, "x-ratelimit-reset-requests")) or 0,
+                        parse_duration(get_header(headers, "x-ratelimit-reset-tokens")) or 0)
+        if not delay:
+            delay = 1000
+        self.update_from_headers(headers)
+        self._acquire()
+        try:
+            self.stats["throttled"] += 1
+            self._paused_at = ticks_ms()
+            self._pause_ms = delay
+            self.requests.level = min(self.requests.level, 0)
+        finally:
+            self._release()
+        return delay
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["rpm_limit"] = self.requests.capacity
+        stats["tpm_limit"] = self.tokens.capacity
+        return stats
@@ -0,0 +1,186 @@
+"""
+Reactive obstacle avoidance (vector field histogram)
+
+Runs every sensor tick on the device, without any network I/O: sector
+distances are turned into an obstacle-density histogram, sectors closer
+than the safety distance (widened by one sector for the robot's body)
+are blocked, and the free sector nearest the goal heading is steered
+for. The LLM only sets the goal heading and speed, at its own pace.
+
+Angles are in degrees relative to the robot, 0 = straight ahead,
+positive = to the left. Sector k is centred on k * 360 / sector_count.
+A goal set from a plan is relative to the pose when it was planned; pass
+goal_heading to tick() from odometry to keep it current while turning.
+"""
+
+from array import array
+from .utils import ticks_us, ticks_diff, wrap_angle
+
+DIRECTION_HEADINGS = {
+    "forward": 0,
+    "left": 90,
+    "right": -90,
+    "backward": 180
+}
+
+def goal_from_command(nav_command):
+    """
+    Goal (heading, speed) from a navigation command in the LLM format
+
+    Returns:
+        (heading, speed) tuple; speed 0 for stop commands, None if the
+        command carries no usable direction
+    """
+    if not isinstance(nav_command, dict):
+        return None
+    parameters = nav_command.get("parameters") or {}
+    try:
+        speed = float(parameters.get("speed"))
+    except (TypeError, ValueError):
+        speed = None
+    if nav_command.get("action") == "stop":
+        return 0, 0.0
+    direction = nav_command.get("direction")
+    heading = DIRECTION_HEADINGS.get(direction)
+    try:
+        angle = float(parameters.get("angle"))
+    except (TypeError, ValueError):
+        angle = None
+    if angle is not None:
+        # "right"/"left" give the side, the angle only the amount
+        if direction == "right":
+            heading = -abs(angle)
+        elif direction == "left":
+            heading = abs(angle)
+        elif heading is None:
+            heading = angle
+    if heading is None:
+        return None
+    return wrap_angle(heading), speed
+
+class ReactiveController:
+    """
+    Fixed-cost VFH step over sector distances
+
+    Every tick does the same O(sector_count) work on preallocated arrays,
+    and the time it takes is recorded in stats (microseconds).
+    """
+
+    def __init__(self, sector_count=16, safety_distance=0.2, max_speed=1.0, max_range=4.0,
+                 slow_distance=None, influence_distance=None, heading_weight=1.0, density_weight=60.0):
+        self.sector_count = sector_count
+        self.safety_distance = safety_distance
+        self.max_speed = max_speed
+        self.max_range = max_range
+        # Full speed only with this much clearance in the steering direction
+        self.slow_distance = slow_distance or safety_distance * 5
+        # Obstacles further than this do not add to the density
+        self.influence_distance = influence_distance or safety_distance * 4
+        self.heading_weight = heading_weight
+        self.density_weight = density_weight
+        self.goal_heading = 0
+        self.goal_speed = 0.0
+        step = 360 / sector_count
+        self._angles = array("f", [wrap_angle(k * step) for k in range(sector_count)])
+        self._density = array("f", [0.0] * sector_count)
+        self._distance = array("f", [0.0] * sector_count)
+        self._blocked = bytearray(sector_count)
+        self.stats = {"ticks": 0, "last_us": 0, "max_us": 0, "total_us": 0, "stops": 0}
+
+    def set_goal(self, heading, speed=None):
+        """
+        Set the goal heading (degrees) and cruise speed (m/s, capped at max_speed)
+        """
+        self.goal_heading = wrap_angle(heading)
+        if speed is None:
+            speed = self.max_speed
+        self.goal_speed = max(0.0, min(speed, self.max_speed))
+
+    def tick(self, sector_distances, goal_heading=None):
+        """
+        Compute one motion command
+
+        Args:
+            sector_distances: sector_count distances in meters (None or
+                <= 0 means no return, i.e. free up to max_range)
+            goal_heading: Override the goal heading for this tick (e.g.
+                from odometry towards the current waypoint)
+
+        Returns:
+            Navigation command dict in the same shape the LLM produces
+        """
+        start = ticks_us()
+        count = self.sector_count
+        target = self.goal_heading if goal_heading is None else wrap_angle(goal_heading)
+        safety = self.safety_distance
+        influence = self.influence_distance
+        span = influence - safety
+        distance = self._distance
+        density = self._density
+        blocked = self._blocked
+
+        for k in range(count):
+            d = sector_distances[k]
+            if d is None or d <= 0:
+                d = self.max_range
+            distance[k] = d
+            if d >= influence:
+                density[k] = 0.0
+            elif d <= safety:
+                density[k] = 1.0
+            else:
+                density[k] = (influence - d) / span
+            blocked[k] = 1 if d < safety else 0
+
+        best = -1
+        best_cost = 0.0
+        for k in range(count):
+            # A sector is only passable if both neighbours are too
+            if blocked[k] or blocked[k - 1] or blocked[(k + 1) % count]:
+                continue
+            turn = abs(wrap_angle(self._angles[k] - target))
+            cost = self.heading_weight * turn + self.density_weight * density[k]
+            if best < 0 or cost < best_cost:
+                best = k
+                best_cost = cost
+
+        if best < 0 or self.goal_speed <= 0:
+            command = {
+                "action": "stop",
+                "safety_status": "danger" if best < 0 else "safe",
+                "explanation": "No free sector within safety distance" if best < 0 else "Goal reached or stop requested"
+            }
+            if best < 0:
+                self.stats["stops"] += 1
+        else:
+            steer = self._angles[best]
+            clearance = (distance[best] - safety) / (self.slow_distance - safety)
+            clearance = max(0.0, min(clearance, 1.0))
+            # Turn in place for large corrections, drive through small ones
+            if abs(steer) > 45:
+                action = "turn"
+                speed = 0.0
+            else:
+                action = "move"
+                speed = self.goal_speed * clearance * (1 - abs(steer) / 90)
+            command = {
+                "action": action,
+                "direction": "forward" if steer == 0 else "custom_angle",
+                "parameters": {"speed": round(speed, 3), "angle": round(steer, 1)},
+                "safety_status": "safe" if density[best] == 0 else "caution"
+            }
+        command["source"] = "reactive"
+
+        elapsed = ticks_diff(ticks_us(), start)
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["last_us"] = elapsed
+        stats["total_us"] += elapsed
+        if elapsed > stats["max_us"]:
+            stats["max_us"] = elapsed
+        return command
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["mean_us"] = stats["total_us"] / stats["ticks"] if stats["ticks"] else 0
+        return stats
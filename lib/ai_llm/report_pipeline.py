@@ -0,0 +1,127 @@
+"""
+Map-reduce summarization for report inputs too large for one prompt
+"""
+
+import ujson as json
+from .tokens import estimate_tokens
+from .utils import chunk_text, iter_chunks, iter_chunks_stream, map_bounded
+
+MAP_SYSTEM_PROMPT = (
+    "You condense raw data into compact notes for a later report. "
+    "Keep every figure, count, timestamp range, anomaly and repeated pattern "
+    "that matters for the stated goal. Plain text, no preamble."
+)
+
+def iter_records(data):
+    """
+    Yield serialized records from a dataset without serializing it whole
+
+    Dicts yield one "key: value" record per item, lists and other iterables
+    one record per element, strings and streams are chunked as text.
+    """
+    if data is None:
+        return
+    if isinstance(data, str):
+        yield data
+    elif hasattr(data, "read"):
+        for chunk in iter_chunks_stream(data):
+            yield chunk if isinstance(chunk, str) else chunk.decode()
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield f"{key}: {json.dumps(value)}"
+    else:
+        for item in data:
+            yield item if isinstance(item, str) else json.dumps(item)
+
+class MapReduceSummarizer:
+    """
+    Summarizes large datasets chunk by chunk, then reduces hierarchically
+
+    Records are packed into chunks bounded by chunk_tokens as they are
+    read, chunks are summarized with bounded parallelism, and summaries
+    are merged in groups until one text remains.
+    """
+
+    # Reduction rounds before giving up on shrinking further
+    max_rounds = 4
+
+    def __init__(self, ai_client, chunk_tokens=1500, max_workers=2, priority=None):
+        self.ai_client = ai_client
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.priority = priority
+
+    def iter_chunks(self, data):
+        """
+        Pack records into text chunks of at most chunk_tokens
+        """
+        parts = []
+        tokens = 0
+        for record in iter_records(data):
+            record_tokens = estimate_tokens(record)
+            if record_tokens > self.chunk_tokens:
+                # Oversized single record: flush, then split it on its own
+                if parts:
+                    yield "\n".join(parts)
+                    parts = []
+                    tokens = 0
+                for piece in iter_chunks(record, max_tokens=self.chunk_tokens):
+                    yield piece
+                continue
+            if parts and tokens + record_tokens > self.chunk_tokens:
+                yield "\n".join(parts)
+                parts = []
+                tokens = 0
+            parts.append(record)
+            tokens += record_tokens + 1
+        if parts:
+            yield "\n".join(parts)
+
+    def _summarize(self, text, goal):
+        prompt = f"Goal of the final report: {goal}\n\nData:\n{text}"
+        if self.priority is not None and getattr(self.ai_client, "supports_priority", False):
+            return self.ai_client.simple_chat(prompt, MAP_SYSTEM_PROMPT, priority=self.priority)
+        return self.ai_client.simple_chat(prompt, MAP_SYSTEM_PROMPT)
+
+    def reduce(self, summaries, goal):
+        """
+        Merge summaries in token-bounded groups until they fit one chunk
+
+        Returns:
+            Combined notes (may still be several summaries joined together
+            if they fit within chunk_tokens)
+        """
+        summaries = [s for s in summaries if s]
+        for _ in range(self.max_rounds):
+            if not summaries:
+                return None
+            combined = "\n---\n".join(summaries)
+            if len(summaries) == 1 or estimate_tokens(combined) <= self.chunk_tokens:
+                return combined
+            groups = chunk_text(combined, max_tokens=self.chunk_tokens)
+            if len(groups) >= len(summaries):
+                # Summaries are individually too large to merge; shrink each
+                groups = summaries
+            summaries = [s for s in map_bounded(
+                lambda group: self._summarize(group, goal), groups, self.max_workers
+            ) if s]
+        return "\n---\n".join(summaries) if summaries else None
+
+    def summarize(self, data, goal, chunks=None):
+        """
+        Map-reduce a dataset into notes that fit in one prompt
+
+        Args:
+            data: dict, list, iterable of records, string or readable stream
+            goal: What the final report should cover
+            chunks: Optional pre-built chunk iterator (overrides data)
+
+        Returns:
+            Notes string, or None if every summarization call failed
+        """
+        if chunks is None:
+            chunks = self.iter_chunks(data)
+        summaries = map_bounded(
+            lambda chunk: self._summarize(chunk, goal), chunks, self.max_workers
+        )
+        return self.reduce(summaries, goal)
@@ -0,0 +1,253 @@
+"""
+Local automation rules: trigger -> conditions -> actions
+
+Rules are written once (typically by the model) as JSON, compiled into
+tuples with their comparison functions resolved, and indexed by trigger
+source, so an incoming event only visits the rules listening to it.
+The rule set is saved on flash and reloaded at boot.
+
+Rule format:
+    {
+        "id": "hall_light",
+        "trigger": {"source": "hallway.motion", "op": "==", "value": true},
+        "conditions": [
+            {"source": "hallway.lux", "op": "<", "value": 40},
+            {"time_between": ["18:00", "06:00"]}
+        ],
+        "actions": [{"target": "hallway.main_light", "command": "on", "value": 80}]
+    }
+
+A time trigger is {"time": "07:30"} and fires from clock(). Trigger
+op/value are optional (any event from the source fires).
+"""
+
+import os
+import ujson as json
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b
+}
+
+def parse_time(text):
+    """
+    "HH:MM" to minutes since midnight (ValueError if malformed)
+    """
+    hours, minutes = str(text).split(":")
+    value = int(hours) * 60 + int(minutes)
+    if not 0 <= value < 1440:
+        raise ValueError(f"Time out of range: {text}")
+    return value
+
+def time_source(minute_of_day):
+    return "time:%02d:%02d" % (minute_of_day // 60, minute_of_day % 60)
+
+def _check(op, actual, expected):
+    try:
+        return op(actual, expected)
+    except TypeError:
+        # e.g. comparing a missing (None) reading with a number
+        return False
+
+class RuleEngine:
+    """
+    Trigger-indexed rule set
+
+    Conditions read the latest value seen for each source, so every
+    event is also recorded as state.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.rules = {}       # id -> rule definition (what gets saved)
+        self.rejected = []    # (id, reason) of rules that failed to compile
+        self.state = {}
+        self._index = {}      # trigger source -> [compiled rule]
+        self.stats = {"events": 0, "rules_checked": 0, "fired": 0}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _compile(self, rule):
+        trigger = rule.get("trigger") or {}
+        if "time" in trigger:
+            source = time_source(parse_time(trigger["time"]))
+        else:
+            source = trigger.get("source")
+        if not source:
+            raise ValueError("trigger needs a source or time")
+        trigger_test = None
+        if "op" in trigger:
+            trigger_test = (self._op(trigger["op"]), trigger.get("value"))
+
+        conditions = []
+        for condition in rule.get("conditions") or []:
+            if "time_between" in condition:
+                start, end = condition["time_between"]
+                conditions.append((None, parse_time(start), parse_time(end)))
+            else:
+                if not condition.get("source"):
+                    raise ValueError("condition needs a source")
+                conditions.append((condition["source"], self._op(condition.get("op", "==")), condition.get("value")))
+
+        actions = rule.get("actions")
+        if not actions or not isinstance(actions, list):
+            raise ValueError("rule has no actions")
+        for action in actions:
+            if not isinstance(action, dict) or not action.get("target") or not action.get("command"):
+                raise ValueError("actions need a target and a command")
+        return (rule["id"], source, trigger_test, tuple(conditions), actions)
+
+    @staticmethod
+    def _op(name):
+        op = _OPS.get(name)
+        if op is None:
+            raise ValueError(f"unknown operator '{name}'")
+        return op
+
+    def add_rule(self, rule):
+        """
+        Compile and index one rule (replacing a rule with the same id)
+
+        Returns:
+            True if added; otherwise the reason is appended to rejected
+        """
+        if not isinstance(rule, dict):
+            self.rejected.append((None, "rule is not an object"))
+            return False
+        rule_id = rule.get("id")
+        if not rule_id:
+            number = len(self.rules) + 1
+            while f"rule_{number}" in self.rules:
+                number += 1
+            rule_id = f"rule_{number}"
+        rule["id"] = rule_id
+        try:
+            compiled = self._compile(rule)
+        except (ValueError, TypeError, KeyError) as e:
+            self.rejected.append((rule_id, str(e)))
+            return False
+        self.remove_rule(rule_id)
+        self.rules[rule_id] = rule
+        self._index.setdefault(compiled[1], []).append(compiled)
+        return True
+
+    def add_rules(self, rules):
+        """
+        Returns:
+            Number of rules added
+        """
+        return len([rule for rule in rules if self.add_rule(rule)])
+
+    def remove_rule(self, rule_id):
+        if self.rules.pop(rule_id, None) is None:
+            return False
+        for source, bucket in list(self._index.items()):
+            bucket[:] = [compiled for compiled in bucket if compiled[0] != rule_id]
+            if not bucket:
+                del self._index[source]
+        return True
+
+    def evaluate(self, source, value, minute_of_day=None):
+        """
+        Record an event and return the actions of the rules it fires
+
+        Args:
+            source: Event source, e.g. "hallway.motion"
+            value: New value
+            minute_of_day: Current time for time_between conditions
+
+        Returns:
+            List of (rule_id, action) pairs
+        """
+        self.state[source] = value
+        self.stats["events"] += 1
+        fired = []
+        for rule_id, _, trigger_test, conditions, actions in self._index.get(source, ()):
+            self.stats["rules_checked"] += 1
+            if trigger_test and not _check(trigger_test[0], value, trigger_test[1]):
+                continue
+            if self._conditions_hold(conditions, minute_of_day):
+                self.stats["fired"] += 1
+                for action in actions:
+                    fired.append((rule_id, action))
+        return fired
+
+    def _conditions_hold(self, conditions, minute_of_day):
+        for source, first, second in conditions:
+            if source is None:
+                if minute_of_day is None:
+                    return False
+                if first <= second:
+                    inside = first <= minute_of_day < second
+                else:
+                    # Window over midnight
+                    inside = minute_of_day >= first or minute_of_day < second
+                if not inside:
+                    return False
+            elif not _check(first, self.state.get(source), second):
+                return False
+        return True
+
+    def clock(self, minute_of_day):
+        """
+        Fire time triggers for this minute
+
+        Returns:
+            List of (rule_id, action) pairs
+        """
+        source = time_source(minute_of_day)
+        if source not in self._index:
+            return []
+        return self.evaluate(source, True, minute_of_day)
+
+    def save(self, path=None):
+        """
+        Write the rule definitions to flash (via a temporary file, so a
+        reset mid-write keeps the old set)
+        """
+        path = path or self.path
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(list(self.rules.values()), f)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # Filesystems that will not rename over a file: until the
+            # rename below, load() falls back to the temporary copy
+            os.remove(path)
+            os.rename(temp_path, path)
+
+    def load(self, path=None):
+        """
+        Replace the rule set with the one saved at path
+
+        Falls back to the temporary copy left by an interrupted save.
+
+        Returns:
+            Number of rules loaded (0 if there is no readable saved set)
+        """
+        path = path or self.path
+        rules = None
+        for candidate in (path, path + ".tmp"):
+            try:
+                with open(candidate) as f:
+                    rules = json.load(f)
+            except OSError:
+                continue
+            except ValueError:
+                print(f"Error in load: {candidate} is not valid JSON")
+                continue
+            if isinstance(rules, list):
+                break
+            rules = None
+        if rules is None:
+            return 0
+        self.rules = {}
+        self._index = {}
+        return self.add_rules(rules)
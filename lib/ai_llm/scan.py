@@ -0,0 +1,198 @@
+"""
+Range scan preprocessing (lidar / ultrasonic arrays)
+
+One pass over a scan produces:
+    sectors     minimum distance per angular sector (0 = no return), the
+                input the reactive layer expects
+    obstacles   clusters of consecutive returns, nearest first, as
+                (bearing, distance, width) in polar form
+
+so a prompt carries a few dozen numbers instead of the raw scan. On
+CPython, NumPy is used when it is installed.
+
+Angles are in degrees relative to the robot, 0 = straight ahead,
+positive = to the left; sector k is centred on k * 360 / sector_count.
+"""
+
+import math
+from array import array
+from .utils import wrap_angle, format_number
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Obstacle:
+    """
+    A cluster of consecutive scan returns
+    """
+
+    def __init__(self, bearing, distance, width, points):
+        self.bearing = bearing      # degrees, centre of the cluster
+        self.distance = distance    # meters, nearest return
+        self.width = width          # degrees covered
+        self.points = points
+
+    def width_m(self):
+        """
+        Approximate width in meters at the nearest distance
+        """
+        return self.distance * math.radians(self.width)
+
+    def to_dict(self):
+        return {
+            "bearing": round(self.bearing, 1),
+            "distance": round(self.distance, 2),
+            "width": round(self.width, 1)
+        }
+
+class ScanSummary:
+    """
+    Sector minima and obstacle clusters of one scan
+    """
+
+    def __init__(self, sectors, obstacles, points, valid):
+        self.sectors = sectors
+        self.obstacles = obstacles
+        self.points = points
+        self.valid = valid
+
+    def nearest(self):
+        return self.obstacles[0] if self.obstacles else None
+
+    def to_dict(self):
+        return {
+            "sectors": [round(d, 2) for d in self.sectors],
+            "obstacles": [obstacle.to_dict() for obstacle in self.obstacles]
+        }
+
+    def to_text(self):
+        """
+        Compact polar summary for a prompt
+        """
+        step = 360 / len(self.sectors)
+        sectors = " ".join([format_number(d) if d else "-" for d in self.sectors])
+        obstacles = "; ".join([
+            f"{format_number(o.bearing)}°@{format_number(o.distance)}m w{format_number(o.width)}°"
+            for o in self.obstacles
+        ]) or "none"
+        return (f"{self.valid}/{self.points} returns; min distance per {format_number(step)}° sector "
+                f"from 0° (ahead) counterclockwise, - = clear: {sectors}; obstacles: {obstacles}")
+
+def process_scan(ranges, angles=None, angle_min=0.0, angle_increment=None, sector_count=16,
+                 max_range=8.0, cluster_gap=0.3, max_obstacles=8):
+    """
+    Bin a scan into sectors and cluster it into obstacles
+
+    Args:
+        ranges: Distances in meters; values <= 0, >= max_range or NaN
+            are treated as no return
+        angles: Angle of each range in degrees (default: angle_min +
+            i * angle_increment)
+        angle_increment: Degrees between readings (default: the mean
+            spacing of angles, else a full circle spread over the scan)
+        sector_count: Number of angular sectors
+        cluster_gap: A range jump larger than this (meters) or a missing
+            return starts a new obstacle
+        max_obstacles: Keep at most this many obstacles (the nearest)
+
+    Returns:
+        ScanSummary
+    """
+    count = len(ranges)
+    if angles is not None and count > 1:
+        span = float(angles[-1]) - float(angles[0])
+        if angle_increment is None:
+            angle_increment = span / (count - 1)
+        coverage = abs(span) + abs(angle_increment)
+    else:
+        if angle_increment is None:
+            angle_increment = 360 / count if count else 1.0
+        coverage = count * abs(angle_increment)
+    if np is not None:
+        sectors, clusters, valid = _scan_numpy(ranges, angles, angle_min, angle_increment,
+                                               sector_count, max_range, cluster_gap)
+    else:
+        sectors, clusters, valid = _scan_arrays(ranges, angles, angle_min, angle_increment,
+                                                sector_count, max_range, cluster_gap)
+    obstacles = _obstacles(clusters, count, angle_increment, cluster_gap, coverage >= 359)
+    obstacles.sort(key=lambda obstacle: obstacle.distance)
+    return ScanSummary(sectors, obstacles[:max_obstacles], count, valid)
+
+def _scan_arrays(ranges, angles, angle_min, angle_increment, sector_count, max_range, cluster_gap):
+    step = 360 / sector_count
+    sectors = array("f", [0.0] * sector_count)
+    # Clusters: [first index, last index, first angle, last angle, min range, first range, last range, points]
+    clusters = []
+    current = None
+    previous_index = -2
+    previous_range = 0.0
+    valid = 0
+    for i in range(len(ranges)):
+        r = ranges[i]
+        if r is None or r != r or r <= 0 or r >= max_range:
+            continue
+        valid += 1
+        angle = angles[i] if angles is not None else angle_min + i * angle_increment
+        k = int(((angle + step / 2) % 360) // step) % sector_count
+        if not sectors[k] or r < sectors[k]:
+            sectors[k] = r
+        if current is None or i != previous_index + 1 or abs(r - previous_range) > cluster_gap:
+            current = [i, i, angle, angle, r, r, r, 0]
+            clusters.append(current)
+        current[1] = i
+        current[3] = angle
+        current[6] = r
+        current[7] += 1
+        if r < current[4]:
+            current[4] = r
+        previous_index = i
+        previous_range = r
+    return sectors, clusters, valid
+
+def _scan_numpy(ranges, angles, angle_min, angle_increment, sector_count, max_range, cluster_gap):
+    step = 360 / sector_count
+    r = np.asarray(ranges, dtype=float)  # None becomes NaN
+    if angles is None:
+        a = angle_min + angle_increment * np.arange(len(r))
+    else:
+        a = np.asarray(angles, dtype=float)
+    with np.errstate(invalid="ignore"):
+        mask = (r > 0) & (r < max_range)
+    index = np.flatnonzero(mask)
+    sectors = np.full(sector_count, np.inf)
+    clusters = []
+    if len(index):
+        rv = r[index]
+        av = a[index]
+        bins = (((av + step / 2) % 360) // step).astype(int) % sector_count
+        np.minimum.at(sectors, bins, rv)
+        breaks = np.flatnonzero((np.diff(index) > 1) | (np.abs(np.diff(rv)) > cluster_gap)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(index)])) - 1
+        minima = np.minimum.reduceat(rv, starts)
+        for start, end, minimum in zip(starts.tolist(), ends.tolist(), minima.tolist()):
+            clusters.append([int(index[start]), int(index[end]), float(av[start]), float(av[end]),
+                             minimum, float(rv[start]), float(rv[end]), end - start + 1])
+    sectors[np.isinf(sectors)] = 0.0
+    return array("f", sectors.tolist()), clusters, len(index)
+
+def _obstacles(clusters, count, angle_increment, cluster_gap, full_circle):
+    # A full-circle scan can split one obstacle across its start and end
+    if (full_circle and len(clusters) > 1 and clusters[0][0] == 0 and clusters[-1][1] == count - 1
+            and abs(clusters[0][5] - clusters[-1][6]) <= cluster_gap):
+        first = clusters.pop(0)
+        last = clusters[-1]
+        last[1] = first[1]
+        last[3] = first[3]
+        last[4] = min(first[4], last[4])
+        last[7] += first[7]
+    obstacles = []
+    for cluster in clusters:
+        # Measured along the sweep, so clusters wider than 180° keep their size
+        points = cluster[7]
+        extent = points * abs(angle_increment)
+        bearing = wrap_angle(cluster[2] + (points - 1) * angle_increment / 2)
+        obstacles.append(Obstacle(bearing, cluster[4], extent, cluster[7]))
+    return obstacles
@@ -0,0 +1,266 @@
+"""
+Priority request scheduling for a shared AIClient
+
+Control-loop and safety traffic is served ahead of bulk analysis: queued
+requests are ordered by priority class, then deadline, then arrival, and
+one worker is reserved for urgent classes so a long report in flight
+cannot hold up a navigation or security decision.
+"""
+
+from .utils import ticks_ms, ticks_diff
+from .models import PRIORITY_CRITICAL, PRIORITY_CONTROL, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+class SchedulerError(Exception):
+    pass
+
+class _Ticket:
+    def __init__(self, messages, stream, priority, deadline_ms, sequence, temperature=None):
+        self.messages = messages
+        self.stream = stream
+        self.temperature = temperature
+        self.priority = priority
+        self.deadline_ms = deadline_ms
+        self.sequence = sequence
+        self.enqueued = ticks_ms()
+        self.result = None
+        self.error = None
+        # No lock without _thread: the ticket is finished before it is returned
+        self.done = _thread.allocate_lock() if _thread else None
+        if self.done:
+            self.done.acquire()
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        if self.done:
+            self.done.release()
+
+    def wait(self):
+        if self.done:
+            self.done.acquire()
+            self.done.release()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class RequestScheduler:
+    """
+    Wraps an AIClient with a priority queue and worker threads
+
+    Exposes the AIClient interface (chat_completion, simple_chat,
+    model_config) plus priority/deadline arguments, so applications can
+    share one scheduler instead of one client.
+
+    Ordering:
+        - lower priority class first; a queued bulk request is promoted
+          one class for every aging_ms it has waited (starvation
+          protection), but never above PRIORITY_INTERACTIVE, so aged
+          work cannot delay control or critical traffic
+        - within a class, earliest deadline first, then arrival order
+        - requests whose deadline passed while queued are dropped
+        - when the queue is full, the worst queued request is preempted
+          (fails with SchedulerError) to make room for a better one
+
+    Reserved workers only serve requests submitted as CONTROL or
+    CRITICAL. Idle workers block until a request arrives. Without
+    _thread, requests run inline in the caller.
+    """
+
+    supports_priority = True
+
+    def __init__(self, ai_client, workers=2, reserved_workers=1, max_queue=32, aging_ms=5000,
+                 default_priority=PRIORITY_INTERACTIVE):
+        self.ai_client = ai_client
+        self.max_queue = max_queue
+        self.aging_ms = aging_ms
+        self.default_priority = default_priority
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "preempted": 0,
+            "expired": 0,
+            "rejected": 0,
+            "max_wait_ms": [0, 0, 0, 0]
+        }
+        self._queue = []
+        self._idle = []       # (urgent_only, wake lock) of blocked workers
+        self._sequence = 0
+        self._running = _thread is not None
+        self._lock = _thread.allocate_lock() if _thread else None
+        if self._running:
+            for index in range(max(workers, 1)):
+                urgent_only = index < reserved_workers and workers > reserved_workers
+                _thread.start_new_thread(self._worker, (urgent_only,))
+
+    @property
+    def model_config(self):
+        return self.ai_client.model_config
+
+    def set_model_config(self, model_config):
+        self.ai_client.set_model_config(model_config)
+
+    def _rank(self, ticket, now):
+        """
+        Sort key: (effective class, deadline, arrival)
+        """
+        waited = ticks_diff(now, ticket.enqueued)
+        effective = ticket.priority
+        if self.aging_ms and effective > PRIORITY_INTERACTIVE:
+            effective = max(PRIORITY_INTERACTIVE, effective - waited // self.aging_ms)
+        # Requests without a deadline sort after those with one
+        remaining = ticket.deadline_ms - waited if ticket.deadline_ms is not None else 1 << 30
+        return (effective, remaining, ticket.sequence)
+
+    def submit(self, messages, stream=False, priority=None, deadline_ms=None, temperature=None):
+        """
+        Queue a chat completion
+
+        Args:
+            messages: Chat messages
+            priority: PRIORITY_* class (default_priority if None)
+            deadline_ms: Drop the request if not started within this many ms
+            temperature: Per-request temperature override
+
+        Returns:
+            Ticket; call ticket.wait() for the ChatResponse
+        """
+        if priority is None:
+            priority = self.default_priority
+        if not self._running:
+            ticket = _Ticket(messages, stream, priority, deadline_ms, self._sequence, temperature)
+            self.stats["submitted"] += 1
+            try:
+                ticket.finish(self._send(messages, stream, temperature))
+            except Exception as e:
+                ticket.finish(error=e)
+            self.stats["completed"] += 1
+            return ticket
+        now = ticks_ms()
+        self._lock.acquire()
+        try:
+            self._sequence += 1
+            ticket = _Ticket(messages, stream, priority, deadline_ms, self._sequence, temperature)
+            self.stats["submitted"] += 1
+            if len(self._queue) >= self.max_queue:
+                worst = max(self._queue, key=lambda queued: self._rank(queued, now))
+                if self._rank(worst, now) <= self._rank(ticket, now):
+                    self.stats["rejected"] += 1
+                    ticket.finish(error=SchedulerError("Request queue full"))
+                    return ticket
+                self._queue.remove(worst)
+                self.stats["preempted"] += 1
+                worst.finish(error=SchedulerError("Preempted by higher-priority request"))
+            self._queue.append(ticket)
+            self._wake(ticket)
+        finally:
+            self._lock.release()
+        return ticket
+
+    def _wake(self, ticket):
+        # Called with _lock held: release one idle worker that may serve ticket
+        for index, (urgent_only, wake) in enumerate(self._idle):
+            if not urgent_only or ticket.priority <= PRIORITY_CONTROL:
+                del self._idle[index]
+                wake.release()
+                return
+
+    def _next(self, urgent_only, wake):
+        """
+        Take the best queued request this worker may serve; if there is
+        none, register the worker as idle (wake is released on submit)
+        """
+        now = ticks_ms()
+        self._lock.acquire()
+        try:
+            best = None
+            best_rank = None
+            for ticket in list(self._queue):
+                if (ticket.deadline_ms is not None and
+                        ticks_diff(now, ticket.enqueued) > ticket.deadline_ms):
+                    self._queue.remove(ticket)
+                    self.stats["expired"] += 1
+                    ticket.finish(error=SchedulerError("Deadline passed while queued"))
+                    continue
+                if urgent_only and ticket.priority > PRIORITY_CONTROL:
+                    continue
+                rank = self._rank(ticket, now)
+                if best is None or rank < best_rank:
+                    best = ticket
+                    best_rank = rank
+            if best is not None:
+                self._queue.remove(best)
+                waited = ticks_diff(now, best.enqueued)
+                slot = min(best.priority, PRIORITY_BULK)
+                if waited > self.stats["max_wait_ms"][slot]:
+                    self.stats["max_wait_ms"][slot] = waited
+            else:
+                self._idle.append((urgent_only, wake))
+            return best
+        finally:
+            self._lock.release()
+
+    def _worker(self, urgent_only):
+        wake = _thread.allocate_lock()
+        wake.acquire()
+        while self._running:
+            ticket = self._next(urgent_only, wake)
+            if ticket is None:
+                wake.acquire()
+                continue
+            try:
+                ticket.finish(self._send(ticket.messages, ticket.stream, ticket.temperature))
+            except Exception as e:
+                ticket.finish(error=e)
+            self.stats["completed"] += 1
+
+    def _send(self, messages, stream, temperature):
+        if temperature is None:
+            return self.ai_client.chat_completion(messages, stream)
+        return self.ai_client.chat_completion(messages, stream, temperature=temperature)
+
+    def chat_completion(self, messages, stream=False, priority=None, deadline_ms=None, temperature=None):
+        """
+        Blocking chat completion through the priority queue
+
+        Returns:
+            ChatResponse, or None on error, preemption or missed deadline
+        """
+        if not self._running:
+            return self._send(messages, stream, temperature)
+        try:
+            return self.submit(messages, stream, priority, deadline_ms, temperature).wait()
+        except SchedulerError as e:
+            print(f"Error in chat_completion: {e}")
+            return None
+
+    def simple_chat(self, prompt, system_message=None, priority=None):
+        from .models import ChatMessage
+        messages = []
+        if system_message:
+            messages.append(ChatMessage("system", system_message))
+        messages.append(ChatMessage("user", prompt))
+        response = self.chat_completion(messages, priority=priority)
+        if response and response.choices:
+            return response.choices[0].message.content
+        return None
+
+    def queue_length(self):
+        return len(self._queue)
+
+    def stop(self):
+        """
+        Stop worker threads after their current request
+        """
+        self._running = False
+        if self._lock:
+            self._lock.acquire()
+            idle = self._idle
+            self._idle = []
+            self._lock.release()
+            for _, wake in idle:
+                wake.release()
@@ -0,0 +1,121 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls with the same key share one execution: the first caller
+runs the work, later callers wait for it and receive the same result or
+the same exception.
+"""
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+class _Call:
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.done = None
+
+class SingleFlight:
+    """
+    Thread-based single-flight group
+    """
+
+    def __init__(self):
+        self._lock = _thread.allocate_lock() if _thread else None
+        self._calls = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key, func):
+        """
+        Run func() unless an identical call is already in flight
+
+        Args:
+            key: Hashable identity of the work (e.g. the request body)
+            func: Zero-argument callable doing the work
+
+        Returns:
+            func's result (shared between coalesced callers)
+        """
+        if self._lock is None:
+            self.stats["calls"] += 1
+            self.stats["executed"] += 1
+            return func()
+
+        self._lock.acquire()
+        self.stats["calls"] += 1
+        call = self._calls.get(key)
+        if call is not None:
+            call.waiters += 1
+            self.stats["coalesced"] += 1
+            self._lock.release()
+            # The leader holds call.done until the result is ready
+            call.done.acquire()
+            call.done.release()
+        else:
+            call = _Call()
+            call.done = _thread.allocate_lock()
+            call.done.acquire()
+            self._calls[key] = call
+            self.stats["executed"] += 1
+            self._lock.release()
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+            finally:
+                self._lock.acquire()
+                del self._calls[key]
+                self._lock.release()
+                call.done.release()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+class AsyncSingleFlight:
+    """
+    asyncio/uasyncio single-flight group for coroutine callers
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    async def do(self, key, factory):
+        """
+        Await factory() unless an identical call is already in flight
+
+        Args:
+            key: Hashable identity of the work
+            factory: Zero-argument callable returning an awaitable
+        """
+        try:
+            import asyncio
+        except ImportError:
+            import uasyncio as asyncio
+
+        self.stats["calls"] += 1
+        call = self._calls.get(key)
+        if call is not None:
+            call.waiters += 1
+            self.stats["coalesced"] += 1
+            await call.done.wait()
+        else:
+            call = _Call()
+            call.done = asyncio.Event()
+            self._calls[key] = call
+            self.stats["executed"] += 1
+            try:
+                call.result = await factory()
+            except Exception as e:
+                call.error = e
+            finally:
+                del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,105 @@
+"""
+State mirror for delta status updates
+
+Remembers the device status last shown to the model as a tree of
+per-subtree checksums, so a new status can be diffed by descending only
+into subtrees whose checksum changed.
+"""
+
+from .utils import stable_dumps
+
+try:
+    from binascii import crc32
+except ImportError:
+    from ubinascii import crc32
+
+REMOVED = "removed"
+
+class StateMirror:
+    """
+    Per-application mirror of the last context given to the model
+
+    update() returns either the full status (on the first call, after a
+    reset and every full_snapshot_every calls) or only the changed part,
+    so prompt size follows the rate of change rather than the number of
+    devices.
+    """
+
+    def __init__(self, full_snapshot_every=4):
+        self.full_snapshot_every = full_snapshot_every
+        self._trees = {}
+        self._calls = {}
+
+    def _digest(self, value):
+        """
+        Build a checksum tree: (digest, children-or-None)
+        """
+        if isinstance(value, dict):
+            children = {}
+            digest = 0
+            for key in sorted(value, key=str):
+                child = self._digest(value[key])
+                children[key] = child
+                digest = crc32(f"{key}={child[0]:x};".encode(), digest)
+            return (digest, children)
+        return (crc32(stable_dumps(value).encode()), None)
+
+    def _diff(self, old, new, value, out):
+        """
+        Collect changed keys of value (with tree new) against tree old
+        """
+        old_children = old[1]
+        new_children = new[1]
+        for key, child in new_children.items():
+            previous = old_children.get(key)
+            if previous is not None and previous[0] == child[0]:
+                continue
+            if previous is not None and previous[1] is not None and child[1] is not None:
+                nested = {}
+                self._diff(previous, child, value[key], nested)
+                out[key] = nested
+            else:
+                out[key] = value[key]
+        for key in old_children:
+            if key not in new_children:
+                out[key] = REMOVED
+        return out
+
+    def update(self, label, status):
+        """
+        Record status as seen by the model and compute what changed
+
+        Args:
+            label: Kind of status (one mirror can track several)
+            status: Current status dictionary
+
+        Returns:
+            (is_full, data) where data is the full status when is_full is
+            True, otherwise a nested dict of changed values (empty if
+            nothing changed)
+        """
+        tree = self._digest(status)
+        previous = self._trees.get(label)
+        calls = self._calls.get(label, 0)
+        self._trees[label] = tree
+
+        if (previous is None or previous[1] is None or tree[1] is None or
+                calls >= self.full_snapshot_every - 1):
+            self._calls[label] = 0
+            return True, status
+
+        self._calls[label] = calls + 1
+        if previous[0] == tree[0]:
+            return False, {}
+        return False, self._diff(previous, tree, status, {})
+
+    def reset(self, label=None):
+        """
+        Forget mirrored state so the next update sends a full snapshot
+        """
+        if label is None:
+            self._trees = {}
+            self._calls = {}
+        else:
+            self._trees.pop(label, None)
+            self._calls.pop(label, None)
@@ -0,0 +1,379 @@
+"""
+Incremental task schedule over a dependency graph
+
+Tasks start as soon as their dependencies have finished, their
+resources are available and their not-before time has passed. Each task
+has a level (1 + the highest level of its dependencies), so processing
+changed tasks in level order settles every dependency before its
+dependents. A change marks only the tasks it touches; propagation stops
+at any task whose times come out unchanged. The work done therefore
+follows the size of the change, not the size of the schedule.
+
+Times are minutes from the schedule origin. A task needing an offline
+resource, or depending on such a task, is blocked (no start time) until
+the resource comes back.
+
+Task dicts use the TaskScheduler field names:
+    {"task_id": "mop", "estimated_duration": 30, "dependencies": ["vacuum"],
+     "resource_requirements": ["robot"], "earliest_start": 60}
+"""
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+def _minutes(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+class _Task:
+    def __init__(self, task_id, duration, dependencies, resources, not_before):
+        self.task_id = task_id
+        self.duration = duration
+        self.dependencies = dependencies
+        self.resources = resources
+        self.not_before = not_before
+        self.level = None
+        self.start = None
+        self.end = None
+        self.blocked = False
+        self.done = False
+        self.finished = None    # completion minute, when reported
+
+class TaskGraph:
+    """
+    Dependency graph holding the current start/end of every task
+
+    Example:
+        graph = TaskGraph(tasks)
+        graph.set_resource("robot", offline=True)
+        graph.slip("vacuum", 15)
+        changes = graph.reschedule()
+    """
+
+    def __init__(self, tasks=None):
+        self.tasks = {}
+        self._dependents = {}   # task id -> set of task ids depending on it
+        self._users = {}        # resource -> set of task ids needing it
+        self.offline = set()
+        self.available_at = {}  # resource -> minute it becomes available
+        self._queue = []
+        self._queued = set()
+        self._before = {}       # task id -> (start, end, blocked) before this round
+        self.stats = {"reschedules": 0, "visited": 0, "changed": 0}
+        if tasks:
+            self.add_tasks(tasks)
+            self.reschedule()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def _mark(self, task_id):
+        if task_id not in self._queued:
+            self._queued.add(task_id)
+            heapq.heappush(self._queue, (self.tasks[task_id].level, task_id))
+
+    def add_tasks(self, tasks):
+        """
+        Add or replace tasks (dependencies may refer to tasks in the same list)
+
+        Raises:
+            ValueError: on an unknown dependency or a dependency cycle
+        """
+        new = []
+        for entry in tasks:
+            task_id = entry.get("task_id") or entry.get("id")
+            if not task_id:
+                raise ValueError("task needs a task_id")
+            task = _Task(
+                task_id,
+                _minutes(entry.get("estimated_duration", entry.get("duration"))),
+                list(entry.get("dependencies") or []),
+                tuple(entry.get("resource_requirements") or entry.get("resources") or ()),
+                _minutes(entry.get("earliest_start", entry.get("not_before")))
+            )
+            new.append(task)
+        planned = dict([(task.task_id, task.dependencies) for task in new])
+        for task in new:
+            for dependency in task.dependencies:
+                if dependency not in self.tasks and dependency not in planned:
+                    raise ValueError(f"{task.task_id} depends on unknown task {dependency}")
+        # Checked before linking, so a rejected list leaves the graph as it was
+        self._check_cycles(planned)
+
+        for task in new:
+            old = self.tasks.get(task.task_id)
+            if old is not None:
+                self._unlink(old)
+                task.start, task.end, task.blocked = old.start, old.end, old.blocked
+            self.tasks[task.task_id] = task
+            self._dependents.setdefault(task.task_id, set())
+        for task in new:
+            for dependency in task.dependencies:
+                self._dependents[dependency].add(task.task_id)
+            for resource in task.resources:
+                self._users.setdefault(resource, set()).add(task.task_id)
+        pending = set(planned)
+        for task in new:
+            self._set_level(task, pending, [])
+        for task in new:
+            self._raise_levels(task)
+            self._mark(task.task_id)
+
+    def _set_level(self, task, pending, path):
+        if task.task_id not in pending:
+            return task.level
+        if task.task_id in path:
+            raise ValueError(f"dependency cycle through {task.task_id}")
+        path.append(task.task_id)
+        level = 0
+        for dependency in task.dependencies:
+            level = max(level, self._set_level(self.tasks[dependency], pending, path) + 1)
+        path.pop()
+        pending.discard(task.task_id)
+        task.level = level
+        return level
+
+    def _raise_levels(self, task):
+        # Dependents of a replaced task may now sit at or below its level
+        stack = [task]
+        while stack:
+            current = stack.pop()
+            for dependent_id in self._dependents[current.task_id]:
+                dependent = self.tasks[dependent_id]
+                if dependent.level <= current.level:
+                    dependent.level = current.level + 1
+                    stack.append(dependent)
+
+    def _check_cycles(self, planned):
+        """
+        Raise ValueError if linking planned ({task id: dependencies})
+        would create a dependency cycle
+
+        Iterative, so long chains do not hit the recursion limit. Existing
+        tasks are only walked when a task is being replaced, since an
+        unchanged graph cannot lead back to a brand new task.
+        """
+        replacing = any([task_id in self.tasks for task_id in planned])
+        state = {}  # task id -> True while on the current path, False once cleared
+        for root in planned:
+            if root in state:
+                continue
+            state[root] = True
+            stack = [(root, planned[root], 0)]
+            while stack:
+                task_id, dependencies, position = stack[-1]
+                if position == len(dependencies):
+                    state[task_id] = False
+                    stack.pop()
+                    continue
+                stack[-1] = (task_id, dependencies, position + 1)
+                dependency = dependencies[position]
+                seen = state.get(dependency)
+                if seen:
+                    raise ValueError(f"dependency cycle through {dependency}")
+                if seen is None:
+                    following = planned.get(dependency)
+                    if following is None:
+                        if not replacing:
+                            state[dependency] = False
+                            continue
+                        following = self.tasks[dependency].dependencies
+                    state[dependency] = True
+                    stack.append((dependency, following, 0))
+
+    def _unlink(self, task):
+        for dependency in task.dependencies:
+            if dependency in self._dependents:
+                self._dependents[dependency].discard(task.task_id)
+        for resource in task.resources:
+            users = self._users.get(resource)
+            if users is not None:
+                users.discard(task.task_id)
+
+    def remove_task(self, task_id):
+        """
+        Drop a task; its dependents no longer wait for it
+        """
+        task = self.tasks.pop(task_id)
+        if task_id not in self._before:
+            self._before[task_id] = (task.start, task.end, task.blocked)
+        self._unlink(task)
+        for dependent_id in self._dependents.pop(task_id):
+            dependent = self.tasks[dependent_id]
+            dependent.dependencies.remove(task_id)
+            self._mark(dependent_id)
+
+    def set_duration(self, task_id, minutes):
+        self.tasks[task_id].duration = _minutes(minutes)
+        self._mark(task_id)
+
+    def slip(self, task_id, minutes):
+        """
+        Start a task minutes later than currently planned
+        """
+        task = self.tasks[task_id]
+        task.not_before = (task.start if task.start is not None else task.not_before) + _minutes(minutes)
+        self._mark(task_id)
+
+    def complete(self, task_id, end=None):
+        """
+        Mark a task finished (at end, default its planned end)
+        """
+        task = self.tasks[task_id]
+        task.done = True
+        task.finished = _minutes(end) if end is not None else None
+        self._mark(task_id)
+
+    def set_resource(self, resource, offline=False, available_at=0):
+        """
+        Take a resource offline, or make it available from a given minute
+        """
+        if offline:
+            self.offline.add(resource)
+        else:
+            self.offline.discard(resource)
+            if available_at:
+                self.available_at[resource] = _minutes(available_at)
+            else:
+                self.available_at.pop(resource, None)
+        for task_id in self._users.get(resource, ()):
+            self._mark(task_id)
+
+    def apply(self, conditions):
+        """
+        Apply a dict of structured changes
+
+        Keys: offline / online (resource lists), available_at
+        ({resource: minute}), delays ({task: minutes}), durations
+        ({task: minutes}), completed ({task: end minute or None}), add
+        (task dicts), remove (task ids)
+
+        Every referenced task is checked before anything changes, so a
+        bad entry leaves the graph untouched.
+
+        Returns:
+            Keys of conditions that were not recognised
+
+        Raises:
+            KeyError: on an unknown task id
+            ValueError: on an invalid task to add
+        """
+        added = set()
+        for entry in conditions.get("add") or ():
+            added.add(entry.get("task_id") or entry.get("id"))
+        for key in ("remove", "durations", "delays", "completed"):
+            for task_id in conditions.get(key) or ():
+                if task_id not in self.tasks and (key == "remove" or task_id not in added):
+                    raise KeyError(task_id)
+        if conditions.get("add"):
+            # Validates the whole list before linking any of it
+            self.add_tasks(conditions["add"])
+        for resource in conditions.get("offline") or ():
+            self.set_resource(resource, offline=True)
+        for resource in conditions.get("online") or ():
+            self.set_resource(resource)
+        for resource, minute in (conditions.get("available_at") or {}).items():
+            self.set_resource(resource, available_at=minute)
+        for task_id in conditions.get("remove") or ():
+            self.remove_task(task_id)
+        for task_id, minutes in (conditions.get("durations") or {}).items():
+            self.set_duration(task_id, minutes)
+        for task_id, minutes in (conditions.get("delays") or {}).items():
+            self.slip(task_id, minutes)
+        for task_id, end in (conditions.get("completed") or {}).items():
+            self.complete(task_id, end)
+        known = ("offline", "online", "available_at", "add", "remove", "durations", "delays", "completed")
+        return [key for key in conditions if key not in known]
+
+    def _earliest(self, task):
+        # Planned start ignoring offline resources, for tasks reported done
+        start = task.not_before
+        for resource in task.resources:
+            start = max(start, self.available_at.get(resource, 0))
+        for dependency_id in task.dependencies:
+            end = self.tasks[dependency_id].end
+            if end is not None:
+                start = max(start, end)
+        return start
+
+    def _compute(self, task):
+        if task.done:
+            # A finished task always has concrete times, even if it was blocked
+            end = task.finished
+            if end is None:
+                end = task.end if task.end is not None and not task.blocked else self._earliest(task) + task.duration
+            if task.start is not None and not task.blocked:
+                start = min(task.start, end)
+            else:
+                start = end - task.duration
+            return start, end, False
+        start = task.not_before
+        for resource in task.resources:
+            if resource in self.offline:
+                return None, None, True
+            start = max(start, self.available_at.get(resource, 0))
+        for dependency_id in task.dependencies:
+            dependency = self.tasks[dependency_id]
+            if dependency.blocked:
+                return None, None, True
+            start = max(start, dependency.end)
+        return start, start + task.duration, False
+
+    def reschedule(self):
+        """
+        Recompute start times for the tasks affected by pending changes
+
+        Returns:
+            {task_id: {"start", "end", "blocked", "previous_start"}} for
+            every task whose times changed (None start/end when removed)
+        """
+        self.stats["reschedules"] += 1
+        before = self._before
+        while self._queue:
+            _, task_id = heapq.heappop(self._queue)
+            self._queued.discard(task_id)
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            self.stats["visited"] += 1
+            start, end, blocked = self._compute(task)
+            if (start, end, blocked) == (task.start, task.end, task.blocked):
+                continue
+            if task_id not in before:
+                before[task_id] = (task.start, task.end, task.blocked)
+            task.start, task.end, task.blocked = start, end, blocked
+            for dependent_id in self._dependents[task_id]:
+                self._mark(dependent_id)
+
+        changes = {}
+        for task_id, previous in before.items():
+            task = self.tasks.get(task_id)
+            if task is None or previous != (task.start, task.end, task.blocked):
+                changes[task_id] = {
+                    "start": task.start if task else None,
+                    "end": task.end if task else None,
+                    "blocked": task.blocked if task else False,
+                    "previous_start": previous[0]
+                }
+        self._before = {}
+        self.stats["changed"] += len(changes)
+        return changes
+
+    def to_list(self):
+        """
+        The whole schedule, in start order (blocked tasks last)
+        """
+        tasks = sorted(self.tasks.values(), key=lambda task: (task.blocked, task.start or 0, task.task_id))
+        return [{
+            "task_id": task.task_id,
+            "start": task.start,
+            "end": task.end,
+            "blocked": task.blocked,
+            "done": task.done,
+            "dependencies": task.dependencies,
+            "resource_requirements": list(task.resources)
+        } for task in tasks]
@@ -0,0 +1,187 @@
+"""
+Compiled prompt templates
+
+A template is parsed once into literal and slot segments. render() fills
+the slots and joins the segments, so the template text is never parsed
+again; render_into() writes the segments straight to a stream without
+building the whole string.
+"""
+
+import sys
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = lambda text: text
+
+class _Unsupported(Exception):
+    # Raised while compiling a template str.format has to render itself
+    pass
+
+class PromptTemplate:
+    """
+    str.format-compatible template compiled into segments
+
+    Supports {name}, {name.attr}, {name[key]}, {name:spec},
+    {name!r}/{name!s} and {{ }} escapes. Templates using positional
+    fields or nested format specs are kept as-is and rendered with
+    str.format.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self._parts = []
+        self._slots = []  # (part index, name, conversion, spec, access format)
+        self._fallback = False
+        try:
+            self._compile(template)
+        except _Unsupported:
+            self._fallback = True
+            self._parts = (template,)
+            self._slots = []
+        self.names = tuple(sorted(set([slot[1] for slot in self._slots])))
+
+    def _compile(self, template):
+        literal = []
+        position = 0
+        length = len(template)
+        while position < length:
+            ch = template[position]
+            if ch == "{":
+                if template.startswith("{{", position):
+                    literal.append("{")
+                    position += 2
+                    continue
+                close = template.find("}", position)
+                if close < 0:
+                    raise ValueError(f"Unclosed '{{' at position {position} in template")
+                if template.find("{", position + 1, close) >= 0:
+                    # Nested format spec such as {value:{width}}
+                    raise _Unsupported()
+                self._add_literal(literal)
+                literal = []
+                self._add_slot(template[position + 1:close])
+                position = close + 1
+            elif ch == "}":
+                if not template.startswith("}}", position):
+                    raise ValueError(f"Single '}}' at position {position} in template")
+                literal.append("}")
+                position += 2
+            else:
+                # Copy the run of plain text up to the next brace in one slice
+                next_open = template.find("{", position)
+                next_close = template.find("}", position)
+                stops = [i for i in (next_open, next_close) if i >= 0]
+                end = min(stops) if stops else length
+                literal.append(template[position:end])
+                position = end
+        self._add_literal(literal)
+        self._parts = tuple(self._parts)
+
+    def _add_literal(self, pieces):
+        if pieces:
+            self._parts.append(_intern("".join(pieces)))
+
+    def _add_slot(self, field):
+        spec = ""
+        conversion = None
+        colon = field.find(":")
+        if colon >= 0:
+            field, spec = field[:colon], field[colon + 1:]
+        bang = field.find("!")
+        if bang >= 0:
+            field, conversion = field[:bang], field[bang + 1:]
+            if conversion not in ("r", "s"):
+                raise ValueError(f"Unsupported conversion '!{conversion}' in template")
+        field = field.strip()
+        # Values are looked up by the base name; .attr / [key] apply to it
+        cut = len(field)
+        for mark in ".[":
+            index = field.find(mark)
+            if 0 <= index < cut:
+                cut = index
+        name, access = field[:cut], field[cut:]
+        if not name or not (name[0].isalpha() or name[0] == "_"):
+            # Positional field ({} or {0})
+            raise _Unsupported()
+        if access:
+            # Attribute/index access is left to str.format, on one value
+            access = "{0" + access + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}"
+        self._slots.append((len(self._parts), name, conversion, spec, access))
+        self._parts.append(None)
+
+    def missing(self, values):
+        """
+        Names the template needs that values does not provide
+        """
+        return [name for name in self.names if name not in values]
+
+    def _value(self, slot, values):
+        value = values[slot[1]]
+        if slot[4]:
+            return slot[4].format(value)
+        if slot[2] == "r":
+            value = repr(value)
+        elif slot[2] == "s":
+            value = str(value)
+        if slot[3]:
+            return format(value, slot[3])
+        return value if isinstance(value, str) else str(value)
+
+    def render(self, **values):
+        """
+        Render the template
+
+        Raises:
+            ValueError: listing every missing variable
+        """
+        if self._fallback:
+            try:
+                return self.template.format(**values)
+            except KeyError as e:
+                raise ValueError(f"Missing template variables: {e.args[0]}")
+        pieces = list(self._parts)
+        try:
+            for slot in self._slots:
+                pieces[slot[0]] = self._value(slot, values)
+        except KeyError:
+            missing = self.missing(values)
+            if not missing:
+                raise
+            raise ValueError(f"Missing template variables: {', '.join(missing)}")
+        return "".join(pieces)
+
+    def render_into(self, write, **values):
+        """
+        Write the rendered template segment by segment
+
+        Args:
+            write: Callable such as stream.write or list.append
+        """
+        if self._fallback:
+            write(self.render(**values))
+            return
+        missing = self.missing(values)
+        if missing:
+            raise ValueError(f"Missing template variables: {', '.join(missing)}")
+        slots = iter(self._slots)
+        for part in self._parts:
+            if part is None:
+                write(self._value(next(slots), values))
+            else:
+                write(part)
+
+_cache = {}
+CACHE_SIZE = 16
+
+def compile_template(template):
+    """
+    Get a compiled template, reusing the compiled form of recent templates
+    """
+    compiled = _cache.get(template)
+    if compiled is None:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        compiled = PromptTemplate(template)
+        _cache[template] = compiled
+    return compiled
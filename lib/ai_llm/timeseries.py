@@ -0,0 +1,195 @@
+"""
+Sensor time series with shape-preserving downsampling
+
+Readings are kept per channel in fixed-size ring buffers of float arrays
+and reduced to a point budget before they go into a prompt, so the token
+cost of a trend query does not grow with the length of the window.
+
+Two reducers are provided:
+    lttb     Largest-Triangle-Three-Buckets; keeps the points that carry
+             the visual shape of the curve
+    minmax   min/max envelope per bucket; keeps every extreme (spikes)
+
+On CPython, NumPy is used per bucket when it is installed.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class SeriesBuffer:
+    """
+    Ring buffer of (time, value) samples
+
+    Times are stored as float offsets from the first sample so single
+    precision floats keep sub-second resolution over days.
+    """
+
+    def __init__(self, capacity=1440):
+        self.capacity = capacity
+        self.origin = None
+        self._times = array("f")
+        self._values = array("f")
+        self._head = 0
+
+    def __len__(self):
+        return len(self._times)
+
+    def append(self, timestamp, value):
+        if self.origin is None:
+            self.origin = timestamp
+        offset = timestamp - self.origin
+        if len(self._times) < self.capacity:
+            self._times.append(offset)
+            self._values.append(value)
+        else:
+            # Overwrite the oldest sample
+            self._times[self._head] = offset
+            self._values[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+
+    def series(self):
+        """
+        Samples in time order
+
+        Returns:
+            (times, values) arrays; times are offsets from origin
+        """
+        head = self._head
+        if not head:
+            return self._times, self._values
+        return (self._times[head:] + self._times[:head],
+                self._values[head:] + self._values[:head])
+
+    def clear(self):
+        self.origin = None
+        self._times = array("f")
+        self._values = array("f")
+        self._head = 0
+
+def _bucket_bounds(length, buckets, index):
+    # Interior points 1 .. length-2 are split into equal buckets
+    size = (length - 2) / buckets
+    start = int(index * size) + 1
+    end = int((index + 1) * size) + 1
+    return start, min(end, length - 1)
+
+def lttb(times, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Args:
+        times, values: Equal-length sequences in time order
+        threshold: Number of points to keep (>= 3)
+
+    Returns:
+        List of selected sample indices, first and last always included
+    """
+    length = len(values)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+    if np is not None:
+        return _lttb_numpy(np.asarray(times, dtype=float), np.asarray(values, dtype=float), threshold)
+    buckets = threshold - 2
+    selected = [0]
+    a = 0
+    for index in range(buckets):
+        start, end = _bucket_bounds(length, buckets, index)
+        # Average of the next bucket (or the last point) is the third vertex
+        if index + 1 < buckets:
+            next_start, next_end = _bucket_bounds(length, buckets, index + 1)
+        else:
+            next_start, next_end = length - 1, length
+        count = next_end - next_start
+        avg_t = 0.0
+        avg_v = 0.0
+        for j in range(next_start, next_end):
+            avg_t += times[j]
+            avg_v += values[j]
+        avg_t /= count
+        avg_v /= count
+        at = times[a]
+        av = values[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((at - avg_t) * (values[j] - av) - (at - times[j]) * (avg_v - av))
+            if area > best_area:
+                best_area = area
+                best = j
+        selected.append(best)
+        a = best
+    selected.append(length - 1)
+    return selected
+
+def _lttb_numpy(times, values, threshold):
+    length = len(values)
+    buckets = threshold - 2
+    selected = [0]
+    a = 0
+    for index in range(buckets):
+        start, end = _bucket_bounds(length, buckets, index)
+        if index + 1 < buckets:
+            next_start, next_end = _bucket_bounds(length, buckets, index + 1)
+        else:
+            next_start, next_end = length - 1, length
+        avg_t = times[next_start:next_end].mean()
+        avg_v = values[next_start:next_end].mean()
+        at = times[a]
+        av = values[a]
+        areas = np.abs((at - avg_t) * (values[start:end] - av) - (at - times[start:end]) * (avg_v - av))
+        a = start + int(areas.argmax())
+        selected.append(a)
+    selected.append(length - 1)
+    return selected
+
+def minmax(times, values, threshold):
+    """
+    Min/max envelope downsampling
+
+    Keeps the minimum and maximum of each bucket (in time order), so
+    short spikes survive that LTTB might average away.
+
+    Returns:
+        List of selected sample indices
+    """
+    length = len(values)
+    if threshold >= length or threshold < 4:
+        return list(range(length))
+    buckets = (threshold - 2) // 2
+    selected = [0]
+    for index in range(buckets):
+        start, end = _bucket_bounds(length, buckets, index)
+        if start >= end:
+            continue
+        low = high = start
+        for j in range(start + 1, end):
+            if values[j] < values[low]:
+                low = j
+            elif values[j] > values[high]:
+                high = j
+        if low == high:
+            selected.append(low)
+        else:
+            selected.append(min(low, high))
+            selected.append(max(low, high))
+    selected.append(length - 1)
+    return selected
+
+REDUCERS = {"lttb": lttb, "minmax": minmax}
+
+def downsample(times, values, points, method="lttb"):
+    """
+    Reduce a series to about points samples
+
+    Returns:
+        (times, values) lists of the kept samples
+    """
+    reducer = REDUCERS.get(method)
+    if reducer is None:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    indices = reducer(times, values, points)
+    return [times[i] for i in indices], [values[i] for i in indices]
@@ -0,0 +1,170 @@
+"""
+Approximate token counting for request sizing
+
+A character-class table approximates BPE tokenizers (cl100k-style) closely
+enough to size prompts and chunks without shipping a vocabulary. On
+CPython, tiktoken is used for exact counts when it is installed.
+"""
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Character classes for the ASCII range
+_OTHER = 0
+_LETTER = 1
+_DIGIT = 2
+_SPACE = 3
+_NEWLINE = 4
+_PUNCT = 5
+_NONASCII = 6
+
+def _build_class_table():
+    table = bytearray(128)
+    for code in range(128):
+        ch = chr(code)
+        if ch.isalpha():
+            table[code] = _LETTER
+        elif ch.isdigit():
+            table[code] = _DIGIT
+        elif ch == " " or ch == "\t":
+            table[code] = _SPACE
+        elif ch == "\n" or ch == "\r":
+            table[code] = _NEWLINE
+        elif 33 <= code <= 126:
+            table[code] = _PUNCT
+    return table
+
+_CLASS_TABLE = _build_class_table()
+
+# Per-message framing overhead of the chat format, and reply priming
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576
+}
+
+_encoding = None
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+def _run_cost(run_class, run_length):
+    if run_class == _LETTER:
+        return (run_length + 5) // 6
+    if run_class == _DIGIT:
+        return (run_length + 2) // 3
+    if run_class == _SPACE:
+        # A single space merges into the following word
+        return 0 if run_length == 1 else 1 + (run_length - 2) // 8
+    if run_class == _PUNCT or run_class == _NEWLINE:
+        return (run_length + 1) // 2
+    return run_length
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in text
+
+    Args:
+        text: String to measure
+
+    Returns:
+        Token count (exact when tiktoken is available)
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+
+    table = _CLASS_TABLE
+    tokens = 0
+    run_class = None
+    run_length = 0
+    for ch in text:
+        code = ord(ch)
+        char_class = table[code] if code < 128 else _NONASCII
+        if char_class == run_class:
+            run_length += 1
+        else:
+            if run_length:
+                tokens += _run_cost(run_class, run_length)
+            run_class = char_class
+            run_length = 1
+    return tokens + _run_cost(run_class, run_length)
+
+def estimate_message_tokens(messages):
+    """
+    Estimate prompt tokens for a list of ChatMessage objects or dicts
+    """
+    counter = TokenCounter()
+    for message in messages:
+        counter.add_message(message)
+    return counter.total + REPLY_OVERHEAD
+
+def get_context_window(model_name):
+    """
+    Look up the context window for a model name (prefix match)
+
+    Returns:
+        Window size in tokens, or None if unknown
+    """
+    if model_name in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model_name]
+    best = None
+    for name, window in MODEL_CONTEXT_WINDOWS.items():
+        if model_name.startswith(name) and (best is None or len(name) > len(best[0])):
+            best = (name, window)
+    return best[1] if best else None
+
+class TokenCounter:
+    """
+    Incremental token counter for message assembly
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, text):
+        """
+        Count text and return its token estimate
+        """
+        tokens = estimate_tokens(text)
+        self.total += tokens
+        return tokens
+
+    def add_message(self, message):
+        """
+        Count a ChatMessage or message dict including framing overhead
+        """
+        if isinstance(message, dict):
+            content = message.get("content")
+            name = message.get("name")
+        else:
+            content = message.content
+            name = message.name
+        tokens = MESSAGE_OVERHEAD + estimate_tokens(content or "")
+        if name:
+            tokens += estimate_tokens(name)
+        self.total += tokens
+        return tokens
+
+    def fits(self, budget):
+        return self.total <= budget
+
+    def reset(self):
+        self.total = 0
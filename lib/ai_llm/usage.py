@@ -0,0 +1,215 @@
+"""
+Time-bucketed usage aggregation for energy and lighting reports
+
+Samples are added as they arrive and summed into per-device hourly and
+daily ring buffers (float arrays). Memory depends only on the number of
+devices and the retention (hourly_buckets + daily_buckets floats each),
+never on the number of samples, and a report prompt is built from fixed
+aggregates: daily and hourly totals, per-zone totals and the top-N
+devices.
+"""
+
+import time
+from array import array
+from .utils import format_number
+
+class UsageAggregator:
+    """
+    Hourly/daily rollups per (zone, device)
+
+    Example:
+        usage = UsageAggregator(unit="kWh")
+        for sample in meter_readings:
+            usage.add(sample["device"], sample["kwh"], sample["timestamp"], sample["room"])
+        prompt_context = usage.to_text()
+    """
+
+    def __init__(self, hourly_buckets=48, daily_buckets=30, max_series=64, utc_offset=0, unit=""):
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        self.max_series = max_series
+        # Seconds added to timestamps so days roll over at local midnight
+        self.utc_offset = utc_offset
+        self.unit = unit
+        self._series = {}     # (zone, device) -> series number
+        self._keys = []
+        self._hourly = []
+        self._daily = []
+        self._hour = None     # newest hour seen (hours since epoch)
+        self._day = None
+        self.stats = {"samples": 0, "dropped_old": 0, "dropped_series": 0}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _series_index(self, zone, device):
+        key = (zone or "", device)
+        index = self._series.get(key)
+        if index is None:
+            if len(self._keys) >= self.max_series:
+                return None
+            index = len(self._keys)
+            self._series[key] = index
+            self._keys.append(key)
+            self._hourly.append(array("f", [0.0] * self.hourly_buckets))
+            self._daily.append(array("f", [0.0] * self.daily_buckets))
+        return index
+
+    @staticmethod
+    def _advance(rings, current, new, size):
+        """
+        Zero the slots of the periods between current and new
+        """
+        if current is None:
+            return new
+        if new <= current:
+            return current
+        for period in range(current + 1, min(new, current + size) + 1):
+            slot = period % size
+            for ring in rings:
+                ring[slot] = 0.0
+        return new
+
+    def add(self, device, value, timestamp=None, zone=None):
+        """
+        Add one usage sample
+
+        Args:
+            device: Device name
+            value: Amount used since the previous sample (e.g. kWh, or
+                seconds switched on)
+            timestamp: Sample time in seconds (default: now)
+            zone: Optional zone/room name
+
+        Returns:
+            False if the sample was dropped (older than the retention, or
+            over max_series devices)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        local = timestamp + self.utc_offset
+        hour = int(local // 3600)
+        day = int(local // 86400)
+        self._hour = self._advance(self._hourly, self._hour, hour, self.hourly_buckets)
+        self._day = self._advance(self._daily, self._day, day, self.daily_buckets)
+        if day <= self._day - self.daily_buckets:
+            self.stats["dropped_old"] += 1
+            return False
+        index = self._series_index(zone, device)
+        if index is None:
+            self.stats["dropped_series"] += 1
+            return False
+        self.stats["samples"] += 1
+        if hour > self._hour - self.hourly_buckets:
+            self._hourly[index][hour % self.hourly_buckets] += value
+        self._daily[index][day % self.daily_buckets] += value
+        return True
+
+    def ingest(self, samples, device_key="device", value_key="value", time_key="timestamp", zone_key="zone"):
+        """
+        Add samples from any iterable of dicts (consumed lazily)
+
+        Returns:
+            Number of samples added
+        """
+        added = 0
+        for sample in samples:
+            value = sample.get(value_key)
+            if isinstance(value, (int, float)) and self.add(
+                    sample.get(device_key, "unknown"), value, sample.get(time_key), sample.get(zone_key)):
+                added += 1
+        return added
+
+    def _window(self, rings, newest, size, count):
+        """
+        Per-period totals across all series, oldest first
+        """
+        count = min(count, size)
+        totals = []
+        if newest is None:
+            return totals
+        for period in range(newest - count + 1, newest + 1):
+            slot = period % size
+            totals.append(sum([ring[slot] for ring in rings]))
+        return totals
+
+    def _series_totals(self, days):
+        days = min(days, self.daily_buckets)
+        slots = [period % self.daily_buckets for period in range(self._day - days + 1, self._day + 1)]
+        return [sum([ring[slot] for slot in slots]) for ring in self._daily]
+
+    def _advance_to(self, now):
+        """
+        Roll the rings forward to now, so windows end at the current time
+        """
+        if now is None:
+            now = time.time()
+        local = now + self.utc_offset
+        self._hour = self._advance(self._hourly, self._hour, int(local // 3600), self.hourly_buckets)
+        self._day = self._advance(self._daily, self._day, int(local // 86400), self.daily_buckets)
+
+    def summary(self, top_n=5, hours=24, days=7, now=None):
+        """
+        Compact aggregates over the most recent period
+
+        Args:
+            now: Current time in seconds (default: time.time()); periods
+                after the newest sample count as zero
+
+        Returns:
+            Dictionary with total, daily and hourly totals (oldest
+            first), per-zone totals and the top_n devices, all over the
+            last days days (hourly: last hours hours)
+        """
+        if self._day is not None:
+            self._advance_to(now)
+        if self._day is None:
+            return {"total": 0, "daily": [], "hourly": [], "zones": {}, "top": [], "devices": 0}
+        totals = self._series_totals(days)
+        zones = {}
+        for (zone, device), amount in zip(self._keys, totals):
+            zones[zone] = zones.get(zone, 0.0) + amount
+        ranked = sorted(range(len(totals)), key=lambda i: totals[i], reverse=True)[:top_n]
+        return {
+            "total": sum(totals),
+            "daily": self._window(self._daily, self._day, self.daily_buckets, days),
+            "hourly": self._window(self._hourly, self._hour, self.hourly_buckets, hours),
+            "last_hour": self._hour % 24,
+            "zones": zones,
+            "top": [(self._keys[i][0], self._keys[i][1], totals[i]) for i in ranked if totals[i]],
+            "devices": len(self._keys)
+        }
+
+    def to_text(self, top_n=5, hours=24, days=7, now=None):
+        """
+        Fixed-size report context built from summary()
+        """
+        data = self.summary(top_n, hours, days, now)
+        total = data["total"]
+        unit = f" {self.unit}" if self.unit else ""
+
+        def share(amount):
+            return f"{format_number(amount)}{unit} ({round(100 * amount / total) if total else 0}%)"
+
+        lines = [f"Usage over last {days} days: total {format_number(total)}{unit}, {data['devices']} devices"]
+        if data["daily"]:
+            lines.append("Daily totals, oldest first: " + " ".join([format_number(v) for v in data["daily"]]))
+        if data["hourly"]:
+            lines.append(f"Hourly totals, oldest first, last hour {data['last_hour']:02d}:00: "
+                         + " ".join([format_number(v) for v in data["hourly"]]))
+        zones = sorted(data["zones"].items(), key=lambda item: item[1], reverse=True)
+        if len(zones) > 1 or (zones and zones[0][0]):
+            lines.append("By zone: " + ", ".join([f"{zone or 'unassigned'} {share(amount)}" for zone, amount in zones]))
+        if data["top"]:
+            lines.append(f"Top {len(data['top'])} devices: " + ", ".join([
+                f"{zone + '/' if zone else ''}{device} {share(amount)}" for zone, device, amount in data["top"]
+            ]))
+        return "\n".join(lines)
+
+    def clear(self):
+        self._series = {}
+        self._keys = []
+        self._hourly = []
+        self._daily = []
+        self._hour = None
+        self._day = None
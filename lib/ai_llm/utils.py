@@ -1,21 +1,30 @@
 import ujson as json
-import re
+import time
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
 
 def format_prompt(template, **kwargs):
     """
     Format a prompt template with given parameters
     
+    The template is compiled once and cached, so repeat calls only fill
+    in the slots.
+    
     Args:
         template: String template with {variable} placeholders
         **kwargs: Variables to substitute
         
     Returns:
-        Formatted string
+        Formatted string (the template itself if variables are missing)
     """
+    from .templates import compile_template
     try:
-        return template.format(**kwargs)
-    except KeyError as e:
-        print(f"Missing template variable: {e}")
+        return compile_template(template).render(**kwargs)
+    except ValueError as e:
+        print(e)
         return template
 
 def validate_response(response_text):
@@ -31,60 +40,200 @@ def validate_response(response_text):
     if not response_text:
         return ""
     
-    # Remove excessive whitespace
-    cleaned = re.sub(r'\s+', ' ', response_text.strip())
+    # Same stages as a streaming consumer would chain, run in one pass:
+    # collapse whitespace, then remove common AI prefixes
+    from .postprocess import StreamPostProcessor, WhitespaceNormalizer, PrefixStripper
+    return StreamPostProcessor([WhitespaceNormalizer(), PrefixStripper()]).process(response_text)
+
+_WHITESPACE = " \t\n\r"
+_WHITESPACE_BYTES = b" \t\n\r"
+
+def _word_tokens(text, start, stop):
+    from .tokens import estimate_tokens
+    word = text[start:stop]
+    if not isinstance(word, str):
+        word = bytes(word).decode("utf-8", "ignore")
+    return estimate_tokens(word)
+
+def _next_span(text, pos, end, max_length, max_tokens, final):
+    """
+    Find the next chunk of text[pos:end], cut at a whitespace boundary
     
-    # Remove common AI prefixes
-    prefixes_to_remove = [
-        "AI: ", "Assistant: ", "Bot: ", "Response: "
-    ]
+    Returns:
+        (start, stop) of the chunk, or None if the input is exhausted or
+        (when final is False) more input is needed to place the cut
+    """
+    spaces = _WHITESPACE if isinstance(text, str) else _WHITESPACE_BYTES
+    while pos < end and text[pos] in spaces:
+        pos += 1
+    if pos >= end:
+        return None
     
-    for prefix in prefixes_to_remove:
-        if cleaned.startswith(prefix):
-            cleaned = cleaned[len(prefix):]
+    if max_tokens is None:
+        limit = pos + max_length
+        if limit >= end:
+            if not final:
+                return None
+            stop = end
+        else:
+            stop = limit
+            while stop > pos and text[stop] not in spaces:
+                stop -= 1
+            if stop == pos:
+                # Single word longer than the limit: hard cut, but never
+                # inside a UTF-8 sequence of a byte buffer
+                stop = limit
+                if not isinstance(text, str):
+                    while stop > pos + 1 and 0x80 <= text[stop] < 0xC0:
+                        stop -= 1
+    else:
+        tokens = 0
+        stop = pos
+        i = pos
+        while True:
+            j = i
+            while j < end and text[j] not in spaces:
+                j += 1
+            if j == end and not final:
+                return None
+            cost = _word_tokens(text, i, j)
+            if tokens + cost > max_tokens and stop > pos:
+                break
+            tokens += cost
+            stop = j
+            while j < end and text[j] in spaces:
+                j += 1
+            if tokens >= max_tokens:
+                break
+            if j >= end:
+                if not final:
+                    return None
+                break
+            i = j
+    
+    while stop > pos and text[stop - 1] in spaces:
+        stop -= 1
+    return pos, stop
+
+def _resume_position(text, start, stop, overlap, max_tokens):
+    """
+    Where the next chunk starts: stop, or earlier by overlap (whole words)
+    """
+    if not overlap:
+        return stop
+    spaces = _WHITESPACE if isinstance(text, str) else _WHITESPACE_BYTES
+    if max_tokens is None:
+        resume = max(stop - overlap, start + 1)
+        while resume < stop and text[resume - 1] not in spaces:
+            resume += 1
+        return resume
+    
+    # Walk back whole words until the overlap token budget is used
+    resume = stop
+    tokens = 0
+    while resume > start + 1:
+        word_end = resume
+        while word_end > start and text[word_end - 1] in spaces:
+            word_end -= 1
+        word_start = word_end
+        while word_start > start and text[word_start - 1] not in spaces:
+            word_start -= 1
+        if word_start <= start:
             break
+        tokens += _word_tokens(text, word_start, word_end)
+        if tokens > overlap:
+            break
+        resume = word_start
+    return resume
+
+def iter_chunks(text, max_length=1000, max_tokens=None, overlap=0):
+    """
+    Lazily split text into chunks at whitespace boundaries
+    
+    Scans the input once and yields slices, without building a word list.
+    bytes/bytearray input is wrapped in a memoryview, so chunks are
+    zero-copy views (limits then count bytes).
+    
+    Args:
+        text: str, bytes, bytearray or memoryview
+        max_length: Maximum chunk length in characters (or bytes)
+        max_tokens: Maximum chunk size in estimated tokens; overrides
+            max_length when given
+        overlap: Amount of trailing context repeated at the start of the
+            next chunk, in the same unit as the limit
+        
+    Yields:
+        Chunks as str (for str input) or memoryview slices
+    """
+    if isinstance(text, (bytes, bytearray)):
+        text = memoryview(text)
+    pos = 0
+    end = len(text)
+    while True:
+        span = _next_span(text, pos, end, max_length, max_tokens, True)
+        if span is None:
+            return
+        start, stop = span
+        yield text[start:stop]
+        resume = _resume_position(text, start, stop, overlap, max_tokens)
+        pos = resume if resume > start else stop
+
+def iter_chunks_stream(stream, max_length=1000, max_tokens=None, overlap=0, read_size=None):
+    """
+    Chunk a file or stream incrementally
     
-    return cleaned
+    Only the unconsumed tail plus one read block is held in memory, so
+    chunking a large log takes memory proportional to one chunk.
+    
+    Args:
+        stream: Object with read(n) returning str or bytes (file, socket stream)
+        max_length, max_tokens, overlap: As for iter_chunks
+        read_size: Bytes/characters per read (defaults to about one chunk)
+        
+    Yields:
+        Chunks of the same type the stream returns
+    """
+    if read_size is None:
+        read_size = max_length if max_tokens is None else max_tokens * 8
+    buffer = stream.read(read_size)
+    if not buffer:
+        return
+    pos = 0
+    eof = False
+    while True:
+        span = _next_span(buffer, pos, len(buffer), max_length, max_tokens, eof)
+        if span is None:
+            if eof:
+                return
+            block = stream.read(read_size)
+            if block:
+                buffer = buffer[pos:] + block
+                pos = 0
+            else:
+                eof = True
+            continue
+        start, stop = span
+        yield buffer[start:stop]
+        resume = _resume_position(buffer, start, stop, overlap, max_tokens)
+        pos = resume if resume > start else stop
 
-def chunk_text(text, max_length=1000):
+def chunk_text(text, max_length=1000, max_tokens=None, overlap=0):
     """
     Split text into chunks for processing
     
     Args:
         text: Text to chunk
-        max_length: Maximum chunk length
+        max_length: Maximum chunk length in characters
+        max_tokens: Maximum chunk size in estimated tokens; overrides
+            max_length when given
+        overlap: Trailing context repeated in the next chunk
         
     Returns:
         List of text chunks
     """
-    if len(text) <= max_length:
+    if max_tokens is None and len(text) <= max_length:
         return [text]
-    
-    chunks = []
-    words = text.split()
-    current_chunk = []
-    current_length = 0
-    
-    for word in words:
-        word_length = len(word) + 1  # +1 for space
-        
-        if current_length + word_length > max_length:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
-            else:
-                # Single word longer than max_length
-                chunks.append(word)
-                current_length = 0
-        else:
-            current_chunk.append(word)
-            current_length += word_length
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
+    return [chunk for chunk in iter_chunks(text, max_length, max_tokens, overlap)]
 
 def safe_json_loads(json_string):
     """
@@ -100,4 +249,166 @@ def safe_json_loads(json_string):
         return json.loads(json_string)
     except (ValueError, TypeError) as e:
         print(f"JSON parsing error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def stable_dumps(obj):
+    """
+    Serialize an object to JSON with sorted keys and compact separators
+    
+    ujson on MicroPython has no sort_keys option, and dict ordering may
+    differ between runs, so prompt text built from dicts is not guaranteed
+    to be byte-identical. Provider prefix caches need exact matches.
+    
+    Args:
+        obj: JSON-serializable object
+        
+    Returns:
+        Deterministic JSON string
+    """
+    if isinstance(obj, dict):
+        items = []
+        for key in sorted(obj, key=str):
+            items.append(json.dumps(str(key)) + ":" + stable_dumps(obj[key]))
+        return "{" + ",".join(items) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join([stable_dumps(item) for item in obj]) + "]"
+    return json.dumps(obj)
+
+def map_bounded(func, items, max_workers=2):
+    """
+    Apply func to items with at most max_workers concurrent threads
+    
+    Items are pulled lazily from the iterable, so at most max_workers items
+    are in flight at once. Falls back to sequential processing where
+    threads are unavailable.
+    
+    Args:
+        func: Callable taking one item
+        items: Iterable of items
+        max_workers: Maximum concurrent calls
+        
+    Returns:
+        List of results in input order (None where func raised)
+    """
+    iterator = iter(items)
+    results = {}
+    
+    def run(index, item):
+        try:
+            results[index] = func(item)
+        except Exception as e:
+            print(f"Error in map_bounded worker: {e}")
+            results[index] = None
+    
+    if _thread is None or max_workers <= 1:
+        for index, item in enumerate(iterator):
+            run(index, item)
+        return [results[i] for i in range(len(results))]
+    
+    lock = _thread.allocate_lock()
+    counter = [0]
+    
+    def worker(done):
+        while True:
+            lock.acquire()
+            try:
+                item = next(iterator)
+                index = counter[0]
+                counter[0] += 1
+            except StopIteration:
+                index = None
+            except Exception as e:
+                print(f"Error in map_bounded input: {e}")
+                index = None
+            finally:
+                lock.release()
+            if index is None:
+                break
+            run(index, item)
+        done.release()
+    
+    done_locks = []
+    for _ in range(max_workers):
+        done = _thread.allocate_lock()
+        done.acquire()
+        done_locks.append(done)
+        _thread.start_new_thread(worker, (done,))
+    
+    for done in done_locks:
+        done.acquire()
+    return [results[i] for i in range(counter[0])]
+
+def get_header(headers, name):
+    """
+    Case-insensitive HTTP header lookup
+    
+    Args:
+        headers: Header dictionary (may be None)
+        name: Lower-case header name
+    
+    Returns:
+        Header value or None
+    """
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        for key in headers:
+            if key.lower() == name:
+                return headers[key]
+    return value
+
+def format_number(value, decimals=2):
+    """
+    Short decimal text for prompts: at most decimals places, no trailing zeros
+    """
+    text = f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+def wrap_angle(angle):
+    """
+    Wrap an angle in degrees to (-180, 180]
+    """
+    while angle > 180:
+        angle -= 360
+    while angle <= -180:
+        angle += 360
+    return angle
+
+def ticks_ms():
+    """
+    Monotonic millisecond counter (time.ticks_ms on MicroPython)
+    
+    Compare values with ticks_diff, since the MicroPython counter wraps.
+    """
+    if hasattr(time, "ticks_ms"):
+        return time.ticks_ms()
+    return int(time.monotonic() * 1000)
+
+def ticks_us():
+    """
+    Monotonic microsecond counter, for timing short code paths
+    """
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return time.perf_counter_ns() // 1000
+
+def ticks_diff(end, start):
+    """
+    Time from start to end, for two ticks_ms (or two ticks_us) values
+    """
+    if hasattr(time, "ticks_diff"):
+        return time.ticks_diff(end, start)
+    return end - start
+
+def sleep_us(us):
+    if hasattr(time, "sleep_us"):
+        time.sleep_us(int(us))
+    else:
+        time.sleep(us / 1000000)
+
+def sleep_ms(ms):
+    if hasattr(time, "sleep_ms"):
+        time.sleep_ms(int(ms))
+    else:
+        time.sleep(ms / 1000)
\ No newline at end of file
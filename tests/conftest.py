@@ -0,0 +1,8 @@
+"""
+Host-side test setup: the library lives under lib/ as on the device
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib"))
@@ -0,0 +1,95 @@
+from ai_llm.access_control import AccessController, constant_time_equal, hash_credential
+
+# time.localtime()-style tuples: Wednesday 10:30 and Saturday 23:15
+WEDNESDAY_MORNING = (2024, 5, 15, 10, 30, 0, 2, 136)
+SATURDAY_NIGHT = (2024, 5, 18, 23, 15, 0, 5, 139)
+
+USERS = [
+    "visitor",
+    {"user_id": "alice", "credential": "1234"},
+    {"user_id": "bob", "credential_hash": hash_credential("9999"), "zones": ["garage"],
+     "schedule": [["07:00", "19:00"]], "days": [0, 1, 2, 3, 4]},
+    {"user_id": "night", "credential": "5555", "schedule": [["22:00", "06:00"]]},
+    {"user_id": "kiosk", "credential": None, "zones": ["lobby"]},
+]
+
+
+def controller():
+    return AccessController(USERS)
+
+
+def test_constant_time_equal():
+    assert constant_time_equal(b"abc", b"abc")
+    assert not constant_time_equal(b"abc", b"abd")
+    assert not constant_time_equal(b"abc", b"ab")
+
+
+def test_hash_credential_depends_on_salt():
+    assert hash_credential("1234") == hash_credential("1234")
+    assert hash_credential("1234", salt="x") != hash_credential("1234")
+
+
+def test_user_and_credential():
+    access = controller()
+    decision = access.check("entry", "alice", "1234", WEDNESDAY_MORNING)
+    assert decision["granted"] is True
+    assert decision["reason"] == "authorized"
+    assert access.check("entry", "alice", "0000", WEDNESDAY_MORNING)["reason"] == "invalid credential"
+    assert access.check("entry", "alice", None, WEDNESDAY_MORNING)["reason"] == "invalid credential"
+    assert access.check("entry", "mallory", "1234", WEDNESDAY_MORNING)["reason"] == "unknown user"
+    assert access.check("entry", "visitor", "1234", WEDNESDAY_MORNING)["reason"] == "no credential configured"
+
+
+def test_credential_alone_identifies_the_user():
+    access = controller()
+    decision = access.check("entry", credential="1234", now=WEDNESDAY_MORNING)
+    assert decision["granted"] and decision["user_id"] == "alice"
+    assert access.check("entry", credential="0000", now=WEDNESDAY_MORNING)["reason"] == "unknown credential"
+
+
+def test_zones_days_and_hours():
+    access = controller()
+    assert access.check("garage", "bob", "9999", WEDNESDAY_MORNING)["granted"]
+    assert access.check("entry", "bob", "9999", WEDNESDAY_MORNING)["reason"] == "no access to zone entry"
+    assert access.check("garage", "bob", "9999", SATURDAY_NIGHT)["reason"] == "outside permitted days"
+    evening = (2024, 5, 15, 19, 0, 0, 2, 136)
+    assert access.check("garage", "bob", "9999", evening)["reason"] == "outside permitted hours"
+    # Window over midnight
+    assert access.check("entry", "night", "5555", SATURDAY_NIGHT)["granted"]
+    assert not access.check("entry", "night", "5555", WEDNESDAY_MORNING)["granted"]
+
+
+def test_unknown_zone_is_denied():
+    assert controller().check(None, "alice", "1234", WEDNESDAY_MORNING)["reason"] == "unknown zone"
+
+
+def test_explicit_open_access():
+    access = controller()
+    assert access.check("lobby", "kiosk", now=WEDNESDAY_MORNING)["granted"]
+    assert not access.check("entry", "kiosk", now=WEDNESDAY_MORNING)["granted"]
+
+
+def test_shared_credential_needs_a_user_id():
+    access = AccessController([{"user_id": "ann", "credential": "1111", "zones": ["entry"]},
+                               {"user_id": "ben", "credential": "1111", "zones": ["garage"]}])
+    shared = access.check("garage", credential="1111", now=WEDNESDAY_MORNING)
+    assert shared["reason"] == "credential shared by several users; user id required"
+    assert access.check("garage", "ben", "1111", WEDNESDAY_MORNING)["granted"]
+    assert not access.check("garage", "ann", "1111", WEDNESDAY_MORNING)["granted"]
+    access.remove_user("ann")
+    assert access.check("garage", credential="1111", now=WEDNESDAY_MORNING)["user_id"] == "ben"
+
+
+def test_replacing_a_user_drops_the_old_credential():
+    access = controller()
+    access.add_user({"user_id": "alice", "credential": "4321"})
+    assert not access.check("entry", credential="1234", now=WEDNESDAY_MORNING)["granted"]
+    assert access.check("entry", credential="4321", now=WEDNESDAY_MORNING)["granted"]
+
+
+def test_stats():
+    access = controller()
+    access.check("entry", "alice", "1234", WEDNESDAY_MORNING)
+    access.check("entry", "alice", "0000", WEDNESDAY_MORNING)
+    assert access.stats["granted"] == 1
+    assert access.stats["denied"] == 1
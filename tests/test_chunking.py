@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from ai_llm.tokens import estimate_tokens
+from ai_llm.utils import chunk_text, iter_chunks, iter_chunks_stream
+
+TEXT = " ".join([f"reading{i}=21.{i % 10}C" for i in range(300)])
+
+
+def test_chunks_cut_at_whitespace_within_limit():
+    chunks = chunk_text(TEXT, max_length=100)
+    assert all([len(chunk) <= 100 for chunk in chunks])
+    assert " ".join(chunks) == TEXT
+    assert chunk_text("short", max_length=100) == ["short"]
+
+
+def test_long_word_is_hard_cut():
+    assert chunk_text("x" * 25, max_length=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_token_limit():
+    chunks = chunk_text(TEXT, max_tokens=40)
+    assert len(chunks) > 1
+    assert all([estimate_tokens(chunk) <= 40 for chunk in chunks])
+    assert " ".join(chunks) == TEXT
+
+
+def test_overlap_repeats_whole_words():
+    chunks = chunk_text(TEXT, max_length=100, overlap=30)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_word = chunk.split(" ")[0]
+        assert first_word in previous.split(" ")
+    token_chunks = chunk_text(TEXT, max_tokens=40, overlap=10)
+    assert token_chunks[1].split(" ")[0] in token_chunks[0].split(" ")
+
+
+def test_iter_chunks_is_lazy():
+    chunks = iter_chunks(TEXT, max_length=50)
+    assert next(chunks) == chunk_text(TEXT, max_length=50)[0]
+
+
+def test_bytes_give_views_and_keep_utf8_sequences_whole():
+    data = "é" * 30
+    chunks = list(iter_chunks(data.encode(), max_length=7))
+    assert all([isinstance(chunk, memoryview) for chunk in chunks])
+    assert "".join([bytes(chunk).decode() for chunk in chunks]) == data
+
+
+@pytest.mark.parametrize("read_size", [7, 64, 1000])
+@pytest.mark.parametrize("limits", [{"max_length": 80}, {"max_tokens": 30}, {"max_length": 80, "overlap": 20}])
+def test_stream_matches_in_memory_chunking(read_size, limits):
+    expected = chunk_text(TEXT, **limits)
+    assert list(iter_chunks_stream(io.StringIO(TEXT), read_size=read_size, **limits)) == expected
+    from_bytes = iter_chunks_stream(io.BytesIO(TEXT.encode()), read_size=read_size, **limits)
+    assert [bytes(chunk).decode() for chunk in from_bytes] == expected
+
+
+def test_empty_input():
+    assert list(iter_chunks("", max_length=10)) == []
+    assert list(iter_chunks("   \n ", max_length=10)) == []
+    assert list(iter_chunks_stream(io.StringIO(""))) == []
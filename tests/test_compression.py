@@ -0,0 +1,41 @@
+import gzip
+import zlib
+
+import pytest
+
+from ai_llm.compression import can_compress, can_decompress, compress, decompress
+
+BODY = b'{"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "status?"}]}' * 20
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_round_trip(encoding):
+    packed = compress(BODY, encoding)
+    assert len(packed) < len(BODY)
+    assert decompress(packed, encoding) == BODY
+
+
+def test_output_uses_the_http_wire_formats():
+    assert gzip.decompress(compress(BODY, "gzip")) == BODY
+    assert zlib.decompress(compress(BODY, "deflate")) == BODY
+
+
+def test_small_window_is_readable_with_the_default_window():
+    assert decompress(compress(BODY, "gzip", window_bits=9), "gzip") == BODY
+
+
+def test_decompresses_bodies_from_standard_compressors():
+    assert decompress(gzip.compress(BODY), "gzip") == BODY
+    assert decompress(zlib.compress(BODY), "deflate") == BODY
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        compress(BODY, "br")
+    with pytest.raises(ValueError):
+        decompress(BODY, "br")
+
+
+def test_capabilities_on_cpython():
+    assert can_compress()
+    assert can_decompress()
@@ -0,0 +1,69 @@
+from ai_llm.context_encoder import CompactContextEncoder
+
+
+STATUS = {
+    "living_room": {"main_light": {"on": True, "brightness": 80.0}, "thermostat": {"temperature": 21.4567}},
+    "kitchen": {"tv": "off"},
+}
+
+
+def test_full_table_abbreviates_and_rounds():
+    text = CompactContextEncoder().encode(STATUS, "home")
+    assert text.splitlines() == [
+        "@full home",
+        "lr.main: on=1 bri=80",
+        "lr.tstat: temp=21.5",
+        "kit: tv=off",
+    ]
+
+
+def test_format_value_precision():
+    encoder = CompactContextEncoder()
+    assert encoder.format_value("humidity", 45.6) == "46"
+    assert encoder.format_value("distance", 1.5) == "1.5"
+    assert encoder.format_value("other", -0.001) == "0"
+    assert encoder.format_value("x", [1.0, 2.25]) == "1|2.25"
+    assert encoder.format_value("x", None) == "-"
+
+
+def test_lists_of_records_are_keyed_by_position():
+    assert CompactContextEncoder().flatten([{"a": 1}, {"a": 2}]) == {"0.a": "1", "1.a": "2"}
+
+
+def test_delta_lists_changed_and_removed_keys():
+    encoder = CompactContextEncoder(delta=True)
+    status = {"kitchen": {"tv": "off", "light": "on"}}
+    assert encoder.encode(status, "home").startswith("@full home")
+    assert encoder.emitted["home"] is True
+
+    status = {"kitchen": {"tv": "on"}}
+    assert encoder.encode(status, "home") == "@delta home\nkit: tv=on light=-"
+    assert encoder.emitted["home"] is False
+    assert encoder.encode(status, "home") == "@delta home unchanged"
+
+
+def test_full_snapshot_is_repeated_periodically():
+    encoder = CompactContextEncoder(delta=True, full_snapshot_every=3)
+    headers = [encoder.encode({"a": i}, "s").split("\n")[0].split(" ")[0] for i in range(7)]
+    assert headers == ["@full", "@delta", "@delta", "@full", "@delta", "@delta", "@full"]
+
+
+def test_labels_are_tracked_separately_and_reset():
+    encoder = CompactContextEncoder(delta=True)
+    encoder.encode({"a": 1}, "one")
+    assert encoder.encode({"b": 1}, "two").startswith("@full two")
+    assert encoder.encode({"a": 1}, "one") == "@delta one unchanged"
+    encoder.reset("one")
+    assert encoder.encode({"a": 1}, "one").startswith("@full one")
+
+
+def test_delta_can_be_overridden_per_call():
+    encoder = CompactContextEncoder(delta=True)
+    encoder.encode({"a": 1}, "s")
+    assert encoder.encode({"a": 1}, "s", delta=False).startswith("@full s")
+
+
+def test_legend_is_stable():
+    encoder = CompactContextEncoder()
+    assert encoder.legend() == encoder.legend()
+    assert "lr=living_room" in encoder.legend()
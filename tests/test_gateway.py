@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+
+from ai_llm.gateway import GatewayServer
+from ai_llm.gateway_client import GatewayClient, GatewayError
+from ai_llm.models import ChatChoice, ChatMessage, ChatResponse, ModelConfig
+
+TOKEN = "s3cret"
+
+
+class EchoClient:
+    """
+    Upstream stand-in: answers with the last message and the temperature
+    """
+
+    def __init__(self):
+        self.model_config = ModelConfig(temperature=0.7)
+        self.calls = []
+
+    def chat_completion(self, messages, temperature=None):
+        self.calls.append((messages, temperature))
+        content = f"{messages[-1]['content']}@{temperature}"
+        return ChatResponse("r1", "chat.completion", 0, "test",
+                            [ChatChoice(0, ChatMessage("assistant", content), "stop")])
+
+
+@pytest.fixture
+def gateway():
+    """
+    A gateway on an ephemeral port, served from a background event loop
+    """
+    upstream = EchoClient()
+    server = GatewayServer(upstream, TOKEN, port=0, max_workers=2)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    yield server, upstream
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def connect(server, token=TOKEN):
+    return GatewayClient("127.0.0.1", server.port, device_id="dev-1", timeout=5, token=token)
+
+
+def test_wrong_token_is_rejected(gateway):
+    server, upstream = gateway
+    client = connect(server, token="wrong")
+    with pytest.raises(GatewayError, match="Authentication"):
+        client._call({"op": "ping"})
+    assert not client.ping()
+    assert server.stats["rejected"] >= 1
+    assert upstream.calls == []
+
+
+def test_ping(gateway):
+    server, _ = gateway
+    client = connect(server)
+    assert client.ping()
+    client.close()
+
+
+def test_chat_uses_gateway_temperature_by_default(gateway):
+    server, upstream = gateway
+    client = connect(server)
+    reply = client.simple_chat("hi")
+    assert reply == "hi@0.7"
+    assert upstream.calls[0][1] == 0.7
+    client.close()
+
+
+def test_cache_is_keyed_by_temperature(gateway):
+    server, upstream = gateway
+    client = connect(server)
+    messages = [ChatMessage("user", "same")]
+    cold = client.chat_completion(messages, temperature=0.0)
+    warm = client.chat_completion(messages, temperature=1.0)
+    again = client.chat_completion(messages, temperature=0.0)
+    assert cold.choices[0].message.content == "same@0.0"
+    assert warm.choices[0].message.content == "same@1.0"
+    assert again.choices[0].message.content == "same@0.0"
+    assert [temperature for _, temperature in upstream.calls] == [0.0, 1.0]
+    assert server.stats["cache_hits"] == 1
+    client.close()
+
+
+def test_bad_temperature_is_an_error_reply(gateway):
+    server, upstream = gateway
+    client = connect(server)
+    with pytest.raises(GatewayError, match="temperature"):
+        client._call({"op": "chat", "messages": [], "temperature": "hot"})
+    # The connection stays usable after an error reply
+    assert client.ping()
+    assert upstream.calls == []
+    client.close()
+
+
+def test_unknown_op_and_application(gateway):
+    server, _ = gateway
+    client = connect(server)
+    with pytest.raises(GatewayError, match="Unknown op"):
+        client._call({"op": "reboot"})
+    assert client.call_app("Nope", "anything") is None
+    assert server.stats["errors"] == 2
+    client.close()
@@ -0,0 +1,57 @@
+from ai_llm.history_index import HistoryIndex, term_hashes
+
+
+def build(*texts):
+    index = HistoryIndex()
+    for text in texts:
+        index.add(text)
+    return index
+
+
+def test_ids_are_sequential():
+    index = HistoryIndex()
+    assert index.add("turn on the kitchen light") == 0
+    assert index.add("set thermostat to 21") == 1
+    assert len(index) == 2
+
+
+def test_terms_are_case_insensitive_and_skip_stop_words():
+    assert term_hashes("The Kitchen LIGHT") == term_hashes("kitchen light")
+    assert term_hashes("the and of") == []
+
+
+def test_search_ranks_matching_exchange_first():
+    index = build(
+        "turn on the kitchen light",
+        "set the bedroom thermostat to 19 degrees",
+        "is the garage door closed",
+    )
+    results = index.search("what did I set the thermostat to")
+    assert results[0][0] == 1
+    assert [exchange for exchange, _ in index.search("garage door")] == [2]
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = build(
+        "light light living room",
+        "light kitchen",
+        "light hallway",
+        "dehumidifier basement",
+    )
+    ranked = index.search("light dehumidifier")
+    assert ranked[0][0] == 3
+
+
+def test_top_k_and_exclude_from():
+    index = build("door one", "door two", "door three", "door four")
+    assert len(index.search("door", top_k=2)) == 2
+    assert set([exchange for exchange, _ in index.search("door", top_k=10, exclude_from=2)]) == {0, 1}
+
+
+def test_no_match_and_empty_index():
+    assert HistoryIndex().search("anything") == []
+    index = build("kitchen light")
+    assert index.search("garage") == []
+    index.clear()
+    assert len(index) == 0
+    assert index.search("kitchen") == []
@@ -0,0 +1,89 @@
+import struct
+
+from ai_llm.history_store import HistoryStore
+
+
+def contents(messages):
+    return [(message.role, message.content) for message in messages]
+
+
+def test_append_and_load_last(tmp_path):
+    store = HistoryStore(str(tmp_path / "hist"))
+    store.append("user", "hello")
+    store.append("assistant", "hi ünïcode")
+    store.append("user", "again")
+    assert store.count() == 3
+    assert contents(store.load_last(2)) == [("assistant", "hi ünïcode"), ("user", "again")]
+    assert contents(store.load_last(10))[0] == ("user", "hello")
+    assert store.load_last(0) == []
+
+
+def test_survives_reopen(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path)
+    store.append("user", "one")
+    store.append("assistant", "two")
+    reopened = HistoryStore(path)
+    assert reopened.count() == 2
+    assert contents(reopened.load_last(2)) == [("user", "one"), ("assistant", "two")]
+
+
+def test_record_missing_from_index_is_recovered(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path)
+    store.append("user", "one")
+    store.append("assistant", "two")
+    # Power lost after the log write, before the index write
+    with open(path + ".idx", "rb") as f:
+        index = f.read()
+    with open(path + ".idx", "wb") as f:
+        f.write(index[:4])
+    reopened = HistoryStore(path)
+    assert reopened.count() == 2
+    assert contents(reopened.load_last(2)) == [("user", "one"), ("assistant", "two")]
+
+
+def test_torn_trailing_record_is_dropped(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path)
+    store.append("user", "one")
+    with open(path + ".log", "ab") as f:
+        f.write(struct.pack("<IB", 100, 1) + b"partial")
+    reopened = HistoryStore(path)
+    assert reopened.count() == 1
+    assert contents(reopened.load_last(5)) == [("user", "one")]
+    # Appends continue after the last whole record
+    reopened.append("assistant", "two")
+    assert contents(HistoryStore(path).load_last(5)) == [("user", "one"), ("assistant", "two")]
+
+
+def test_torn_index_entry_is_rebuilt(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path)
+    store.append("user", "one")
+    store.append("assistant", "two")
+    with open(path + ".idx", "ab") as f:
+        f.write(b"\x00\x01")
+    assert HistoryStore(path).count() == 2
+
+
+def test_compaction_keeps_newest(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path, max_records=6, keep_records=3)
+    for number in range(7):
+        store.append("user", f"m{number}")
+    assert store.count() == 3
+    assert [m.content for m in store.load_last(10)] == ["m4", "m5", "m6"]
+    store.append("assistant", "m7")
+    reopened = HistoryStore(path, max_records=6, keep_records=3)
+    assert [m.content for m in reopened.load_last(10)] == ["m4", "m5", "m6", "m7"]
+
+
+def test_clear(tmp_path):
+    path = str(tmp_path / "hist")
+    store = HistoryStore(path)
+    store.append("user", "one")
+    store.clear()
+    assert store.count() == 0
+    assert store.load_last(5) == []
+    assert HistoryStore(path).count() == 0
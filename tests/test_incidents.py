@@ -0,0 +1,113 @@
+from ai_llm.incidents import IncidentStore, threat_rank
+
+HOUR = 3600
+T0 = 500000 * HOUR
+
+
+def store_with_incidents():
+    store = IncidentStore(max_partitions=24)
+    store.add("entry", "high", ["door", "motion"], "Door forced", timestamp=T0)
+    store.add("entry", "low", ["motion"], "Cat", timestamp=T0 + 600)
+    store.add("garage", "medium", ["motion"], "Person near car", timestamp=T0 + HOUR)
+    store.add("", "critical", ["smoke"], "Smoke", timestamp=T0 + 2 * HOUR)
+    return store
+
+
+def test_threat_rank():
+    assert threat_rank("none") == 0
+    assert threat_rank("HIGH") == 3
+    assert threat_rank("bogus") == 2
+
+
+def test_query_filters():
+    store = store_with_incidents()
+    now = T0 + 3 * HOUR
+    assert [i["description"] for i in store.query(zone="entry", now=now)] == ["Door forced", "Cat"]
+    assert [i["description"] for i in store.query(min_threat="high", now=now)] == ["Door forced", "Smoke"]
+    assert [i["description"] for i in store.query(threat="medium", now=now)] == ["Person near car"]
+    assert [i["description"] for i in store.query(sensor="door", now=now)] == ["Door forced"]
+    assert [i["zone"] for i in store.query(zone=None, sensor="smoke", now=now)] == [""]
+    assert store.query(zone="attic", now=now) == []
+
+
+def test_query_time_range_and_limit():
+    store = store_with_incidents()
+    now = T0 + 3 * HOUR
+    assert [i["description"] for i in store.query(start=T0 + 300, end=T0 + 2 * HOUR, now=now)] == [
+        "Cat", "Person near car"]
+    assert [i["description"] for i in store.query(limit=2, now=now)] == ["Person near car", "Smoke"]
+    incident = store.query(limit=1, now=now)[0]
+    assert incident == {"timestamp": T0 + 2 * HOUR, "zone": "", "threat_level": "critical",
+                        "alert_type": None, "sensors": ["smoke"], "description": "Smoke"}
+
+
+def test_summary_and_windows():
+    store = store_with_incidents()
+    now = T0 + 2 * HOUR + 60
+    data = store.summary(now=now)
+    assert data["total"] == 4
+    assert data["zones"] == {"entry": 2, "garage": 1, "": 1}
+    assert data["threat_levels"] == {"high": 1, "low": 1, "medium": 1, "critical": 1}
+    assert data["peaks"] == {"entry": "high", "garage": "medium", "": "critical"}
+    assert store.summary(hours=1, now=now)["total"] == 2
+
+
+def test_repeat_offenders():
+    store = IncidentStore(repeat_threshold=3)
+    for minute in range(4):
+        store.add("porch", "low", ["motion"], timestamp=T0 + minute * 60)
+    store.add("porch", "low", ["door"], timestamp=T0)
+    assert store.summary(now=T0 + HOUR)["repeat_offenders"] == [("porch", "motion", 4)]
+
+
+def test_old_partitions_are_evicted_from_totals():
+    store = store_with_incidents()
+    assert store.summary(now=T0 + 24 * HOUR + 60)["total"] == 2
+    assert store.summary(now=T0 + 30 * HOUR)["total"] == 0
+    assert len(store) == 0
+
+
+def test_incidents_older_than_retention_are_dropped():
+    store = IncidentStore(max_partitions=24)
+    store.add("entry", "low", timestamp=T0 + 30 * HOUR)
+    assert store.add("entry", "low", timestamp=T0) is False
+    assert store.stats["dropped_old"] == 1
+
+
+def test_late_arrival_goes_to_its_partition():
+    store = store_with_incidents()
+    store.add("garage", "high", ["door"], "Late", timestamp=T0 + 1200)
+    descriptions = [i["description"] for i in store.query(now=T0 + 3 * HOUR)]
+    assert descriptions == ["Door forced", "Cat", "Late", "Person near car", "Smoke"]
+
+
+def test_record_cap_keeps_counting():
+    store = IncidentStore(max_records=2)
+    for second in range(5):
+        store.add("entry", "low", ["motion"], timestamp=T0 + second)
+    assert len(store) == 2
+    assert store.summary(now=T0 + 10)["total"] == 5
+    assert store.stats["dropped_records"] == 3
+
+
+def test_add_analysis_takes_zone_from_sensor_data():
+    store = IncidentStore()
+    store.add_analysis({"threat_level": "high", "zone": "unknown", "description": "x" * 200},
+                       {"door_1": {"zone": "back", "state": "open"}}, timestamp=T0)
+    incident = store.query(now=T0 + 60)[0]
+    assert incident["zone"] == "back"
+    assert incident["sensors"] == ["door_1"]
+    assert len(incident["description"]) == 120
+
+
+def test_zone_context_and_to_text():
+    store = store_with_incidents()
+    now = T0 + 2 * HOUR + 60
+    assert store.zone_context("entry", now=now) == (
+        "Zone entry: 2 incidents in last 24h, peak high, sensors motion x2, door x1")
+    assert store.zone_context("attic", now=now) == "Zone attic: no incidents in last 24h"
+    text = store.to_text(now=now)
+    assert text.startswith("Incidents over last 24h: 4")
+    assert "Recent notable incidents:" in text
+    store.clear()
+    assert store.summary(now=now)["total"] == 0
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ai_llm
+from ai_llm import applications
+
+
+def run_fresh(code):
+    """
+    Run code in a new interpreter so module caching does not leak in
+    """
+    lib = os.path.dirname(ai_llm.__path__[0])
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          cwd=lib, check=True).stdout
+
+
+def test_package_import_loads_no_submodules():
+    out = run_fresh(
+        "import sys; sys.path.insert(0, '.'); import ai_llm, ai_llm.applications; "
+        "print(sorted(m for m in sys.modules if m.startswith('ai_llm.') and m != 'ai_llm.applications'))")
+    assert out.strip() == "[]"
+
+
+def test_first_access_imports_only_that_module():
+    out = run_fresh(
+        "import sys; sys.path.insert(0, '.'); import ai_llm; ai_llm.ModelConfig; "
+        "print(sorted(m for m in sys.modules if m.startswith('ai_llm.')))")
+    assert out.strip() == "['ai_llm.models']"
+
+
+def test_resolved_attribute_is_cached():
+    config_class = ai_llm.ModelConfig
+    assert ai_llm.__dict__["ModelConfig"] is config_class
+    from ai_llm.models import ModelConfig
+    assert config_class is ModelConfig
+
+
+def test_unknown_name_raises_attribute_error():
+    with pytest.raises(AttributeError, match="no attribute 'Missing'"):
+        ai_llm.Missing
+    with pytest.raises(AttributeError):
+        applications.Missing
+    assert not hasattr(ai_llm, "Missing")
+
+
+def test_dir_lists_public_names():
+    assert set(ai_llm.__all__) <= set(dir(ai_llm))
+    assert set(applications.__all__) <= set(dir(applications))
+    assert set(applications.__all__) == set(applications._LAZY_IMPORTS)
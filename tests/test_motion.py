@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from ai_llm.motion import MotionSequencer, s_curve_profile, trapezoidal_profile
+
+CONFIG = {"min_angle": 0, "max_angle": 180, "min_speed": -100, "max_speed": 100}
+# Short moves keep the real-time playback tests quick
+FAST = dict(CONFIG, max_angular_velocity=600, max_angular_acceleration=3000, max_acceleration=500, max_jerk=5000)
+
+
+@pytest.mark.parametrize("profile", [trapezoidal_profile, s_curve_profile])
+def test_profiles_stay_within_limits(profile):
+    table = profile(0, 90, 90, 180, period_ms=20)
+    assert table[0] == 0
+    assert table[-1] == 90
+    steps = [table[k + 1] - table[k] for k in range(len(table) - 1)]
+    assert min(steps) >= 0
+    assert max(steps) / 0.02 <= 90 * 1.05
+
+
+@pytest.mark.parametrize("profile", [trapezoidal_profile, s_curve_profile])
+def test_profiles_move_downwards_and_handle_zero_distance(profile):
+    table = profile(90, 30, 90, 180)
+    assert table[0] == 90
+    assert table[-1] == pytest.approx(30)
+    assert list(profile(45, 45, 90, 180)) == [45]
+
+
+def test_trapezoidal_reaches_cruise_on_long_moves():
+    # 1 s accelerating, cruise, 1 s braking at 90 deg/s
+    table = trapezoidal_profile(0, 180, 90, 90, period_ms=20)
+    assert len(table) == pytest.approx(3 / 0.02 + 1, abs=1)
+    assert table[75] - table[74] == pytest.approx(90 * 0.02, rel=0.01)
+
+
+def command(name, motor="servo1", **parameters):
+    return {"action": name, "command": name, "motor_id": motor, "parameters": parameters, "explanation": ""}
+
+
+def test_plan_ramps_from_known_angle_and_clamps():
+    sequencer = MotionSequencer(CONFIG)
+    sequencer.plan([command("set_angle", angle=400)], {"servo1": {"angle": 90}})
+    table = sequencer.steps[0].table
+    assert table[0] == 90
+    assert table[-1] == 180
+    assert len(table) > 1
+
+
+def test_unknown_angle_is_a_single_setpoint():
+    sequencer = MotionSequencer(CONFIG)
+    count = sequencer.plan([command("set_angle", angle=45), command("set_angle", angle=90)])
+    assert list(sequencer.steps[0].table) == [45]
+    assert len(sequencer.steps[1].table) > 1
+    assert count == 1 + len(sequencer.steps[1].table)
+
+
+def test_speed_with_duration_ramps_holds_and_stops():
+    sequencer = MotionSequencer(CONFIG, period_ms=10)
+    sequencer.plan([command("set_speed", motor="m1", speed=50, duration=0.5)])
+    ramp_up, hold, ramp_down = [step.table for step in sequencer.steps]
+    assert ramp_up[-1] == 50
+    assert list(hold) == [50] * 50
+    assert ramp_down[-1] == 0
+    assert sequencer.state["m1"]["speed"] == 0
+
+
+def test_plan_rejects_bad_commands():
+    sequencer = MotionSequencer(CONFIG)
+    with pytest.raises(ValueError):
+        sequencer.plan([command("set_angle")])
+    with pytest.raises(ValueError):
+        sequencer.plan([command("dance")])
+    with pytest.raises(ValueError):
+        sequencer.plan([dict(command("stop"), safety_check="failed")])
+    with pytest.raises(ValueError):
+        MotionSequencer(CONFIG, profile="linear")
+
+
+def test_run_plays_every_setpoint_on_schedule():
+    sequencer = MotionSequencer(FAST, period_ms=5, profile="s_curve")
+    count = sequencer.plan([command("set_angle", angle=30)], {"servo1": {"angle": 0}})
+    played = []
+    began = time.monotonic()
+    stats = sequencer.run(lambda motor, quantity, value: played.append((motor, quantity, value)))
+    elapsed = time.monotonic() - began
+    assert len(played) == count == stats["periods"]
+    assert played[0] == ("servo1", "angle", 0)
+    assert played[-1][2] == 30
+    assert elapsed >= (count - 1) * 0.005 * 0.9
+    assert stats["mean_jitter_us"] >= 0
+
+
+def test_late_period_does_not_delay_the_rest():
+    sequencer = MotionSequencer(FAST, period_ms=5)
+    sequencer.plan([command("set_speed", motor="m1", speed=10, duration=0.1)])
+    calls = []
+
+    def output(motor, quantity, value):
+        calls.append(value)
+        if len(calls) == 2:
+            time.sleep(0.05)
+
+    began = time.monotonic()
+    stats = sequencer.run(output)
+    elapsed = time.monotonic() - began
+    assert stats["overruns"] >= 1
+    # The stall is absorbed by catching up, not added to the run time
+    assert elapsed < stats["periods"] * 0.005 + 0.04
@@ -0,0 +1,50 @@
+import pytest
+
+from ai_llm.postprocess import (CodeFenceStripper, JsonExtractor, PrefixStripper, StreamPostProcessor,
+                                WhitespaceNormalizer)
+from ai_llm.utils import validate_response
+
+
+def chains():
+    return [
+        [WhitespaceNormalizer(), PrefixStripper()],
+        [CodeFenceStripper(), JsonExtractor()],
+    ]
+
+
+def run(stages, chunks):
+    processor = StreamPostProcessor(stages)
+    return "".join([processor.feed(chunk) for chunk in chunks]) + processor.finish()
+
+
+def test_whitespace_and_prefix():
+    assert run(chains()[0], ["  Assistant:   Turn\n\n the   light on.  "]) == "Turn the light on."
+    assert run(chains()[0], ["AI"]) == "AI"
+
+
+def test_code_fence_and_json():
+    text = 'Here you go:\n```json\n{"rules": [{"id": "a", "note": "} \\" ]"}]}\n```\nDone.'
+    assert run(chains()[1], [text]) == '{"rules": [{"id": "a", "note": "} \\" ]"}]}'
+
+
+def test_unfenced_backticks_are_kept():
+    assert run([CodeFenceStripper()], ["use `x` or ``y``"]) == "use `x` or ``y``"
+
+
+@pytest.mark.parametrize("index", [0, 1])
+@pytest.mark.parametrize("text", [
+    "  Response:  first\tline \n\n second  line ",
+    'Sure! ```json\n{"a": [1, 2, {"b": "x}y"}]}\n``` trailing {"ignored": 1}',
+    "```\n[1, [2, 3]]\n```",
+])
+def test_output_does_not_depend_on_chunk_boundaries(index, text):
+    whole = run(chains()[index], [text])
+    for cut in range(len(text) + 1):
+        assert run(chains()[index], [text[:cut], text[cut:]]) == whole
+    assert run(chains()[index], list(text)) == whole
+
+
+def test_validate_response():
+    assert validate_response("") == ""
+    assert validate_response(None) == ""
+    assert validate_response("Bot:  hello \n world") == "hello world"
@@ -0,0 +1,37 @@
+import json
+
+from ai_llm.models import ChatResponse
+from ai_llm.utils import stable_dumps
+
+
+def test_stable_dumps_ignores_insertion_order():
+    first = {"b": 1, "a": {"y": [1, {"z": 2, "c": 3}], "x": None}}
+    second = {"a": {"x": None, "y": [1, {"c": 3, "z": 2}]}, "b": 1}
+    assert stable_dumps(first) == stable_dumps(second)
+    assert stable_dumps(first) == '{"a":{"x":null,"y":[1,{"c":3,"z":2}]},"b":1}'
+
+
+def test_stable_dumps_round_trips():
+    value = {"name": "lamp \"1\"", "on": True, "levels": (0.5, 1), 2: "int key"}
+    assert json.loads(stable_dumps(value)) == {"name": "lamp \"1\"", "on": True,
+                                               "levels": [0.5, 1], "2": "int key"}
+
+
+def test_token_counts_default_to_zero():
+    response = ChatResponse("r", "chat.completion", 0, "m", [])
+    assert response.get_prompt_tokens() == 0
+    assert response.get_cached_tokens() == 0
+
+
+def test_openai_usage_layout():
+    usage = {"prompt_tokens": 1200, "prompt_tokens_details": {"cached_tokens": 1024}}
+    response = ChatResponse("r", "chat.completion", 0, "m", [], usage)
+    assert response.get_prompt_tokens() == 1200
+    assert response.get_cached_tokens() == 1024
+
+
+def test_anthropic_usage_layout():
+    usage = {"input_tokens": 300, "cache_read_input_tokens": 256}
+    response = ChatResponse("r", "chat.completion", 0, "m", [], usage)
+    assert response.get_prompt_tokens() == 300
+    assert response.get_cached_tokens() == 256
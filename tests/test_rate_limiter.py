@@ -0,0 +1,92 @@
+import pytest
+
+from ai_llm.rate_limiter import RateLimiter, TokenBucket, parse_duration
+
+
+def test_parse_duration():
+    assert parse_duration("20") == 20000
+    assert parse_duration("1.5") == 1500
+    assert parse_duration("6m0s") == 360000
+    assert parse_duration("250ms") == 250
+    assert parse_duration("1h2m") == 3720000
+    assert parse_duration("soon") is None
+    assert parse_duration("5x") is None
+    assert parse_duration(None) is None
+
+
+def test_bucket_is_unlimited_until_a_limit_is_known():
+    bucket = TokenBucket()
+    assert bucket.wait_ms(10 ** 6) == 0
+    assert bucket.take(500) == 500
+
+
+def test_bucket_take_and_give_back_clamp_to_capacity():
+    bucket = TokenBucket(1000, headroom=0.95)
+    assert bucket.capacity == 950
+    assert bucket.take(5000) == 950
+    assert bucket.level == 0
+    assert bucket.wait_ms(100) > 0
+    bucket.give_back(5000)
+    assert bucket.level == 950
+
+
+def test_bucket_sync_only_lowers_level():
+    bucket = TokenBucket(1000, headroom=1.0)
+    bucket.sync(400)
+    assert bucket.level == 400
+    bucket.sync(900)
+    assert bucket.level == 400
+
+
+def test_limits_are_learned_from_headers():
+    limiter = RateLimiter()
+    limiter.update_from_headers({
+        "X-RateLimit-Limit-Requests": "60",
+        "x-ratelimit-limit-tokens": "10000",
+        "x-ratelimit-remaining-tokens": "2000",
+    })
+    stats = limiter.get_stats()
+    assert stats["rpm_limit"] == 57
+    assert stats["tpm_limit"] == 9500
+    assert limiter.tokens.level == 1900
+
+
+def test_reserve_reconcile_and_release():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10000, headroom=1.0)
+    reserved = limiter.reserve(3000)
+    assert reserved == 3000
+    assert limiter.tokens.level == pytest.approx(7000, abs=5)
+    limiter.reconcile(reserved, 1000)
+    assert limiter.tokens.level == pytest.approx(9000, abs=5)
+    reserved = limiter.reserve(2000)
+    limiter.release(reserved)
+    assert limiter.tokens.level == pytest.approx(9000, abs=5)
+
+
+def test_oversized_reservation_refunds_only_what_it_took():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    reserved = limiter.reserve(5000)
+    assert reserved == 950
+    limiter.release(reserved)
+    assert limiter.tokens.level == pytest.approx(950, abs=1)
+
+
+def test_reserve_raises_instead_of_waiting_too_long():
+    limiter = RateLimiter(tokens_per_minute=1000, headroom=1.0, max_wait_ms=100)
+    limiter.reserve(1000)
+    with pytest.raises(Exception):
+        limiter.reserve(500)
+
+
+def test_throttled_pauses_for_retry_after():
+    limiter = RateLimiter(max_wait_ms=100)
+    assert limiter.throttled({"retry-after": "2"}) == 2000
+    assert limiter.get_stats()["throttled"] == 1
+    with pytest.raises(Exception):
+        limiter.reserve(10)
+
+
+def test_throttled_falls_back_to_reset_headers():
+    limiter = RateLimiter()
+    assert limiter.throttled({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "3s"}) == 3000
+    assert RateLimiter().throttled({}) == 1000
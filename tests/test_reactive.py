@@ -0,0 +1,75 @@
+from ai_llm.reactive import ReactiveController, goal_from_command
+
+CLEAR = [None] * 16
+
+
+def test_goal_from_command():
+    assert goal_from_command({"action": "move", "direction": "forward", "parameters": {"speed": 0.5}}) == (0, 0.5)
+    assert goal_from_command({"action": "turn", "direction": "right", "parameters": {"angle": 30}}) == (-30, None)
+    assert goal_from_command({"action": "turn", "direction": "left", "parameters": {"angle": -30}}) == (30, None)
+    assert goal_from_command({"action": "move", "direction": "custom_angle", "parameters": {"angle": 270}}) == (-90, None)
+    assert goal_from_command({"action": "stop"}) == (0, 0.0)
+    assert goal_from_command({"action": "move", "direction": "up"}) is None
+    assert goal_from_command("forward") is None
+
+
+def test_clear_path_drives_towards_goal():
+    controller = ReactiveController()
+    controller.set_goal(0, 0.5)
+    command = controller.tick(CLEAR)
+    assert command["action"] == "move"
+    assert command["direction"] == "forward"
+    assert command["parameters"] == {"speed": 0.5, "angle": 0}
+    assert command["safety_status"] == "safe"
+    assert command["source"] == "reactive"
+
+
+def test_blocked_sector_and_neighbours_are_avoided():
+    controller = ReactiveController()
+    controller.set_goal(0, 1.0)
+    distances = list(CLEAR)
+    distances[0] = 0.1
+    command = controller.tick(distances)
+    # Sectors 15, 0 and 1 are unusable; the nearest free ones are +-45 degrees
+    assert abs(command["parameters"]["angle"]) == 45
+    assert command["action"] == "move"
+
+
+def test_large_corrections_turn_in_place():
+    controller = ReactiveController()
+    controller.set_goal(180, 1.0)
+    command = controller.tick(CLEAR)
+    assert command["action"] == "turn"
+    assert command["parameters"]["speed"] == 0
+    assert command["parameters"]["angle"] == 180
+
+
+def test_speed_drops_with_clearance():
+    controller = ReactiveController(safety_distance=0.2)
+    controller.set_goal(0, 1.0)
+    distances = list(CLEAR)
+    distances[0] = 0.6
+    command = controller.tick(distances)
+    assert 0 < command["parameters"]["speed"] < 1.0
+    assert command["safety_status"] == "caution"
+
+
+def test_surrounded_robot_stops():
+    controller = ReactiveController()
+    controller.set_goal(0, 1.0)
+    command = controller.tick([0.1] * 16)
+    assert command["action"] == "stop"
+    assert command["safety_status"] == "danger"
+    assert controller.get_stats()["stops"] == 1
+
+
+def test_goal_override_and_speed_cap():
+    controller = ReactiveController(max_speed=0.3)
+    controller.set_goal(0, 5.0)
+    assert controller.goal_speed == 0.3
+    assert controller.tick(CLEAR, goal_heading=22.5)["parameters"]["angle"] == 22.5
+    controller.set_goal(0, 0)
+    assert controller.tick(CLEAR)["action"] == "stop"
+    stats = controller.get_stats()
+    assert stats["ticks"] == 2
+    assert stats["mean_us"] >= 0
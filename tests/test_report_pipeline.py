@@ -0,0 +1,68 @@
+import io
+import json
+import threading
+
+from ai_llm.report_pipeline import MapReduceSummarizer, iter_records
+from ai_llm.tokens import estimate_tokens
+
+
+class SummaryClient:
+    """
+    Replies with a short note naming how much text it was given
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def simple_chat(self, prompt, system_message=None):
+        with self._lock:
+            self.prompts.append(prompt)
+        return f"note on {len(prompt)} chars"
+
+
+def test_iter_records():
+    assert list(iter_records(None)) == []
+    assert list(iter_records("text")) == ["text"]
+    (record,) = iter_records({"kitchen": {"kwh": 2}})
+    assert record.startswith("kitchen: ") and json.loads(record[9:]) == {"kwh": 2}
+    plain, serialized = iter_records(["a", {"b": 1}])
+    assert plain == "a" and json.loads(serialized) == {"b": 1}
+    assert "".join(iter_records(io.StringIO("line one\nline two"))).split() == ["line", "one", "line", "two"]
+
+
+def test_chunks_stay_within_budget():
+    summarizer = MapReduceSummarizer(SummaryClient(), chunk_tokens=50)
+    records = [{"device": f"lamp{i}", "on_minutes": i * 7} for i in range(200)]
+    chunks = list(summarizer.iter_chunks(records))
+    assert len(chunks) > 1
+    assert all([estimate_tokens(chunk) <= 50 for chunk in chunks])
+    assert sum([chunk.count("lamp") for chunk in chunks]) == 200
+
+
+def test_oversized_record_is_split():
+    summarizer = MapReduceSummarizer(SummaryClient(), chunk_tokens=20)
+    chunks = list(summarizer.iter_chunks(["short", "word " * 200, "tail"]))
+    assert chunks[0] == "short"
+    assert chunks[-1] == "tail"
+    assert all([estimate_tokens(chunk) <= 20 for chunk in chunks[1:-1]])
+
+
+def test_summarize_maps_every_chunk_then_reduces():
+    client = SummaryClient()
+    summarizer = MapReduceSummarizer(client, chunk_tokens=40, max_workers=3)
+    records = [f"2024-05-0{i % 9 + 1} motion entry {i}" for i in range(100)]
+    notes = summarizer.summarize(records, "weekly security report")
+    chunk_count = len(list(summarizer.iter_chunks(records)))
+    assert len(client.prompts) >= chunk_count
+    assert all(["weekly security report" in prompt for prompt in client.prompts])
+    assert notes and estimate_tokens(notes) <= 40
+
+
+def test_failed_calls_give_none():
+    class FailingClient:
+        def simple_chat(self, prompt, system_message=None):
+            return None
+
+    assert MapReduceSummarizer(FailingClient(), chunk_tokens=20).summarize(["a"] * 50, "goal") is None
+    assert MapReduceSummarizer(SummaryClient()).summarize([], "goal") is None
@@ -0,0 +1,111 @@
+import pytest
+
+from ai_llm.rules import RuleEngine, parse_time
+
+
+def hall_light(rule_id="hall_light"):
+    return {
+        "id": rule_id,
+        "trigger": {"source": "hallway.motion", "op": "==", "value": True},
+        "conditions": [
+            {"source": "hallway.lux", "op": "<", "value": 40},
+            {"time_between": ["18:00", "06:00"]},
+        ],
+        "actions": [{"target": "hallway.main_light", "command": "on", "value": 80}],
+    }
+
+
+def test_parse_time():
+    assert parse_time("07:30") == 450
+    assert parse_time("0:00") == 0
+    with pytest.raises(ValueError):
+        parse_time("24:00")
+    with pytest.raises(ValueError):
+        parse_time("noon")
+
+
+def test_trigger_and_conditions():
+    engine = RuleEngine()
+    assert engine.add_rule(hall_light())
+    engine.evaluate("hallway.lux", 20)
+    fired = engine.evaluate("hallway.motion", True, minute_of_day=parse_time("23:00"))
+    assert fired == [("hall_light", hall_light()["actions"][0])]
+    # Trigger value, lux and time window each block the rule
+    assert engine.evaluate("hallway.motion", False, parse_time("23:00")) == []
+    assert engine.evaluate("hallway.motion", True, parse_time("12:00")) == []
+    assert engine.evaluate("hallway.motion", True) == []
+    engine.evaluate("hallway.lux", 90)
+    assert engine.evaluate("hallway.motion", True, parse_time("02:00")) == []
+
+
+def test_events_only_visit_rules_for_their_source():
+    engine = RuleEngine()
+    engine.add_rule(hall_light())
+    engine.add_rule({"id": "door", "trigger": {"source": "front.door"},
+                     "actions": [{"target": "porch.light", "command": "on"}]})
+    engine.evaluate("kitchen.temp", 21)
+    assert engine.stats["rules_checked"] == 0
+    assert [rule_id for rule_id, _ in engine.evaluate("front.door", "open")] == ["door"]
+    assert engine.stats["rules_checked"] == 1
+
+
+def test_missing_reading_does_not_raise():
+    engine = RuleEngine()
+    engine.add_rule(hall_light())
+    assert engine.evaluate("hallway.motion", True, parse_time("20:00")) == []
+
+
+def test_time_trigger_fires_from_clock():
+    engine = RuleEngine()
+    engine.add_rule({"id": "wake", "trigger": {"time": "07:30"},
+                     "actions": [{"target": "bedroom.blinds", "command": "open"}]})
+    assert engine.clock(parse_time("07:29")) == []
+    assert [rule_id for rule_id, _ in engine.clock(parse_time("07:30"))] == ["wake"]
+
+
+def test_invalid_rules_are_rejected_with_a_reason():
+    engine = RuleEngine()
+    assert not engine.add_rule("not a rule")
+    assert not engine.add_rule({"id": "a", "trigger": {}, "actions": [{"target": "x", "command": "on"}]})
+    assert not engine.add_rule({"id": "b", "trigger": {"source": "s", "op": "~"},
+                                "actions": [{"target": "x", "command": "on"}]})
+    assert not engine.add_rule({"id": "c", "trigger": {"source": "s"}, "actions": []})
+    assert not engine.add_rule({"id": "d", "trigger": {"time": "25:00"},
+                                "actions": [{"target": "x", "command": "on"}]})
+    assert [rule_id for rule_id, _ in engine.rejected] == [None, "a", "b", "c", "d"]
+    assert len(engine) == 0
+
+
+def test_ids_are_assigned_and_rules_replaced_or_removed():
+    engine = RuleEngine()
+    rule = hall_light(None)
+    assert engine.add_rule(rule)
+    assert rule["id"] == "rule_1"
+    replacement = hall_light("rule_1")
+    replacement["trigger"] = {"source": "hallway.button"}
+    engine.add_rule(replacement)
+    assert len(engine) == 1
+    assert engine.evaluate("hallway.motion", True, 0) == []
+    assert engine.remove_rule("rule_1")
+    assert not engine.remove_rule("rule_1")
+    assert engine.evaluate("hallway.button", 1) == []
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "rules.json")
+    engine = RuleEngine(path)
+    engine.add_rule(hall_light())
+    engine.save()
+    loaded = RuleEngine(path)
+    assert loaded.load() == 1
+    loaded.evaluate("hallway.lux", 10)
+    assert loaded.evaluate("hallway.motion", True, parse_time("19:00"))
+
+
+def test_load_falls_back_to_interrupted_save(tmp_path):
+    path = str(tmp_path / "rules.json")
+    engine = RuleEngine(path)
+    engine.add_rule(hall_light())
+    engine.save(path + ".tmp")
+    assert RuleEngine(path).load() == 1
+    assert RuleEngine(str(tmp_path / "missing.json")).load() == 0
@@ -0,0 +1,91 @@
+import pytest
+
+from ai_llm import scan
+from ai_llm.scan import process_scan
+
+
+@pytest.fixture(params=["arrays", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "arrays":
+        monkeypatch.setattr(scan, "np", None)
+    elif scan.np is None:
+        pytest.skip("NumPy not installed")
+    return request.param
+
+
+def full_circle(readings, count=360):
+    """
+    One reading per degree; readings maps degree -> range
+    """
+    return [readings.get(i, 0.0) for i in range(count)]
+
+
+def test_sector_minima(backend):
+    ranges = full_circle({0: 2.0, 10: 1.5, 90: 3.0, 180: 0.8, 200: 9.0})
+    summary = process_scan(ranges, sector_count=4, max_range=8.0)
+    assert list(summary.sectors) == pytest.approx([1.5, 3.0, 0.8, 0.0])
+    assert summary.valid == 4
+    assert summary.points == 360
+
+
+def test_invalid_returns_are_ignored(backend):
+    summary = process_scan([None, float("nan"), -1.0, 0.0, 8.0, 2.0], angles=[0, 1, 2, 3, 4, 5])
+    assert summary.valid == 1
+    assert len(summary.obstacles) == 1
+    assert summary.obstacles[0].distance == pytest.approx(2.0)
+
+
+def test_clusters_split_on_gaps_and_range_jumps(backend):
+    readings = {}
+    for degree in range(10, 20):
+        readings[degree] = 1.0
+    for degree in range(20, 30):
+        readings[degree] = 3.0
+    for degree in range(100, 105):
+        readings[degree] = 2.0
+    summary = process_scan(full_circle(readings))
+    assert [round(o.distance, 1) for o in summary.obstacles] == [1.0, 2.0, 3.0]
+    near = summary.nearest()
+    assert near.points == 10
+    assert near.width == pytest.approx(10)
+    assert near.bearing == pytest.approx(14.5)
+
+
+def test_obstacle_across_scan_start_is_merged(backend):
+    readings = {}
+    for degree in list(range(350, 360)) + list(range(0, 10)):
+        readings[degree] = 1.2
+    summary = process_scan(full_circle(readings))
+    assert len(summary.obstacles) == 1
+    obstacle = summary.obstacles[0]
+    assert obstacle.points == 20
+    assert obstacle.width == pytest.approx(20)
+    assert obstacle.bearing == pytest.approx(-0.5)
+
+
+def test_cluster_wider_than_half_a_circle(backend):
+    readings = dict([(degree, 1.0) for degree in range(0, 270)])
+    summary = process_scan(full_circle(readings))
+    assert summary.obstacles[0].width == pytest.approx(270)
+    assert summary.obstacles[0].bearing == pytest.approx(134.5)
+
+
+def test_clockwise_explicit_angles(backend):
+    angles = [30 - i for i in range(61)]
+    ranges = [1.0 if 0 <= i < 10 else 0.0 for i in range(61)]
+    obstacle = process_scan(ranges, angles=angles).obstacles[0]
+    assert obstacle.width == pytest.approx(10)
+    assert obstacle.bearing == pytest.approx(25.5)
+
+
+def test_max_obstacles_keeps_nearest(backend):
+    readings = dict([(degree * 20, 1.0 + degree * 0.1) for degree in range(10)])
+    summary = process_scan(full_circle(readings), max_obstacles=3)
+    assert [round(o.distance, 1) for o in summary.obstacles] == [1.0, 1.1, 1.2]
+
+
+def test_to_text_and_to_dict(backend):
+    summary = process_scan(full_circle({0: 1.0}), sector_count=4)
+    assert "1/360 returns" in summary.to_text()
+    assert summary.to_dict()["sectors"] == [1.0, 0.0, 0.0, 0.0]
+    assert process_scan(full_circle({})).to_text().endswith("obstacles: none")
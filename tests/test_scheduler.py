@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from ai_llm.models import PRIORITY_CRITICAL, PRIORITY_CONTROL, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from ai_llm.scheduler import RequestScheduler, SchedulerError, _Ticket
+
+
+class GatedClient:
+    """
+    Records requests; the first one blocks until release() so others queue
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def chat_completion(self, messages, stream=False, temperature=None):
+        self.calls.append((messages, temperature))
+        if len(self.calls) == 1:
+            self.started.set()
+            self.gate.wait(5)
+        return messages
+
+    def release(self):
+        self.gate.set()
+
+
+@pytest.fixture
+def busy():
+    """
+    A one-worker scheduler whose worker is stuck in a first request
+    """
+    client = GatedClient()
+    scheduler = RequestScheduler(client, workers=1, reserved_workers=0, max_queue=8)
+    first = scheduler.submit("first")
+    assert client.started.wait(5)
+    yield scheduler, client, first
+    client.release()
+    scheduler.stop()
+
+
+def test_queued_requests_run_by_priority_then_arrival(busy):
+    scheduler, client, first = busy
+    tickets = [
+        scheduler.submit("bulk", priority=PRIORITY_BULK),
+        scheduler.submit("interactive", priority=PRIORITY_INTERACTIVE),
+        scheduler.submit("control", priority=PRIORITY_CONTROL),
+        scheduler.submit("critical", priority=PRIORITY_CRITICAL),
+        scheduler.submit("control 2", priority=PRIORITY_CONTROL),
+    ]
+    client.release()
+    for ticket in [first] + tickets:
+        ticket.wait()
+    assert [messages for messages, _ in client.calls] == [
+        "first", "critical", "control", "control 2", "interactive", "bulk"
+    ]
+
+
+def test_earlier_deadline_first_within_a_class(busy):
+    scheduler, client, first = busy
+    late = scheduler.submit("late", deadline_ms=60000)
+    soon = scheduler.submit("soon", deadline_ms=10000)
+    client.release()
+    late.wait()
+    soon.wait()
+    assert [messages for messages, _ in client.calls][1:] == ["soon", "late"]
+
+
+def test_expired_request_is_dropped(busy):
+    scheduler, client, first = busy
+    ticket = scheduler.submit("stale", deadline_ms=1)
+    time.sleep(0.02)
+    client.release()
+    with pytest.raises(SchedulerError):
+        ticket.wait()
+    assert scheduler.stats["expired"] == 1
+    assert "stale" not in [messages for messages, _ in client.calls]
+
+
+def test_full_queue_preempts_worse_request():
+    client = GatedClient()
+    scheduler = RequestScheduler(client, workers=1, reserved_workers=0, max_queue=1)
+    scheduler.submit("first")
+    assert client.started.wait(5)
+    bulk = scheduler.submit("bulk", priority=PRIORITY_BULK)
+    control = scheduler.submit("control", priority=PRIORITY_CONTROL)
+    rejected = scheduler.submit("bulk again", priority=PRIORITY_BULK)
+    client.release()
+    with pytest.raises(SchedulerError):
+        bulk.wait()
+    with pytest.raises(SchedulerError):
+        rejected.wait()
+    assert control.wait() == "control"
+    assert scheduler.stats["preempted"] == 1
+    assert scheduler.stats["rejected"] == 1
+    scheduler.stop()
+
+
+def test_reserved_worker_serves_control_while_bulk_is_in_flight():
+    client = GatedClient()
+    scheduler = RequestScheduler(client, workers=2, reserved_workers=1)
+    bulk = scheduler.submit("bulk", priority=PRIORITY_BULK)
+    assert client.started.wait(5)
+    assert scheduler.chat_completion("steer", priority=PRIORITY_CONTROL) == "steer"
+    client.release()
+    assert bulk.wait() == "bulk"
+    scheduler.stop()
+
+
+def test_temperature_is_forwarded(busy):
+    scheduler, client, first = busy
+    ticket = scheduler.submit("warm", temperature=0.2)
+    client.release()
+    ticket.wait()
+    assert client.calls[-1] == ("warm", 0.2)
+
+
+def test_aging_promotes_bulk_but_not_past_interactive():
+    scheduler = RequestScheduler(GatedClient(), workers=1, aging_ms=100)
+    ticket = _Ticket("bulk", False, PRIORITY_BULK, None, 1)
+    scheduler.stop()
+    assert scheduler._rank(ticket, ticket.enqueued)[0] == PRIORITY_BULK
+    assert scheduler._rank(ticket, ticket.enqueued + 150)[0] == PRIORITY_INTERACTIVE
+    assert scheduler._rank(ticket, ticket.enqueued + 1000)[0] == PRIORITY_INTERACTIVE
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai_llm.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight()
+    started = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"answer": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do("key", work)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(group.do("key", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert len(runs) == 1
+    assert len(results) == 4
+    assert all([result is results[0] for result in results])
+    assert group.stats == {"calls": 4, "executed": 1, "coalesced": 3}
+
+
+def test_different_keys_and_later_calls_run_again():
+    group = SingleFlight()
+    assert group.do("a", lambda: 1) == 1
+    assert group.do("b", lambda: 2) == 2
+    assert group.do("a", lambda: 3) == 3
+    assert group.stats["executed"] == 3
+
+
+def test_errors_are_shared_and_cleared():
+    group = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        group.do("key", fail)
+    assert group.do("key", lambda: "ok") == "ok"
+
+
+def test_async_calls_are_coalesced():
+    group = AsyncSingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*[group.do("key", work) for _ in range(5)])
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert len(runs) == 1
+    assert group.stats["coalesced"] == 4
@@ -0,0 +1,57 @@
+from ai_llm.state_mirror import StateMirror, REMOVED
+
+
+def status(on=True, temperature=21.0):
+    return {
+        "living_room": {"main_light": {"on": on, "brightness": 60}},
+        "kitchen": {"thermostat": {"temperature": temperature}},
+    }
+
+
+def test_first_update_is_full():
+    mirror = StateMirror()
+    assert mirror.update("home", status()) == (True, status())
+
+
+def test_unchanged_status_gives_empty_delta():
+    mirror = StateMirror()
+    mirror.update("home", status())
+    assert mirror.update("home", status()) == (False, {})
+
+
+def test_delta_descends_only_into_changed_subtrees():
+    mirror = StateMirror()
+    mirror.update("home", status())
+    assert mirror.update("home", status(on=False)) == (False, {"living_room": {"main_light": {"on": False}}})
+
+
+def test_added_and_removed_keys():
+    mirror = StateMirror()
+    mirror.update("home", status())
+    new = status()
+    del new["kitchen"]
+    new["garage"] = {"door": "open"}
+    assert mirror.update("home", new) == (False, {"garage": {"door": "open"}, "kitchen": REMOVED})
+
+
+def test_full_snapshot_every():
+    mirror = StateMirror(full_snapshot_every=3)
+    fulls = [mirror.update("home", status(temperature=20.0 + i))[0] for i in range(7)]
+    assert fulls == [True, False, False, True, False, False, True]
+
+
+def test_reset_and_labels():
+    mirror = StateMirror()
+    mirror.update("home", status())
+    mirror.update("robot", {"x": 1})
+    mirror.reset("home")
+    assert mirror.update("home", status())[0] is True
+    assert mirror.update("robot", {"x": 1}) == (False, {})
+    mirror.reset()
+    assert mirror.update("robot", {"x": 1})[0] is True
+
+
+def test_non_dict_status_is_always_full():
+    mirror = StateMirror()
+    mirror.update("value", 5)
+    assert mirror.update("value", 6) == (True, 6)
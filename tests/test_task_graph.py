@@ -0,0 +1,120 @@
+import pytest
+
+from ai_llm.task_graph import TaskGraph
+
+TASKS = [
+    {"task_id": "vacuum", "estimated_duration": 30, "resource_requirements": ["robot"]},
+    {"task_id": "mop", "estimated_duration": 20, "dependencies": ["vacuum"], "resource_requirements": ["robot"]},
+    {"task_id": "laundry", "estimated_duration": 60, "earliest_start": 15},
+    {"task_id": "fold", "estimated_duration": 10, "dependencies": ["laundry", "mop"]},
+]
+
+
+def times(graph):
+    return dict([(task_id, (task.start, task.end)) for task_id, task in graph.tasks.items()])
+
+
+def test_initial_schedule():
+    graph = TaskGraph(TASKS)
+    assert times(graph) == {
+        "vacuum": (0, 30),
+        "mop": (30, 50),
+        "laundry": (15, 75),
+        "fold": (75, 85),
+    }
+    assert [task["task_id"] for task in graph.to_list()] == ["vacuum", "laundry", "mop", "fold"]
+
+
+def test_slip_propagates_only_as_far_as_it_matters():
+    graph = TaskGraph(TASKS)
+    changes = graph.slip("vacuum", 10) or graph.reschedule()
+    # fold still waits for laundry, so it does not move
+    assert changes == {
+        "vacuum": {"start": 10, "end": 40, "blocked": False, "previous_start": 0},
+        "mop": {"start": 40, "end": 60, "blocked": False, "previous_start": 30},
+    }
+
+
+def test_visits_follow_the_size_of_the_change():
+    tasks = [{"task_id": f"t{i}", "estimated_duration": 1} for i in range(200)]
+    tasks.append({"task_id": "after", "estimated_duration": 1, "dependencies": ["t0"]})
+    graph = TaskGraph(tasks)
+    visited = graph.stats["visited"]
+    graph.set_duration("t0", 5)
+    assert graph.reschedule() == {
+        "t0": {"start": 0, "end": 5, "blocked": False, "previous_start": 0},
+        "after": {"start": 5, "end": 6, "blocked": False, "previous_start": 1},
+    }
+    assert graph.stats["visited"] - visited == 2
+
+
+def test_offline_resource_blocks_dependents_until_back():
+    graph = TaskGraph(TASKS)
+    graph.set_resource("robot", offline=True)
+    changes = graph.reschedule()
+    assert set(changes) == {"vacuum", "mop", "fold"}
+    assert all(change["blocked"] for change in changes.values())
+    assert graph.tasks["laundry"].blocked is False
+    assert graph.to_list()[-1]["blocked"] is True
+
+    graph.set_resource("robot", available_at=45)
+    graph.reschedule()
+    assert times(graph)["vacuum"] == (45, 75)
+    assert times(graph)["fold"] == (95, 105)
+
+
+def test_completed_task_has_concrete_times():
+    graph = TaskGraph(TASKS)
+    graph.complete("vacuum", 25)
+    graph.reschedule()
+    assert times(graph)["vacuum"] == (0, 25)
+    assert times(graph)["mop"] == (25, 45)
+    graph.set_resource("robot", offline=True)
+    graph.reschedule()
+    assert graph.tasks["vacuum"].blocked is False
+    assert graph.tasks["mop"].blocked is True
+
+
+def test_add_and_remove_tasks():
+    graph = TaskGraph(TASKS)
+    graph.add_tasks([{"task_id": "dust", "estimated_duration": 5, "dependencies": ["fold"]}])
+    assert graph.reschedule()["dust"]["start"] == 85
+    graph.remove_task("laundry")
+    changes = graph.reschedule()
+    assert changes["laundry"]["start"] is None
+    assert times(graph)["fold"] == (50, 60)
+    assert times(graph)["dust"] == (60, 65)
+
+
+def test_invalid_tasks_are_rejected():
+    graph = TaskGraph(TASKS)
+    with pytest.raises(ValueError):
+        graph.add_tasks([{"task_id": "x", "dependencies": ["nope"]}])
+    with pytest.raises(ValueError):
+        graph.add_tasks([{"task_id": "a", "dependencies": ["b"]}, {"task_id": "b", "dependencies": ["a"]}])
+    with pytest.raises(ValueError):
+        graph.add_tasks([{"task_id": "vacuum", "dependencies": ["fold"]}])
+    with pytest.raises(ValueError):
+        graph.add_tasks([{"task_id": "loop", "dependencies": ["loop"]}])
+    with pytest.raises(ValueError):
+        graph.add_tasks([{"estimated_duration": 5}])
+    # Rejected lists leave the graph as it was
+    assert sorted(graph.tasks) == ["fold", "laundry", "mop", "vacuum"]
+    assert graph.tasks["vacuum"].dependencies == []
+    assert graph.reschedule() == {}
+
+
+def test_apply_checks_everything_before_changing_anything():
+    graph = TaskGraph(TASKS)
+    with pytest.raises(KeyError):
+        graph.apply({"delays": {"vacuum": 10}, "durations": {"ghost": 5}})
+    assert graph.reschedule() == {}
+    unhandled = graph.apply({"delays": {"vacuum": 10}, "offline": [], "weather": "rain"})
+    assert unhandled == ["weather"]
+    assert graph.reschedule()["vacuum"]["start"] == 10
+
+
+def test_apply_can_reference_tasks_it_adds():
+    graph = TaskGraph(TASKS)
+    graph.apply({"add": [{"task_id": "dust", "estimated_duration": 5}], "delays": {"dust": 20}})
+    assert graph.reschedule()["dust"]["start"] == 20
@@ -0,0 +1,69 @@
+import pytest
+
+from ai_llm import templates
+from ai_llm.templates import PromptTemplate, compile_template
+from ai_llm.utils import format_prompt
+
+
+def test_render_matches_str_format():
+    cases = [
+        ("User Query: {user_input}\n\nContext Data: {context_data}", {"user_input": "hi", "context_data": "x"}),
+        ("{a}{b} {{literal}} {a!r}", {"a": "one", "b": 2}),
+        ("{value:>6.2f}|{value!s:<8}|", {"value": 3.14159}),
+        ("{item[name]} at {item[pos]}", {"item": {"name": "lamp", "pos": 3}}),
+        ("{msg.role}: {msg.content}", {"msg": type("M", (), {"role": "user", "content": "hey"})()}),
+        ("no fields", {}),
+    ]
+    for template, values in cases:
+        assert PromptTemplate(template).render(**values) == template.format(**values)
+
+
+def test_names_and_missing():
+    template = PromptTemplate("{b} {a} {b.x} {{c}}")
+    assert template.names == ("a", "b")
+    assert template.missing({"a": 1}) == ["b"]
+
+
+def test_missing_variables_are_listed():
+    with pytest.raises(ValueError) as error:
+        PromptTemplate("{a} {b} {c}").render(b=1)
+    assert "a, c" in str(error.value)
+
+
+def test_positional_and_nested_specs_fall_back_to_str_format():
+    assert PromptTemplate("{} and {0}").names == ()
+    assert PromptTemplate("{value:{width}}").render(value=7, width=4) == "   7"
+    with pytest.raises(ValueError):
+        PromptTemplate("{value:{width}}").render(value=7)
+
+
+def test_malformed_templates_raise():
+    with pytest.raises(ValueError):
+        PromptTemplate("{open")
+    with pytest.raises(ValueError):
+        PromptTemplate("close}")
+    with pytest.raises(ValueError):
+        PromptTemplate("{a!x}")
+
+
+def test_render_into_writes_segments():
+    parts = []
+    PromptTemplate("[{a}] {b}!").render_into(parts.append, a=1, b="two")
+    assert "".join(parts) == "[1] two!"
+    with pytest.raises(ValueError):
+        PromptTemplate("{a}").render_into(parts.append)
+
+
+def test_compile_template_caches_recent_templates(monkeypatch):
+    monkeypatch.setattr(templates, "_cache", {})
+    first = compile_template("{x}")
+    assert compile_template("{x}") is first
+    for number in range(templates.CACHE_SIZE):
+        compile_template("{x}" + str(number))
+    assert len(templates._cache) == templates.CACHE_SIZE
+    assert compile_template("{x}") is not first
+
+
+def test_format_prompt_returns_template_when_variables_are_missing():
+    assert format_prompt("Hello {name}", name="Ada") == "Hello Ada"
+    assert format_prompt("Hello {name}") == "Hello {name}"
@@ -0,0 +1,81 @@
+import math
+
+import pytest
+
+from ai_llm import timeseries
+from ai_llm.timeseries import SeriesBuffer, downsample, lttb, minmax
+
+
+@pytest.fixture(params=["arrays", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "arrays":
+        monkeypatch.setattr(timeseries, "np", None)
+    elif timeseries.np is None:
+        pytest.skip("NumPy not installed")
+    return request.param
+
+
+def wave(count=500):
+    times = [float(i) for i in range(count)]
+    values = [math.sin(i / 40.0) * 10 for i in range(count)]
+    return times, values
+
+
+def test_buffer_keeps_newest_in_time_order():
+    buffer = SeriesBuffer(capacity=3)
+    for second in range(5):
+        buffer.append(1700000000 + second, float(second))
+    times, values = buffer.series()
+    assert list(times) == [2.0, 3.0, 4.0]
+    assert list(values) == [2.0, 3.0, 4.0]
+    assert len(buffer) == 3
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.origin is None
+
+
+def test_lttb_keeps_ends_and_point_budget(backend):
+    times, values = wave()
+    indices = lttb(times, values, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 499
+    assert indices == sorted(indices)
+
+
+def test_lttb_keeps_peaks(backend):
+    times, values = wave()
+    kept = [values[i] for i in lttb(times, values, 40)]
+    assert max(kept) > 9.9
+    assert min(kept) < -9.9
+
+
+def test_backends_agree(monkeypatch):
+    if timeseries.np is None:
+        pytest.skip("NumPy not installed")
+    times, values = wave()
+    with_numpy = lttb(times, values, 60)
+    monkeypatch.setattr(timeseries, "np", None)
+    assert lttb(times, values, 60) == with_numpy
+
+
+def test_short_series_are_returned_whole(backend):
+    times, values = wave(10)
+    assert lttb(times, values, 20) == list(range(10))
+    assert lttb(times, values, 2) == list(range(10))
+    assert minmax(times, values, 3) == list(range(10))
+
+
+def test_minmax_keeps_a_single_spike():
+    times = [float(i) for i in range(300)]
+    values = [20.0] * 300
+    values[137] = 35.0
+    indices = minmax(times, values, 20)
+    assert 137 in indices
+    assert len(indices) <= 20
+
+
+def test_downsample():
+    times, values = wave()
+    kept_times, kept_values = downsample(times, values, 30, "minmax")
+    assert len(kept_times) == len(kept_values) <= 30
+    with pytest.raises(ValueError):
+        downsample(times, values, 30, "average")
@@ -0,0 +1,51 @@
+import pytest
+
+from ai_llm import tokens
+from ai_llm.models import ChatMessage
+from ai_llm.tokens import TokenCounter, estimate_message_tokens, estimate_tokens, get_context_window
+
+
+@pytest.fixture(autouse=True)
+def approximate(monkeypatch):
+    # Exercise the character-class estimator even where tiktoken is installed
+    monkeypatch.setattr(tokens, "tiktoken", None)
+    monkeypatch.setattr(tokens, "_encoding", None)
+
+
+def test_estimate_tokens_by_character_class():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("hello") == 1
+    assert estimate_tokens("hello world") == 2
+    assert estimate_tokens("123456") == 2
+    assert estimate_tokens("a\n\nb") == 3
+    assert estimate_tokens("héllo") == 3
+
+
+def test_estimate_is_close_to_bpe_on_prose():
+    text = "Turn on the living room lights at 7:30 and set the thermostat to 21 degrees. " * 20
+    # About 20 tokens per sentence with a BPE tokenizer
+    assert 300 <= estimate_tokens(text) <= 500
+
+
+def test_message_tokens_include_framing():
+    messages = [ChatMessage("system", "Be brief."), {"role": "user", "content": "hello", "name": "bob"}]
+    expected = (4 + estimate_tokens("Be brief.")) + (4 + 1 + 1) + tokens.REPLY_OVERHEAD
+    assert estimate_message_tokens(messages) == expected
+
+
+def test_token_counter():
+    counter = TokenCounter()
+    assert counter.add("hello world") == 2
+    counter.add_message({"role": "user", "content": None})
+    assert counter.total == 6
+    assert counter.fits(6) and not counter.fits(5)
+    counter.reset()
+    assert counter.total == 0
+
+
+def test_context_window_prefix_match():
+    assert get_context_window("gpt-4") == 8192
+    assert get_context_window("gpt-4o-mini-2024-07-18") == 128000
+    assert get_context_window("gpt-4-0613") == 8192
+    assert get_context_window("llama3") is None
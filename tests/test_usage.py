@@ -0,0 +1,89 @@
+from ai_llm.usage import UsageAggregator
+
+HOUR = 3600
+DAY = 86400
+# A UTC midnight
+T0 = 20000 * DAY
+
+
+def test_hourly_and_daily_totals():
+    usage = UsageAggregator(hourly_buckets=24, daily_buckets=7)
+    usage.add("heater", 1.0, T0 + 1 * HOUR, "bedroom")
+    usage.add("heater", 2.0, T0 + 1 * HOUR + 600, "bedroom")
+    usage.add("lamp", 0.5, T0 + 3 * HOUR, "kitchen")
+    usage.add("heater", 4.0, T0 + DAY + 2 * HOUR, "bedroom")
+    data = usage.summary(hours=3, days=2, now=T0 + DAY + 2 * HOUR)
+    assert data["total"] == 7.5
+    assert data["daily"] == [3.5, 4.0]
+    assert data["hourly"] == [0.0, 0.0, 4.0]
+    assert data["last_hour"] == 2
+    assert data["zones"] == {"bedroom": 7.0, "kitchen": 0.5}
+    assert data["top"] == [("bedroom", "heater", 7.0), ("kitchen", "lamp", 0.5)]
+    assert data["devices"] == 2
+
+
+def test_memory_is_per_device_not_per_sample():
+    usage = UsageAggregator()
+    for minute in range(600):
+        usage.add("fridge", 0.25, T0 + minute * 60)
+    assert len(usage) == 1
+    assert usage.stats["samples"] == 600
+    assert usage.summary(now=T0 + 600 * 60)["total"] == 150.0
+
+
+def test_old_slots_are_cleared_as_time_advances():
+    usage = UsageAggregator(hourly_buckets=4, daily_buckets=3)
+    usage.add("pump", 1.0, T0)
+    usage.add("pump", 1.0, T0 + 5 * DAY)
+    data = usage.summary(hours=4, days=3, now=T0 + 5 * DAY)
+    assert data["daily"] == [0.0, 0.0, 1.0]
+    assert data["hourly"] == [0.0, 0.0, 0.0, 1.0]
+    # Nothing recorded since: the windows move on to zeros
+    assert usage.summary(days=3, now=T0 + 9 * DAY)["total"] == 0
+
+
+def test_samples_older_than_retention_are_dropped():
+    usage = UsageAggregator(daily_buckets=3)
+    usage.add("pump", 1.0, T0 + 10 * DAY)
+    assert usage.add("pump", 1.0, T0 + 7 * DAY) is False
+    assert usage.add("pump", 1.0, T0 + 8 * DAY) is True
+    assert usage.stats["dropped_old"] == 1
+
+
+def test_max_series():
+    usage = UsageAggregator(max_series=2)
+    assert usage.add("a", 1.0, T0)
+    assert usage.add("b", 1.0, T0)
+    assert usage.add("c", 1.0, T0) is False
+    assert usage.add("a", 1.0, T0, zone="garage") is False
+    assert usage.stats["dropped_series"] == 2
+
+
+def test_utc_offset_moves_the_day_boundary():
+    usage = UsageAggregator(utc_offset=2 * HOUR)
+    usage.add("lamp", 1.0, T0 - HOUR)
+    usage.add("lamp", 2.0, T0 - 3 * HOUR)
+    assert usage.summary(days=2, now=T0)["daily"] == [2.0, 1.0]
+
+
+def test_ingest_skips_non_numeric_values():
+    usage = UsageAggregator()
+    added = usage.ingest([
+        {"device": "tv", "value": 1.5, "timestamp": T0, "zone": "living"},
+        {"device": "tv", "value": "n/a", "timestamp": T0},
+        {"device": "oven", "kwh": 2.0, "timestamp": T0},
+    ])
+    assert added == 1
+
+
+def test_to_text():
+    usage = UsageAggregator(unit="kWh")
+    assert usage.to_text(now=T0).startswith("Usage over last 7 days: total 0 kWh, 0 devices")
+    usage.add("heater", 3.0, T0, "bedroom")
+    usage.add("lamp", 1.0, T0, "kitchen")
+    text = usage.to_text(now=T0)
+    assert "total 4 kWh, 2 devices" in text
+    assert "By zone: bedroom 3 kWh (75%), kitchen 1 kWh (25%)" in text
+    assert "Top 2 devices: bedroom/heater 3 kWh (75%)" in text
+    usage.clear()
+    assert len(usage) == 0